@@ -3,7 +3,13 @@ from flask import Flask
 from .extensions import init_db_teardown, ensure_dirs
 from .models.users import init_users_schema, ensure_admin_seed
 from .models.history import init_history_schema
+from .models.jobs import init_jobs_schema
 from .utils.timezone import utc_to_moscow
+from .core.render_tokens import render_tokens
+from .core.jobs import job_manager
+from .core.storage import image_storage
+from .core.storage_gc import storage_collector
+from .core import batch, decoders
 
 def create_app(config_name=None):
     app = Flask(__name__)
@@ -26,16 +32,36 @@ def create_app(config_name=None):
     storage_dir = app.config.get('STORAGE_DIR') or os.path.join(base_dir, "storage")
     codes_dir = app.config.get('STORAGE_CODES_DIR') or os.path.join(storage_dir, "codes")
     uploads_dir = app.config.get('STORAGE_UPLOADS_DIR') or os.path.join(storage_dir, "uploads")
+    jobs_dir = app.config.get('STORAGE_JOBS_DIR') or os.path.join(storage_dir, "jobs")
+    thumbs_dir = app.config.get('STORAGE_THUMBS_DIR') or os.path.join(storage_dir, "thumbs")
 
     app.config["DATABASE_PATH"] = app.config.get('DATABASE_PATH') or os.path.join(data_dir, "app.db")
     app.config["STORAGE_CODES_DIR"] = codes_dir
     app.config["STORAGE_UPLOADS_DIR"] = uploads_dir
+    app.config["STORAGE_JOBS_DIR"] = jobs_dir
+    app.config["STORAGE_THUMBS_DIR"] = thumbs_dir
     app.config.setdefault("MAX_CONTENT_LENGTH", 20 * 1024 * 1024)
 
-    ensure_dirs([data_dir, storage_dir, codes_dir, uploads_dir])
+    ensure_dirs([data_dir, storage_dir, codes_dir, uploads_dir, jobs_dir, thumbs_dir])
     init_db_teardown(app)
+    image_storage.configure(app.config.get("STORAGE_BACKEND", "sharded"),
+                            {"codes": codes_dir, "uploads": uploads_dir, "thumbs": thumbs_dir})
+
+    # Кэш отрисовки, логотип и шрифт подписи — одинаково здесь и в процессах пакетной генерации
+    settings = batch.render_settings(app.config)
+    batch.apply_render_settings(settings)
+    batch.configure(settings)
+    render_tokens.configure(secret_key=app.config["SECRET_KEY"], ttl_seconds=app.config.get("RENDER_TOKEN_TTL", 600))
+    decoders.configure(java_fallback_enabled=app.config.get("ZXING_JAVA_FALLBACK", False),
+                       mode=app.config.get("DECODE_MODE", "race"),
+                       max_workers=app.config.get("DECODE_WORKERS", 4))
+
     init_users_schema(app)
     init_history_schema(app)
+    init_jobs_schema(app)
+    job_manager.init_app(app)
+    if not app.testing:
+        storage_collector.init_app(app)
 
     if app.config.get("AUTO_SEED_ADMIN", True):
         ensure_admin_seed(app)
@@ -47,11 +73,19 @@ def create_app(config_name=None):
     from .routes.admin import bp as admin_bp
     from .routes.forms import bp as forms_bp
     from .routes.scan import bp as scan_bp
+    from .routes.jobs import bp as jobs_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(admin_bp, url_prefix="/admin")
     app.register_blueprint(forms_bp, url_prefix="/forms")
     app.register_blueprint(scan_bp, url_prefix="/scan")
+    app.register_blueprint(jobs_bp, url_prefix="/jobs")
+
+    if app.config.get("WARMUP_ENABLED") and not app.testing:
+        from .core.warmup import warm_up, format_report
+        report = warm_up()
+        app.config["WARMUP_REPORT"] = report
+        app.logger.info("Прогрев библиотек: %s", format_report(report))
 
     return app
\ No newline at end of file
@@ -0,0 +1,410 @@
+"""
+Кодировщик Aztec (ISO/IEC 24778) на NumPy: компактные и полные символы,
+Рид–Соломон над GF(2^k), сообщение режима и опорная сетка.
+Работает в процессе, без Ghostscript и сторонних генераторов.
+
+Высокоуровневое кодирование жадное: символы пишутся в текущем режиме
+(Upper/Lower/Mixed/Punct/Digit), при необходимости — через сдвиг или
+защёлку, а байты вне таблиц уходят в Binary Shift.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+import numpy as np
+
+UPPER, LOWER, MIXED, DIGIT, PUNCT = range(5)
+
+MODE_BITS = {UPPER: 5, LOWER: 5, MIXED: 5, DIGIT: 4, PUNCT: 5}
+
+
+def _build_tables():
+    tables = {mode: {} for mode in MODE_BITS}
+    tables[UPPER][ord(" ")] = 1
+    tables[LOWER][ord(" ")] = 1
+    tables[DIGIT][ord(" ")] = 1
+    tables[MIXED][ord(" ")] = 1
+    for i in range(26):
+        tables[UPPER][ord("A") + i] = i + 2
+        tables[LOWER][ord("a") + i] = i + 2
+    for i in range(10):
+        tables[DIGIT][ord("0") + i] = i + 2
+    tables[DIGIT][ord(",")] = 12
+    tables[DIGIT][ord(".")] = 13
+    mixed = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 27, 28, 29, 30, 31,
+             ord("@"), ord("\\"), ord("^"), ord("_"), ord("`"), ord("|"), ord("~"), 127]
+    for i, b in enumerate(mixed):
+        tables[MIXED][b] = i + 2
+    # Коды 2–5 в Punct — пары символов (CR LF, ". ", ", ", ": "), здесь не используются
+    tables[PUNCT][ord("\r")] = 1
+    for i, ch in enumerate("!\"#$%&'()*+,-./:;<=>?[]{}"):
+        tables[PUNCT][ord(ch)] = i + 6
+    return tables
+
+
+CHARS = _build_tables()
+
+# Защёлки между режимами: последовательность (значение, число бит)
+LATCH = {
+    (UPPER, LOWER): [(28, 5)], (UPPER, MIXED): [(29, 5)], (UPPER, DIGIT): [(30, 5)],
+    (UPPER, PUNCT): [(29, 5), (30, 5)],
+    (LOWER, UPPER): [(30, 5), (14, 4)], (LOWER, MIXED): [(29, 5)], (LOWER, DIGIT): [(30, 5)],
+    (LOWER, PUNCT): [(29, 5), (30, 5)],
+    (MIXED, UPPER): [(29, 5)], (MIXED, LOWER): [(28, 5)], (MIXED, DIGIT): [(29, 5), (30, 5)],
+    (MIXED, PUNCT): [(30, 5)],
+    (DIGIT, UPPER): [(14, 4)], (DIGIT, LOWER): [(14, 4), (28, 5)], (DIGIT, MIXED): [(14, 4), (29, 5)],
+    (DIGIT, PUNCT): [(14, 4), (29, 5), (30, 5)],
+    (PUNCT, UPPER): [(31, 5)], (PUNCT, LOWER): [(31, 5), (28, 5)], (PUNCT, MIXED): [(31, 5), (29, 5)],
+    (PUNCT, DIGIT): [(31, 5), (30, 5)],
+}
+UPPER_SHIFT = {LOWER: (28, 5), DIGIT: (15, 4)}
+BINARY_SHIFT = 31
+MAX_BINARY_RUN = 2047 + 31
+BINARY_ABSORB = 3  # столько кодируемых символов подряд выгоднее оставить внутри Binary Shift
+
+# Поля Галуа: размер слова -> примитивный многочлен
+GF_POLY = {4: 0x13, 6: 0x43, 8: 0x12D, 10: 0x409, 12: 0x1069}
+
+MIN_ECC_PERCENT = 23
+MAX_FULL_LAYERS = 32
+
+
+def _home_mode(b: int):
+    """Режим, в который выгоднее всего перейти ради символа b (None — только Binary Shift)"""
+    for mode in (UPPER, LOWER, DIGIT, MIXED, PUNCT):
+        if b in CHARS[mode]:
+            return mode
+    return None
+
+
+def _binary_run_end(data: bytes, start: int) -> int:
+    """
+    Конец серии Binary Shift. Короткие вкрапления кодируемых символов между
+    байтами вне таблиц включаются в серию: новый Binary Shift стоит дороже.
+    """
+    n = len(data)
+    limit = min(n, start + MAX_BINARY_RUN)
+    j = start
+    while j < limit:
+        if _home_mode(data[j]) is None:
+            j += 1
+            continue
+        k = j
+        while k < limit and k - j < BINARY_ABSORB and _home_mode(data[k]) is not None:
+            k += 1
+        if k - j < BINARY_ABSORB and k < limit:
+            j = k
+        else:
+            break
+    return j
+
+
+def high_level_encode(data: bytes) -> List[Tuple[int, int]]:
+    """Данные -> последовательность (значение, число бит)"""
+    out: List[Tuple[int, int]] = []
+    mode = UPPER
+    n = len(data)
+    i = 0
+    while i < n:
+        b = data[i]
+        if b in CHARS[mode]:
+            out.append((CHARS[mode][b], MODE_BITS[mode]))
+            i += 1
+            continue
+
+        target = _home_mode(b)
+        nxt = data[i + 1] if i + 1 < n else None
+
+        if target is None:
+            # Binary Shift доступен только из Upper/Lower/Mixed
+            if mode in (DIGIT, PUNCT):
+                out.extend(LATCH[(mode, UPPER)])
+                mode = UPPER
+            j = _binary_run_end(data, i)
+            length = j - i
+            out.append((BINARY_SHIFT, 5))
+            if length <= 31:
+                out.append((length, 5))
+            else:
+                out.append((0, 5))
+                out.append((length - 31, 11))
+            out.extend((v, 8) for v in data[i:j])
+            i = j
+            continue
+
+        if target == PUNCT and not (nxt is not None and _home_mode(nxt) == PUNCT and nxt not in CHARS[mode]):
+            # Одиночный знак препинания — через P/S
+            out.append((0, MODE_BITS[mode]))
+            out.append((CHARS[PUNCT][b], 5))
+            i += 1
+            continue
+
+        if target == UPPER and mode in UPPER_SHIFT and (nxt is None or nxt not in CHARS[UPPER]):
+            out.append(UPPER_SHIFT[mode])
+            out.append((CHARS[UPPER][b], 5))
+            i += 1
+            continue
+
+        out.extend(LATCH[(mode, target)])
+        mode = target
+        out.append((CHARS[mode][b], MODE_BITS[mode]))
+        i += 1
+    return out
+
+
+def _to_bits(chunks: List[Tuple[int, int]]) -> np.ndarray:
+    if not chunks:
+        return np.zeros(0, dtype=bool)
+    values = np.array([v for v, _n in chunks], dtype=np.int64)
+    widths = np.array([n for _v, n in chunks], dtype=np.int64)
+    starts = np.cumsum(widths) - widths
+    pos = np.arange(widths.sum()) - np.repeat(starts, widths)
+    shifts = np.repeat(widths, widths) - 1 - pos
+    return ((np.repeat(values, widths) >> shifts) & 1).astype(bool)
+
+
+def stuff_bits(bits: np.ndarray, word_size: int) -> np.ndarray:
+    """
+    Разбивает поток на слова word_size бит, вставляя бит-заполнитель,
+    если старшие word_size-1 бит слова все 0 или все 1. Хвост дополняется единицами.
+    """
+    mask = (1 << word_size) - 2
+    words: List[int] = []
+    n = len(bits)
+    i = 0
+    while i < n:
+        word = 0
+        for j in range(word_size):
+            if i + j >= n or bits[i + j]:
+                word |= 1 << (word_size - 1 - j)
+        if word & mask == mask:
+            words.append(word & mask)
+            i -= 1
+        elif word & mask == 0:
+            words.append(word | 1)
+            i -= 1
+        else:
+            words.append(word)
+        i += word_size
+    return np.array(words, dtype=np.int64)
+
+
+@lru_cache(maxsize=None)
+def _gf_tables(word_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(exp, log) для GF(2^word_size); exp удвоен, чтобы не брать остаток"""
+    size = 1 << word_size
+    exp = np.zeros(2 * size, dtype=np.int64)
+    log = np.zeros(size, dtype=np.int64)
+    x = 1
+    for i in range(size - 1):
+        exp[i] = x
+        log[x] = i
+        x <<= 1
+        if x & size:
+            x ^= GF_POLY[word_size]
+    exp[size - 1:2 * size - 1] = exp[:size]
+    return exp, log
+
+
+@lru_cache(maxsize=256)
+def _rs_generator(word_size: int, ec_words: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Коэффициенты g(x) = (x - a^1)...(x - a^n) без старшего, от старшей степени.
+
+    Returns:
+        tuple: (логарифмы коэффициентов, маска ненулевых коэффициентов)
+    """
+    exp, log = _gf_tables(word_size)
+    gen = [1]
+    for i in range(1, ec_words + 1):
+        root = int(exp[i])
+        nxt = gen + [0]
+        for j in range(len(gen)):
+            if gen[j] and root:
+                nxt[j + 1] ^= int(exp[log[gen[j]] + log[root]])
+        gen = nxt
+    coeffs = np.array(gen[1:], dtype=np.int64)
+    return log[coeffs], coeffs != 0
+
+
+def rs_encode(words: np.ndarray, ec_words: int, word_size: int) -> np.ndarray:
+    """Проверочные слова Рида–Соломона (систематический код)"""
+    if ec_words <= 0:
+        return np.zeros(0, dtype=np.int64)
+    exp, log = _gf_tables(word_size)
+    gen_log, nonzero = _rs_generator(word_size, ec_words)
+    rem = np.zeros(ec_words, dtype=np.int64)
+    for w in words.tolist():
+        feedback = w ^ int(rem[0])
+        rem[:-1] = rem[1:]
+        rem[-1] = 0
+        if feedback:
+            rem ^= np.where(nonzero, exp[gen_log + log[feedback]], 0)
+    return rem
+
+
+def _check_words(words: np.ndarray, total_bits: int, word_size: int) -> np.ndarray:
+    """Данные + проверочные слова до total_bits, как поток бит (с ведущим выравниванием)"""
+    total_words = total_bits // word_size
+    ec = rs_encode(words, total_words - len(words), word_size)
+    all_words = np.concatenate([words, ec])
+    shifts = np.arange(word_size - 1, -1, -1)
+    bits = ((all_words[:, None] >> shifts) & 1).astype(bool).ravel()
+    start_pad = total_bits % word_size
+    return np.concatenate([np.zeros(start_pad, dtype=bool), bits])
+
+
+def _words_of(value_bits: List[Tuple[int, int]], word_size: int) -> np.ndarray:
+    bits = _to_bits(value_bits)
+    shifts = np.arange(word_size - 1, -1, -1)
+    return (bits.reshape(-1, word_size).astype(np.int64) << shifts).sum(axis=1)
+
+
+def word_size_for(layers: int) -> int:
+    if layers <= 2:
+        return 6
+    if layers <= 8:
+        return 8
+    if layers <= 22:
+        return 10
+    return 12
+
+
+def total_bits_in_layers(layers: int, compact: bool) -> int:
+    return ((88 if compact else 112) + 16 * layers) * layers
+
+
+def choose_layers(bits: np.ndarray, min_ecc_percent: int = MIN_ECC_PERCENT):
+    """
+    Наименьший символ, вмещающий данные с запасом коррекции.
+
+    Returns:
+        tuple: (compact, layers, word_size, слова данных после бит-стаффинга)
+    """
+    ecc_bits = len(bits) * min_ecc_percent // 100 + 11
+    total_size_bits = len(bits) + ecc_bits
+    stuffed = None
+    word_size = 0
+    # Компактные 1–4 слоя, затем полные с 4 слоёв (полные 1–3 больше компактных той же ёмкости)
+    for i in range(MAX_FULL_LAYERS + 1):
+        compact = i <= 3
+        layers = i + 1 if compact else i
+        total = total_bits_in_layers(layers, compact)
+        if total_size_bits > total:
+            continue
+        if stuffed is None or word_size != word_size_for(layers):
+            word_size = word_size_for(layers)
+            stuffed = stuff_bits(bits, word_size)
+        usable = total - total % word_size
+        if compact and len(stuffed) > 64:
+            continue
+        if len(stuffed) * word_size + ecc_bits <= usable:
+            return compact, layers, word_size, stuffed
+    raise ValueError("Данные слишком длинные для Aztec")
+
+
+def mode_message(compact: bool, layers: int, data_words: int) -> np.ndarray:
+    if compact:
+        words = _words_of([(layers - 1, 2), (data_words - 1, 6)], 4)
+        return _check_words(words, 28, 4)
+    words = _words_of([(layers - 1, 5), (data_words - 1, 11)], 4)
+    return _check_words(words, 40, 4)
+
+
+@lru_cache(maxsize=64)
+def _layout(compact: bool, layers: int):
+    """
+    Координаты бит данных и постоянный рисунок (яблочко, опорная сетка) для символа.
+
+    Returns:
+        tuple: (размер матрицы, строки, столбцы бит данных, матрица рисунка,
+                строки, столбцы бит сообщения режима)
+    """
+    base = (11 if compact else 14) + layers * 4
+    if compact:
+        size = base
+        align = np.arange(base)
+    else:
+        size = base + 1 + 2 * ((base // 2 - 1) // 15)
+        orig_center, center = base // 2, size // 2
+        align = np.zeros(base, dtype=np.int64)
+        i = np.arange(orig_center)
+        new_offset = i + i // 15
+        align[orig_center - i - 1] = center - new_offset - 1
+        align[orig_center + i] = center + new_offset + 1
+
+    # Слой 0 — внешний; каждая сторона слоя — полоса шириной 2 модуля
+    rows: List[np.ndarray] = []
+    cols: List[np.ndarray] = []
+    for i in range(layers):
+        row_size = (layers - i) * 4 + (9 if compact else 12)
+        j = np.repeat(np.arange(row_size), 2)
+        k = np.tile(np.arange(2), row_size)
+        lo_k, lo_j = i * 2 + k, i * 2 + j
+        hi_k, hi_j = base - 1 - i * 2 - k, base - 1 - i * 2 - j
+        # Четыре стороны по 2*row_size бит: верх, право, низ, лево (x — столбец, y — строка)
+        for xs, ys in ((lo_k, lo_j), (lo_j, hi_k), (hi_k, hi_j), (hi_j, lo_k)):
+            cols.append(align[xs])
+            rows.append(align[ys])
+    data_rows = np.concatenate(rows)
+    data_cols = np.concatenate(cols)
+
+    fixed = np.zeros((size, size), dtype=bool)
+    center = size // 2
+    bullseye = 5 if compact else 7
+    for r in range(0, bullseye, 2):
+        fixed[center - r, center - r:center + r + 1] = True
+        fixed[center + r, center - r:center + r + 1] = True
+        fixed[center - r:center + r + 1, center - r] = True
+        fixed[center - r:center + r + 1, center + r] = True
+    # Метки ориентации по углам кольца сообщения режима
+    s = bullseye
+    for x, y in ((center - s, center - s), (center - s + 1, center - s), (center - s, center - s + 1),
+                 (center + s, center - s), (center + s, center - s + 1), (center + s, center + s - 1)):
+        fixed[y, x] = True
+    if not compact:
+        # Опорная сетка: через каждые 16 модулей от центра, с чередованием
+        start = center & 1
+        for step in range(len(range(0, base // 2 - 1, 15))):
+            offset = step * 16
+            fixed[center - offset, start::2] = True
+            fixed[center + offset, start::2] = True
+            fixed[start::2, center - offset] = True
+            fixed[start::2, center + offset] = True
+
+    if compact:
+        idx = np.arange(7)
+        offset = center - 3 + idx
+        m_rows = np.concatenate([np.full(7, center - 5), offset, np.full(7, center + 5), offset])
+        m_cols = np.concatenate([offset, np.full(7, center + 5), offset, np.full(7, center - 5)])
+        m_bits = np.concatenate([idx, idx + 7, 20 - idx, 27 - idx])
+    else:
+        idx = np.arange(10)
+        offset = center - 5 + idx + idx // 5
+        m_rows = np.concatenate([np.full(10, center - 7), offset, np.full(10, center + 7), offset])
+        m_cols = np.concatenate([offset, np.full(10, center + 7), offset, np.full(10, center - 7)])
+        m_bits = np.concatenate([idx, idx + 10, 29 - idx, 39 - idx])
+    order = np.argsort(m_bits)
+    return size, data_rows, data_cols, fixed, m_rows[order], m_cols[order]
+
+
+def encode_aztec(data: Union[str, bytes], min_ecc_percent: int = MIN_ECC_PERCENT) -> np.ndarray:
+    """
+    Матрица модулей Aztec (True — тёмный) без тихой зоны.
+    Строки кодируются в latin-1.
+    """
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    if not data:
+        raise ValueError("Пустые данные для Aztec")
+
+    bits = _to_bits(high_level_encode(data))
+    compact, layers, word_size, words = choose_layers(bits, min_ecc_percent)
+    message = _check_words(words, total_bits_in_layers(layers, compact), word_size)
+    mode_bits = mode_message(compact, layers, len(words))
+
+    size, data_rows, data_cols, fixed, m_rows, m_cols = _layout(compact, layers)
+    matrix = fixed.copy()
+    matrix[data_rows[message], data_cols[message]] = True
+    matrix[m_rows[mode_bits], m_cols[mode_bits]] = True
+    return matrix
@@ -0,0 +1,243 @@
+"""
+Пакетная генерация кодов в пуле процессов.
+Каждый элемент пакета рендерится отдельным рабочим процессом через generate_by_type.
+Рабочие процессы не наследуют состояние приложения (forkserver/spawn), поэтому настройки
+отрисовки — логотип, шрифт подписи, кэш — передаются им инициализатором пула.
+"""
+
+import atexit
+import io
+import json
+import multiprocessing
+import os
+import zipfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_workers = 0
+_executor_settings: Dict = {}
+_executor_lock = threading.Lock()
+_worker_settings: Dict = {}
+
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def render_settings(config) -> Dict:
+    """Настройки отрисовки из конфигурации приложения (после заполнения путей в create_app)"""
+    enabled = config.get("RENDER_CACHE_ENABLED", True)
+    return {
+        "logo_enabled": bool(config.get("QR_LOGO_ENABLED", True)),
+        "logo_path": config.get("QR_LOGO_PATH") or None,
+        "font_path": config.get("LABEL_FONT_PATH") or None,
+        "cache_memory_bytes": config.get("RENDER_CACHE_MEMORY_BYTES") if enabled else 0,
+        "cache_disk_dir": os.path.join(config["STORAGE_CODES_DIR"], ".render_cache") if enabled else "",
+        "cache_disk_bytes": config.get("RENDER_CACHE_DISK_BYTES") if enabled else None,
+    }
+
+
+def apply_render_settings(settings: Dict) -> None:
+    """
+    Применяет настройки отрисовки в текущем процессе: в приложении (create_app)
+    и в каждом рабочем процессе пула (инициализатор).
+    """
+    from .fonts import font_registry
+    from .logos import DEFAULT_LOGO_PATH, logo_registry
+    from .render_cache import render_cache
+
+    render_cache.configure(max_memory_bytes=settings["cache_memory_bytes"], disk_dir=settings["cache_disk_dir"],
+                           max_disk_bytes=settings["cache_disk_bytes"])
+    if not settings["logo_enabled"]:
+        logo_registry.unregister(logo_registry.default_name)
+    elif settings["logo_path"]:
+        logo_registry.register(logo_registry.default_name, settings["logo_path"])
+    elif os.path.exists(DEFAULT_LOGO_PATH):
+        logo_registry.register(logo_registry.default_name, DEFAULT_LOGO_PATH)
+    font_registry.resolve(settings["font_path"], force=True)
+
+
+def configure(settings: Dict) -> None:
+    """Запоминает настройки для рабочих процессов; пул с другими настройками будет пересоздан"""
+    global _worker_settings
+    with _executor_lock:
+        _worker_settings = dict(settings)
+
+
+def get_batch_executor(workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Возвращает общий пул процессов, создавая его при первом обращении"""
+    global _executor, _executor_workers, _executor_settings
+    workers = workers or os.cpu_count() or 1
+    with _executor_lock:
+        if _executor is None or _executor_workers != workers or _executor_settings != _worker_settings:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # Не fork: пул создаётся в многопоточном сервере, и дочерний процесс унаследовал бы
+            # захваченные другими потоками блокировки (render_cache, логотипы, пул декодеров)
+            _executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(START_METHOD),
+                initializer=apply_render_settings if _worker_settings else None,
+                initargs=(_worker_settings,) if _worker_settings else (),
+            )
+            _executor_workers = workers
+            _executor_settings = _worker_settings
+        return _executor
+
+
+def shutdown_batch_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(shutdown_batch_executor)
+
+
+def normalize_batch_item(raw) -> Dict:
+    """Приводит элемент запроса к виду {text, code_type, size, gost_code, human_text}"""
+    if not isinstance(raw, dict):
+        raise ValueError("Элемент пакета должен быть объектом")
+    text = (raw.get("text") or "").strip()
+    if not text:
+        raise ValueError("Пустой текст")
+    return {
+        "text": text,
+        "code_type": raw.get("code_type") or "QR",
+        "size": int(raw.get("size") or 300),
+        "gost_code": raw.get("gost_code") or None,
+        "human_text": (raw.get("human_text") or "").strip(),
+    }
+
+
+def render_batch_item(item: Dict) -> Dict:
+    """
+    Рендерит один элемент пакета в PNG.
+    Выполняется в рабочем процессе, поэтому ошибки возвращаются, а не пробрасываются.
+    """
+    from .codes import generate_by_type
+    from .encoding import encode_image
+
+    try:
+        img, metadata = generate_by_type(
+            item["code_type"], item["text"], size=item["size"],
+            human_text=item["human_text"], gost_code=item["gost_code"]
+        )
+        return {"ok": True, "png": encode_image(img, "compact")[0], "metadata": metadata}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def build_vector_item(item: Dict) -> Dict:
+    """Строит векторную геометрию элемента в рабочем процессе"""
+    from .vector import build_vector_symbol
+
+    try:
+        symbol, metadata = build_vector_symbol(
+            item["code_type"], item["text"], size=item["size"],
+            human_text=item["human_text"], gost_code=item["gost_code"]
+        )
+        return {"ok": True, "symbol": symbol, "metadata": metadata}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+def run_batch(items: List, workers: Optional[int] = None, fn: Callable[[Dict], Dict] = render_batch_item) -> Iterator[Dict]:
+    """
+    Обрабатывает элементы функцией fn в пуле процессов и отдаёт результаты в исходном порядке.
+    Строка вместо элемента — ошибка разбора, она возвращается без обращения к пулу.
+    В работе одновременно не больше workers * 4 элементов, чтобы память была ограничена.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = get_batch_executor(workers)
+    window = workers * 4
+    pending: deque = deque()
+    it = iter(items)
+
+    def submit_next() -> bool:
+        try:
+            item = next(it)
+        except StopIteration:
+            return False
+        if isinstance(item, str):
+            pending.append(item)
+        else:
+            pending.append(executor.submit(fn, item))
+        return True
+
+    while len(pending) < window and submit_next():
+        pass
+    while pending:
+        head = pending.popleft()
+        submit_next()
+        if isinstance(head, str):
+            yield {"ok": False, "error": head}
+            continue
+        try:
+            yield head.result()
+        except Exception as e:
+            yield {"ok": False, "error": f"Ошибка рабочего процесса: {e}"}
+
+
+class _ZipChunkStream(io.RawIOBase):
+    """Несмещаемый поток: zipfile пишет в него, а мы забираем готовые куски"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        data = bytes(b)
+        self._chunks.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_batch_zip(results: Iterator[Dict]) -> Iterator[bytes]:
+    """
+    Упаковывает результаты пакета в ZIP по мере готовности.
+    Изображения называются по номеру элемента, ошибки собираются в manifest.json.
+    """
+    stream = _ZipChunkStream()
+    manifest = []
+    with zipfile.ZipFile(stream, mode="w", compression=zipfile.ZIP_STORED) as zf:
+        for index, result in enumerate(results):
+            if result.get("ok"):
+                name = f"{index:05d}.png"
+                zf.writestr(name, result["png"])
+                manifest.append({"index": index, "ok": True, "file": name,
+                                 "transliterated": result["metadata"].get("transliterated", False)})
+            else:
+                manifest.append({"index": index, "ok": False, "error": result.get("error")})
+            chunk = stream.drain()
+            if chunk:
+                yield chunk
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1))
+    yield stream.drain()
+
+
+def iter_batch_ndjson(results: Iterator[Dict]) -> Iterator[bytes]:
+    """Отдаёт результаты пакета построчно в формате NDJSON с data URL изображений"""
+    import base64
+
+    for index, result in enumerate(results):
+        if result.get("ok"):
+            b64 = base64.b64encode(result["png"]).decode("ascii")
+            line = {"index": index, "ok": True, "data_url": f"data:image/png;base64,{b64}",
+                    "transliterated": result["metadata"].get("transliterated", False)}
+        else:
+            line = {"index": index, "ok": False, "error": result.get("error")}
+        yield (json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8")
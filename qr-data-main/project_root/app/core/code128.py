@@ -0,0 +1,151 @@
+"""
+Кодировщик Code 128 без сторонних библиотек.
+Набор символов (A/B/C) выбирается динамическим программированием по минимуму
+символов, поэтому серийные номера из цифр упаковываются парами в набор C.
+"""
+
+from typing import List
+
+import numpy as np
+
+# Ширины элементов (штрих, пробел, ...) для значений 0–106; 106 — STOP
+PATTERNS = [
+    "212222", "222122", "222221", "121223", "121322", "131222", "122213", "122312", "132212", "221213",
+    "221312", "231212", "112232", "122132", "122231", "113222", "123122", "123221", "223211", "221132",
+    "221231", "213212", "223112", "312131", "311222", "321122", "321221", "312212", "322112", "322211",
+    "212123", "212321", "232121", "111323", "131123", "131321", "112313", "132113", "132311", "211313",
+    "231113", "231311", "112133", "112331", "132131", "113123", "113321", "133121", "313121", "211331",
+    "231131", "213113", "213311", "213131", "311123", "311321", "331121", "312113", "312311", "332111",
+    "314111", "221411", "431111", "111224", "111422", "121124", "121421", "141122", "141221", "112214",
+    "112412", "122114", "122411", "142112", "142211", "241211", "221114", "413111", "241112", "134111",
+    "111242", "121142", "121241", "114212", "124112", "124211", "411212", "421112", "421211", "212141",
+    "214121", "412121", "111143", "111341", "131141", "114113", "114311", "411113", "411311", "113141",
+    "114131", "311141", "411131", "211412", "211214", "211232", "2331112",
+]
+
+SET_A, SET_B, SET_C = 0, 1, 2
+START = {SET_A: 103, SET_B: 104, SET_C: 105}
+# Код переключения на набор (в текущем наборе)
+SWITCH = {SET_A: 101, SET_B: 100, SET_C: 99}
+SHIFT = 98
+FNC4 = {SET_A: 101, SET_B: 100}
+STOP = 106
+
+QUIET_MODULES = 10
+
+
+def _value_in(code_set: int, b: int):
+    """Значение байта в наборе A/B (без FNC4) или None"""
+    if code_set == SET_A:
+        if b < 32:
+            return b + 64
+        if b < 96:
+            return b - 32
+        return None
+    if 32 <= b < 128:
+        return b - 32
+    return None
+
+
+def _char_cost(code_set: int, b: int):
+    """Число символов для байта в наборе A/B, с FNC4 для latin-1; None — не кодируется"""
+    if b >= 128:
+        return None if _value_in(code_set, b - 128) is None else 2
+    return None if _value_in(code_set, b) is None else 1
+
+
+def code128_values(text: str) -> List[int]:
+    """
+    Значения символов: старт, данные, контрольная сумма, стоп.
+    Строка кодируется в latin-1 (символы 128–255 — через FNC4).
+    """
+    try:
+        data = text.encode("latin-1")
+    except UnicodeEncodeError:
+        raise ValueError("Code128 поддерживает только символы latin-1")
+    if not data:
+        raise ValueError("Пустые данные для Code128")
+
+    n = len(data)
+    inf = float("inf")
+    # cost[i][s] — минимум символов для data[:i], закончив в наборе s; back — откуда пришли
+    cost = [[inf] * 3 for _ in range(n + 1)]
+    back = [[None] * 3 for _ in range(n + 1)]
+    for s in (SET_A, SET_B, SET_C):
+        cost[0][s] = 1
+        back[0][s] = ("start", None, None)
+
+    for i in range(n + 1):
+        # Переключение набора на месте
+        for s in (SET_A, SET_B, SET_C):
+            for t in (SET_A, SET_B, SET_C):
+                if s != t and cost[i][s] + 1 < cost[i][t]:
+                    cost[i][t] = cost[i][s] + 1
+                    back[i][t] = ("switch", i, s)
+        if i == n:
+            break
+        b = data[i]
+        for s in (SET_A, SET_B):
+            if cost[i][s] == inf:
+                continue
+            step = _char_cost(s, b)
+            if step is not None:
+                if cost[i][s] + step < cost[i + 1][s]:
+                    cost[i + 1][s] = cost[i][s] + step
+                    back[i + 1][s] = ("char", i, s)
+            else:
+                # Одиночный символ другого набора через SHIFT
+                other = SET_B if s == SET_A else SET_A
+                step = _char_cost(other, b) if b < 128 else None
+                if step is not None and cost[i][s] + step + 1 < cost[i + 1][s]:
+                    cost[i + 1][s] = cost[i][s] + step + 1
+                    back[i + 1][s] = ("shift", i, s)
+        if i + 1 < n and 48 <= b <= 57 and 48 <= data[i + 1] <= 57 and cost[i][SET_C] + 1 < cost[i + 2][SET_C]:
+            cost[i + 2][SET_C] = cost[i][SET_C] + 1
+            back[i + 2][SET_C] = ("pair", i, SET_C)
+
+    # Восстановление пути с конца
+    state = min((SET_A, SET_B, SET_C), key=lambda s: cost[n][s])
+    ops = []
+    i = n
+    while True:
+        kind, prev_i, prev_s = back[i][state]
+        if kind == "start":
+            ops.append(("start", None, state))
+            break
+        ops.append((kind, i, state))
+        if kind != "switch":
+            i = prev_i
+        state = prev_s
+    ops.reverse()
+
+    values: List[int] = []
+    for kind, pos, code_set in ops:
+        if kind == "start":
+            values.append(START[code_set])
+        elif kind == "switch":
+            values.append(SWITCH[code_set])
+        elif kind == "pair":
+            values.append(int(data[pos - 2:pos].decode("ascii")))
+        else:
+            b = data[pos - 1]
+            encode_set = code_set
+            if kind == "shift":
+                values.append(SHIFT)
+                encode_set = SET_B if code_set == SET_A else SET_A
+            if b >= 128:
+                values.append(FNC4[encode_set])
+                b -= 128
+            values.append(_value_in(encode_set, b))
+
+    checksum = values[0] + sum(i * v for i, v in enumerate(values[1:], start=1))
+    values.append(checksum % 103)
+    values.append(STOP)
+    return values
+
+
+def code128_row(text: str) -> np.ndarray:
+    """Ряд модулей (True — штрих) без тихой зоны"""
+    widths = np.array([int(w) for v in code128_values(text) for w in PATTERNS[v]], dtype=np.int64)
+    colors = np.arange(len(widths)) % 2 == 0
+    return np.repeat(colors, widths)
@@ -1,121 +1,58 @@
 from typing import Optional, List, Dict
-from PIL import Image, ImageEnhance
-import io
+from PIL import Image
 import os
 from typing import List, Dict
 from .gost_dimensions import (
     get_gost_dimensions, get_dimension_by_code, get_legacy_pixel_size,
     migrate_legacy_size, GostDimension
 )
+from .render_cache import render_cache, make_render_key
+from .raster import rasterize_modules, dm_matrix_from_encoded
+from .logos import logo_registry
+from .qr_capacity import select_qr_params
+from .fonts import font_registry
 
-def _enhance_contrast(img: Image.Image) -> Image.Image:
-    """Enhance image contrast for better scanning"""
-    try:
-        # Convert to RGB if needed
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Enhance contrast
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(1.3)  # Increase contrast by 30%
-        
-        # Enhance sharpness
-        sharpness_enhancer = ImageEnhance.Sharpness(img)
-        img = sharpness_enhancer.enhance(1.2)  # Increase sharpness by 20%
-        
-        return img
-    except:
-        return img
-
-def _scale_nearest_exact(img: Image.Image, target: int) -> Image.Image:
-    w, h = img.size
-    if w == h and w != 0:
-        k = max(1, round(target / w))
-        out = img.resize((w * k, h * k), Image.NEAREST)
-        if out.size[0] != target:
-            out = out.resize((target, target), Image.NEAREST)
-        return out
-    return img.resize((target, target), Image.NEAREST)
-
-def _scale_preserve_aspect_height(img: Image.Image, target_h: int) -> Image.Image:
-    w, h = img.size
-    if h == 0:
-        return img
-    k = max(1, round(target_h / h))
-    new_w = max(1, w * k)
-    new_h = max(1, h * k)
-    out = img.resize((new_w, new_h), Image.NEAREST)
-    if out.size[1] != target_h:
-        ratio = target_h / out.size[1]
-        out = out.resize((max(1, int(out.size[0] * ratio)), target_h), Image.NEAREST)
-    return out
+# Версия рендерера входит в ключ кэша: увеличивать при любом изменении отрисовки
+RENDERER_VERSION = "5"
 
 def _add_text_below_barcode(img: Image.Image, text: str) -> Image.Image:
     try:
-        from PIL import ImageDraw, ImageFont
-        
+        from PIL import ImageDraw
+
         # Calculate proportional font size based on barcode dimensions
         # Use the smaller dimension (width or height) to ensure text fits properly
         base_dimension = min(img.width, img.height)
-        
+
         # Scale font size proportionally - aim for about 1/15th of the base dimension
         # but with minimum and maximum bounds for readability
         font_size = max(16, min(72, int(base_dimension / 15)))
-        
+
         # Calculate text area height proportionally to font size
         text_height = int(font_size * 1.8)  # Give some padding above and below text
-        
-        new_img = Image.new('RGB', (img.width, img.height + text_height), 'white')
+
+        new_img = Image.new(img.mode if img.mode in ('L', 'RGB') else 'RGB', (img.width, img.height + text_height), 'white')
         new_img.paste(img, (0, 0))
-        
-        draw = ImageDraw.Draw(new_img)
-        
-        # Try to load a scalable font with the calculated size
-        font = None
-        font_paths = [
-            "arial.ttf",
-            "/System/Library/Fonts/Arial.ttf", 
-            "C:/Windows/Fonts/arial.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "/System/Library/Fonts/Helvetica.ttc"
-        ]
-        
-        for font_path in font_paths:
-            try:
-                font = ImageFont.truetype(font_path, font_size)
-                break
-            except:
-                continue
-        
-        # Fallback to default font if no TrueType font found
-        if font is None:
-            try:
-                font = ImageFont.load_default()
-                # Try to get a better default font size for built-in font
-                if hasattr(font, 'size'):
-                    # For older PIL versions, try to scale the default font
-                    font = ImageFont.load_default()
-            except:
-                font = ImageFont.load_default()
-        
-        # Get text dimensions for centering
-        bbox = draw.textbbox((0, 0), text, font=font)
+
+        # Font and text metrics come from the registry, so only the draw call remains
+        font = font_registry.font(font_size)
+        bbox = font_registry.text_bbox(text, font_size)
         text_width = bbox[2] - bbox[0]
         text_actual_height = bbox[3] - bbox[1]
-        
+
         # Center horizontally, position with some padding from barcode
         x = (img.width - text_width) // 2
         y = img.height + (text_height - text_actual_height) // 2
-        
-        draw.text((x, y), text, fill='black', font=font)
-        
+
+        ImageDraw.Draw(new_img).text((x, y), text, fill='black', font=font)
+
         return new_img
     except Exception:
         return img
 
-def generate_qr(text: str, size: int = 300, preferred_ecc: str = "H", gost_code: str = None) -> Image.Image:
+def qr_modules(text, preferred_ecc: str = "H") -> tuple[list, str]:
+    """Матрица модулей QR (без тихой зоны) и выбранный уровень коррекции"""
     import qrcode
-    from PIL import Image
+    from qrcode.util import QRData
     from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
 
     ecc_map = {
@@ -124,901 +61,234 @@ def generate_qr(text: str, size: int = 300, preferred_ecc: str = "H", gost_code:
         "Q": ERROR_CORRECT_Q,
         "H": ERROR_CORRECT_H,
     }
-    order = ["H", "Q", "M", "L"]
-    start = order.index(preferred_ecc) if preferred_ecc in order else 0
-    try_levels = order[start:]
 
+    data = text.encode('utf-8') if isinstance(text, str) else text
+    # Уровень коррекции и версия выбираются по таблице ёмкости, без пробных кодирований
+    plan = select_qr_params(data, preferred_ecc)
+    if plan is None:
+        raise ValueError("Слишком длинный текст для QR даже на уровне L")
+
+    qr = qrcode.QRCode(
+        version=plan.version,
+        error_correction=ecc_map[plan.ecc],
+        border=0
+    )
+    for mode, chunk in plan.segments:
+        qr.add_data(QRData(chunk, mode=mode, check_data=False))
+    qr.make(fit=False)
+    return qr.get_matrix(), plan.ecc
+
+def dm_modules(text: str):
+    """Матрица модулей DataMatrix (без тихой зоны)"""
+    from pylibdmtx.pylibdmtx import encode as dm_encode
+
+    en = dm_encode(text.encode("utf-8"))
+    return dm_matrix_from_encoded(en.width, en.height, en.bpp, en.pixels)
+
+def code128_modules(text: str):
+    """Ряд модулей Code 128 (1 x N, без тихой зоны)"""
+    from .code128 import code128_row
+
+    return code128_row(text).reshape(1, -1)
+
+def pdf417_modules(text: str, columns: Optional[int] = None, security_level: Optional[int] = None):
+    """
+    Матрица модулей PDF417 (одна строка матрицы на ряд символа, без тихой зоны).
+    Без columns/security_level геометрия берётся из plan_pdf417 для размера по умолчанию.
+    """
+    import numpy as np
+    import pdf417gen
+
+    if columns is None or security_level is None:
+        from .pdf417_layout import plan_pdf417
+
+        layout = plan_pdf417(text, security_level=security_level)
+        columns, security_level = columns or layout.columns, layout.security_level
+    codes = pdf417gen.encode(text, columns=columns, security_level=security_level)
+    rows = ["".join(format(value, 'b') for value in row) for row in codes]
+    flat = np.frombuffer("".join(rows).encode('ascii'), dtype=np.uint8) == ord('1')
+    return flat.reshape(len(rows), -1)
+
+def aztec_modules(text: str):
+    """Матрица модулей Aztec (без тихой зоны); текст должен быть совместим с latin-1"""
+    from .aztec import encode_aztec
+
+    return encode_aztec(text)
+
+def generate_qr(text: str, size: int = 300, preferred_ecc: str = "H", gost_code: str = None) -> Image.Image:
     if gost_code:
         try:
-            gost_dim = get_dimension_by_code(gost_code)
-            actual_size = gost_dim.pixels_300dpi
-            internal_size = actual_size
-            min_internal_size = max(internal_size, int(gost_dim.mm_width * gost_dim.print_density))
-            base_box_size = max(8, min_internal_size // 37)
+            actual_size = get_dimension_by_code(gost_code).pixels_300dpi
         except ValueError:
-            gost_code = None
-    
-    if not gost_code:
-        dpi_scale_factor = 3
-        internal_size = size * dpi_scale_factor
-        
-        min_internal_size = max(internal_size, 1800)
-        
-        base_box_size = max(12, min_internal_size // 37)
+            actual_size = size
+    else:
         actual_size = size
-    
-    last_err: Optional[Exception] = None
-    for lvl in try_levels:
-        try:
-            qr = qrcode.QRCode(
-                version=None,
-                error_correction=ecc_map[lvl],
-                box_size=base_box_size,
-                border=4
-            )
-            if isinstance(text, str):
-                qr.add_data(text.encode('utf-8'))
-            else:
-                qr.add_data(text)
-            qr.make(fit=True)
-            
-            matrix = qr.get_matrix()
-            n_modules = len(matrix)
-            border = qr.border
-            total_modules = n_modules + border * 2
-            
-            box_size = max(base_box_size, min_internal_size // total_modules)
-            qr.box_size = box_size
-            
-            img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-            
-            actual_internal_size = total_modules * box_size
-            if actual_internal_size != internal_size:
-                if actual_internal_size > internal_size:
-                    img = img.resize((internal_size, internal_size), Image.LANCZOS)
-                else:
-                    img = _scale_nearest_exact(img, internal_size)
-            
-            if internal_size != actual_size:
-                img = img.resize((actual_size, actual_size), Image.LANCZOS)
-
-            logo_path = os.path.join(os.path.dirname(__file__), "..", "static", "star.png")
-            logo_path = os.path.abspath(logo_path)
-            if os.path.exists(logo_path):
-                logo = Image.open(logo_path).convert("RGBA")
-                # Increased logo size for better visibility while maintaining scannability
-                # H (30% error correction): ~1/5 of QR size (~20% coverage)
-                # Q (25% error correction): ~1/6 of QR size (~17% coverage) 
-                # M (15% error correction): ~1/7 of QR size (~14% coverage)
-                # L (7% error correction): ~1/8 of QR size (~13% coverage)
-                if lvl == "H":
-                    logo_size = actual_size // 5  # Increased from // 8
-                elif lvl == "Q":
-                    logo_size = actual_size // 6  # Increased from // 6 (unchanged as it was already good)
-                elif lvl == "M":
-                    logo_size = actual_size // 7  # Increased from // 6
-                else:  # L
-                    logo_size = actual_size // 8  # Increased from // 6
-                logo = logo.resize((logo_size, logo_size), Image.LANCZOS)
-                pos = ((img.size[0] - logo.size[0]) // 2, (img.size[1] - logo.size[1]) // 2)
-                img.paste(logo, pos, mask=logo)
-
-            return img
-        except Exception as e:
-            last_err = e
-            continue
-    raise ValueError("Слишком длинный текст для QR даже на уровне L") from last_err
+
+    modules, ecc = qr_modules(text, preferred_ecc)
+
+    # Целый шаг модуля под итоговый размер, без промежуточного растра
+    img = rasterize_modules(modules, actual_size, quiet_zone=4, mode="L").convert("RGB")
+
+    logo = logo_registry.overlay(actual_size, ecc)
+    if logo is not None:
+        overlay, mask = logo
+        pos = ((img.size[0] - overlay.size[0]) // 2, (img.size[1] - overlay.size[1]) // 2)
+        img.paste(overlay, pos, mask=mask)
+
+    return img
 
 def generate_dm(text: str, size: int = 300, gost_code: str = None) -> Image.Image:
-    from pylibdmtx.pylibdmtx import encode as dm_encode
-    
     if gost_code:
         try:
-            gost_dim = get_dimension_by_code(gost_code)
-            actual_size = gost_dim.pixels_300dpi
-            internal_size = actual_size * 2
-            min_internal_size = max(internal_size, int(gost_dim.mm_width * gost_dim.print_density * 2))
+            actual_size = get_dimension_by_code(gost_code).pixels_300dpi
         except ValueError:
-            gost_code = None
-    
-    if not gost_code:
-        dpi_scale_factor = 4
-        internal_size = size * dpi_scale_factor
-        min_internal_size = max(internal_size, 2000)
+            actual_size = size
+    else:
         actual_size = size
-    
-    en = dm_encode(text.encode("utf-8"))
-    base = Image.frombytes('RGB', (en.width, en.height), en.pixels)
-    
-    min_scale = max(16, size // max(base.size))
-    
-    scaled_size = base.size[0] * min_scale
-    if scaled_size < size:
-        scale_factor = size // base.size[0]
-        high_res = base.resize(
-            (base.size[0] * scale_factor, base.size[1] * scale_factor), 
-            Image.NEAREST
-        )
-        if high_res.size[0] != internal_size:
-            high_res = _scale_nearest_exact(high_res, internal_size)
-        
-        if internal_size != actual_size:
-            return high_res.resize((actual_size, actual_size), Image.LANCZOS)
-        return high_res
-    
-    scaled = _scale_nearest_exact(base, internal_size)
-    if internal_size != actual_size:
-        return scaled.resize((actual_size, actual_size), Image.LANCZOS)
-    return scaled
+
+    return rasterize_modules(dm_modules(text), actual_size, quiet_zone=2, mode="L")
+
+def code128_module_px(text_length: int) -> int:
+    """Ширина модуля Code128 в пикселях при 300 DPI: 0.1 мм + 0.01 мм на символ, не меньше 0.15 мм"""
+    module_mm = max(0.15, 0.1 + text_length * 0.01)
+    return max(1, round(module_mm * 300 / 25.4))
 
 def generate_code128(text: str, size: int = 300, human_text: str = "", gost_code: str = None) -> Image.Image:
     """
-    Generate Code 128 barcode with dynamic width scaling based on text length
+    Code 128: ряд модулей рисуется целым шагом в пикселях и растягивается на высоту,
+    без промежуточного PNG и ресемплинга.
     """
-    try:
-        import barcode
-        from barcode.writer import ImageWriter
-        Code128 = barcode.get_barcode_class('code128')
-        
-        # Calculate dynamic width based on text length
-        text_length = len(text)
-        
-        # Base width starts small and scales with character count
-        base_width = max(0.15, 0.1 + (text_length * 0.01))  # Start at 0.1mm, scale by 0.01mm per char
-        
-        # Dynamic height calculation
-        if gost_code:
-            try:
-                gost_dim = get_dimension_by_code(gost_code)
-                actual_height = int(gost_dim.mm_height * 300 / 25.4)
-            except ValueError:
-                actual_height = size
-        else:
+    import numpy as np
+    from .code128 import QUIET_MODULES
+
+    if gost_code:
+        try:
+            actual_height = int(get_dimension_by_code(gost_code).mm_height * 300 / 25.4)
+        except ValueError:
             actual_height = size
-        
-        code = Code128(text, writer=ImageWriter())
-        bio = io.BytesIO()
-        
-        # Calculate dynamic width for longer text
-        # Use proportional scaling where width increases with character count
-        calculated_width = text_length * base_width
-        final_width = max(calculated_width, size)  # Ensure minimum width
-        
-        bar_height = actual_height * 0.7  # 70% of height for bars
-        options = {
-            "module_height": bar_height / 31.5,  # Convert to mm
-            "module_width": base_width,  # Dynamic width based on text length
-            "quiet_zone": 6.0,  # Larger quiet zone for better scanning
-            "font_size": 0,
-            "text_distance": 5.0,
-            "write_text": False,
-            "dpi": 300
-        }
-        
-        code.write(bio, options=options)
-        bio.seek(0)
-        img = Image.open(bio).convert("RGB")
-        
-        # For longer text, allow the image to scale proportionally rather than forcing aspect ratio
-        if text_length > 50:  # For longer text, preserve natural proportions
-            if img.height < actual_height:
-                scale_factor = actual_height / img.height
-                new_width = int(img.width * scale_factor)
-                final_img = img.resize((new_width, actual_height), Image.LANCZOS)
-            else:
-                final_img = img
-        else:
-            # For shorter text, use existing scaling
-            final_img = _scale_preserve_aspect_height(img, actual_height)
-        
-        # Add human-readable text if provided
-        if human_text:
-            final_img = _add_text_below_barcode(final_img, human_text)
-        
-        # Enhance contrast for better scanning
-        return _enhance_contrast(final_img)
-        
-    except Exception as e:
-        raise RuntimeError("Не удалось сгенерировать Code128. Установите 'python-barcode'.") from e
+    else:
+        actual_height = size
+
+    try:
+        modules = code128_modules(text)[0]
+    except ValueError as e:
+        raise RuntimeError(f"Не удалось сгенерировать Code128: {e}") from e
+
+    pitch = code128_module_px(len(text))
+    row = np.repeat(np.pad(modules, QUIET_MODULES), pitch)
+    pixels = np.where(row, 0, 255).astype(np.uint8)
+    img = Image.fromarray(np.ascontiguousarray(np.broadcast_to(pixels, (max(1, actual_height), pixels.size))), mode="L")
+
+    if human_text:
+        img = _add_text_below_barcode(img, human_text)
+    return img
 
 def generate_pdf417(text: str, size: int = 300, human_text: str = "", gost_code: str = None) -> Image.Image:
     """
-    Generate PDF417 barcode with dynamic width scaling based on text length
+    PDF417 с геометрией от solve_layout: целый шаг модуля, без ресемплинга.
+    Высота изображения равна высоте области ГОСТ (или size), символ по центру.
+    ValueError — текст не помещается в PDF417.
     """
+    import numpy as np
+    from .pdf417_layout import plan_pdf417, QUIET_MODULES
+
     try:
-        import pdf417gen
-        
-        text_length = len(text)
-        
-        if gost_code:
-            try:
-                gost_dim = get_dimension_by_code(gost_code)
-                actual_height = int(gost_dim.mm_height * 300 / 25.4)
-            except ValueError:
-                actual_height = size
-        else:
-            actual_height = size
-        
-        # Dynamic column calculation for width scaling - more columns = wider barcode
-        if text_length <= 10:
-            columns = 2  # Narrow for very short text
-        elif text_length <= 30:
-            columns = 3
-        elif text_length <= 60:
-            columns = 4  
-        elif text_length <= 100:
-            columns = 5
-        elif text_length <= 150:
-            columns = 6
-        elif text_length <= 250:
-            columns = 7
-        else:
-            # For very long text, scale columns proportionally for wider barcodes
-            columns = min(15, max(8, int(text_length / 35)))
-            
-        codes = pdf417gen.encode(
-            text, 
-            columns=columns,
-            security_level=1  # Lower security level for better compatibility
-        )
-        
-        # Dynamic scaling based on text length - start smaller for short text
-        if text_length <= 50:
-            scale = max(4, int(6 - text_length * 0.04))  # Scale down for short text
-        elif text_length <= 200:
-            scale = 6
-        else:
-            # For longer text, use smaller scale to allow natural width expansion  
-            scale = max(4, int(8 - text_length * 0.005))
-            
-        img = pdf417gen.render_image(codes, scale=scale, ratio=3)
-        img = img.convert("RGB")
-        
-        # Dynamic width handling - allow width to grow naturally with text length
-        if text_length > 100:
-            # For longer text, preserve natural proportions to show full width
-            if img.height < actual_height:
-                scale_factor = actual_height / img.height
-                new_width = int(img.width * scale_factor)
-                final_img = img.resize((new_width, actual_height), Image.LANCZOS)
-            else:
-                final_img = img
-        else:
-            # For shorter text, maintain minimum sizing
-            if img.height < actual_height:
-                scale_factor = actual_height / img.height
-                new_width = int(img.width * scale_factor)
-                final_img = img.resize((new_width, actual_height), Image.LANCZOS)
-            else:
-                final_img = img
-        
-        # Add human-readable text if provided
-        if human_text:
-            final_img = _add_text_below_barcode(final_img, human_text)
-        
-        return final_img
-        
-    except Exception as e:
+        layout = plan_pdf417(text, size=size, gost_code=gost_code)
+        modules = pdf417_modules(text, columns=layout.columns, security_level=layout.security_level)
+    except ImportError as e:
         raise RuntimeError("Не удалось сгенерировать PDF417. Установите 'pdf417gen'.") from e
 
+    pixels = np.where(modules, 0, 255).astype(np.uint8)
+    pixels = np.repeat(np.repeat(pixels, layout.module_px, axis=1), layout.row_px, axis=0)
+    quiet = QUIET_MODULES * layout.module_px
+    img = Image.new("L", (layout.width_px, max(layout.target_height_px, layout.height_px)), 255)
+    img.paste(Image.fromarray(pixels, mode="L"), (quiet, (img.height - pixels.shape[0]) // 2))
+
+    if human_text:
+        img = _add_text_below_barcode(img, human_text)
+    return img
+
 def generate_aztec(text: str, size: int = 300, gost_code: str = None) -> tuple[Image.Image, bool]:
     """
-    Generate Aztec barcode with proper implementation.
-    Uses aztec-code-generator library for reliable Aztec code generation.
-    
+    Генерирует Aztec собственным кодировщиком (app/core/aztec.py).
+
     Returns:
         tuple: (изображение, была ли применена транслитерация)
     """
     from .transliteration import transliterate_for_aztec, is_latin1_compatible
-    
-    # Calculate final size based on GOST if provided
+
     if gost_code:
         try:
-            gost_dim = get_dimension_by_code(gost_code)
-            actual_size = gost_dim.pixels_300dpi
+            actual_size = get_dimension_by_code(gost_code).pixels_300dpi
         except ValueError:
             actual_size = size
     else:
         actual_size = size
-    
-    # Интеллектуальная транслитерация: только для нелатинских символов
+
+    # Интеллектуальная транслитерация: только для нелатинских символов.
+    # Маркер не добавляем — Aztec кодирует latin-1, кириллица определяется при декодировании
     transliterated = False
-    original_text = text
     if not is_latin1_compatible(text):
         text, transliterated = transliterate_for_aztec(text)
-        # Не добавляем маркер для Aztec, так как он не поддерживает расширенные символы
-        # Вместо этого полагаемся на автоопределение при декодировании
-    
-    # Try aztec-code-generator library (pure Python implementation)
-    try:
-        import aztec_code_generator
-        
-        # Try to encode the text - aztec-code-generator only supports latin-1
-        # Convert to bytes for proper encoding
-        try:
-            text_bytes = text.encode('latin-1')
-        except UnicodeEncodeError:
-            # For remaining non-latin-1 characters after transliteration, use fallback
-            raise ValueError("Text contains characters not supported by aztec-code-generator")
-        
-        # Generate Aztec code matrix
-        aztec = aztec_code_generator.AztecCode(text)
-        matrix = aztec.matrix
-        
-        # Convert matrix to PIL Image with proper handling
-        import numpy as np
-        
-        # Convert to numpy array - aztec-code-generator uses 0=white, 1=black
-        img_array = np.array(matrix, dtype=np.uint8)
-        # Convert to proper image values: 0 -> 255 (white), 1 -> 0 (black)
-        img_array = (1 - img_array) * 255
-        
-        # Create PIL Image from the base matrix
-        aztec_img = Image.fromarray(img_array, mode='L').convert('RGB')
-        
-        # Calculate scale to reach desired size while maintaining module clarity
-        # Use high internal resolution for better quality
-        module_size = max(12, actual_size // len(matrix))
-        high_res_size = len(matrix) * module_size
-        
-        # Scale up with nearest neighbor for crisp modules
-        aztec_img = aztec_img.resize((high_res_size, high_res_size), Image.NEAREST)
-        
-        # Add quiet zone (border) - Aztec codes require quiet zone
-        # Minimum 1 module width per Aztec spec
-        border_size = max(module_size * 2, high_res_size // 10)
-        bordered_size = high_res_size + 2 * border_size
-        bordered_img = Image.new('RGB', (bordered_size, bordered_size), 'white')
-        bordered_img.paste(aztec_img, (border_size, border_size))
-        
-        # Scale to final size maintaining crisp edges with NEAREST, not LANCZOS
-        # LANCZOS creates antialiasing which makes barcode unreadable
-        final_img = bordered_img.resize((actual_size, actual_size), Image.NEAREST)
-        
-        return final_img, transliterated
-        
-    except ImportError:
-        pass  # Try next method
-    except Exception as e:
-        print(f"aztec-code-generator error: {e}")
-    
-    # Try treepoem as fallback (requires Ghostscript)
-    try:
-        import treepoem
-        
-        # Generate Aztec barcode with optimal settings
-        aztec_img = treepoem.generate_barcode(
-            barcode_type='azteccode',
-            data=text,
-            options={
-                'format': 'full',      # Generate full Aztec (not compact)
-                'layers': 0,           # Auto-determine layers
-                'eclevel': 23,         # Error correction level (23% default)
-            }
-        )
-        
-        # Convert to RGB if needed
-        if aztec_img.mode == '1':  # 1-bit mode
-            aztec_img = aztec_img.convert('RGB')
-        elif aztec_img.mode != 'RGB':
-            aztec_img = aztec_img.convert('RGB')
-        
-        # Scale to desired size using nearest neighbor for crisp edges
-        aztec_img = _scale_nearest_exact(aztec_img, actual_size)
-        
-        # Enhance for better scanning
-        return _enhance_contrast(aztec_img), transliterated
-        
-    except ImportError:
-        pass  # Try next method
-    except Exception as e:
-        print(f"Treepoem Aztec generation error: {e}")
-    
-    # Custom fallback implementation with improved quality
-    return _generate_aztec_improved(text, actual_size), transliterated
-
-def _generate_aztec_improved(text: str, size: int = 300) -> Image.Image:
-    """
-    Improved custom Aztec barcode implementation.
-    Creates a proper Aztec-like pattern that's more likely to be scannable.
-    """
-    try:
-        import numpy as np
-        
-        # Encode text to bytes for length calculation
-        text_bytes = text.encode('utf-8')
-        data_len = len(text_bytes)
-        
-        # Calculate appropriate matrix size based on data length
-        # These are based on Aztec code specifications
-        if data_len <= 13:
-            matrix_size = 15    # Compact Aztec size 1
-            layers = 1
-        elif data_len <= 40:
-            matrix_size = 19    # Compact Aztec size 2  
-            layers = 2
-        elif data_len <= 51:
-            matrix_size = 23    # Compact Aztec size 3
-            layers = 3
-        elif data_len <= 76:
-            matrix_size = 27    # Compact Aztec size 4
-            layers = 4
-        elif data_len <= 108:
-            matrix_size = 31    # Full Aztec layer 1
-            layers = 5
-        elif data_len <= 156:
-            matrix_size = 37    # Full Aztec layer 2
-            layers = 6
-        elif data_len <= 204:
-            matrix_size = 41    # Full Aztec layer 3
-            layers = 7
-        elif data_len <= 252:
-            matrix_size = 45    # Full Aztec layer 4
-            layers = 8
-        else:
-            # For longer data, calculate size dynamically
-            layers = min(32, max(8, (data_len - 252) // 64 + 8))
-            matrix_size = 45 + (layers - 8) * 4
-            
-        # Ensure odd size for proper centering
-        if matrix_size % 2 == 0:
-            matrix_size += 1
-            
-        # Create matrix - start with all white (255)
-        matrix = np.ones((matrix_size, matrix_size), dtype=np.uint8) * 255
-        center = matrix_size // 2
-        
-        # Generate proper Aztec finder pattern (bullseye) - inline implementation
-        # Aztec bullseye: alternating black/white squares from center outward
-        matrix[center, center] = 255
-        
-        # Ring 1: black (3x3 with white center)
-        for i in range(-1, 2):
-            for j in range(-1, 2):
-                matrix[center + i, center + j] = 0
-        matrix[center, center] = 255
-        
-        # Ring 2: white (5x5)
-        for i in range(-2, 3):
-            for j in range(-2, 3):
-                if abs(i) == 2 or abs(j) == 2:
-                    matrix[center + i, center + j] = 255
-                    
-        # Ring 3: black (7x7) 
-        for i in range(-3, 4):
-            for j in range(-3, 4):
-                if abs(i) == 3 or abs(j) == 3:
-                    matrix[center + i, center + j] = 0
-                    
-        # Ring 4: white (9x9)
-        for i in range(-4, 5):
-            for j in range(-4, 5):
-                if abs(i) == 4 or abs(j) == 4:
-                    matrix[center + i, center + j] = 255
-                    
-        # Ring 5: black (11x11)
-        for i in range(-5, 6):
-            for j in range(-5, 6):
-                if abs(i) == 5 or abs(j) == 5:
-                    matrix[center + i, center + j] = 0
-        
-        # Generate reference grid (timing patterns) - inline implementation
-        matrix_dim = matrix.shape[0]
-        grid_spacing = max(4, layers)
-        
-        for i in range(0, matrix_dim, grid_spacing):
-            for j in range(0, matrix_dim):
-                if abs(i - center) > 8 and abs(j - center) > 8:
-                    if (i // grid_spacing + j // grid_spacing) % 2 == 0:
-                        matrix[i, j] = 0
-                        
-        for j in range(0, matrix_dim, grid_spacing):
-            for i in range(0, matrix_dim):
-                if abs(i - center) > 8 and abs(j - center) > 8:
-                    if (i // grid_spacing + j // grid_spacing) % 2 == 0:
-                        matrix[i, j] = 0
-        
-        # Generate data pattern using text hash - inline implementation
-        import hashlib
-        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-        
-        # Convert hash to bits and place data pattern
-        hash_int = int(text_hash, 16)
-        bit_string = bin(hash_int)[2:].zfill(128)
-        
-        bit_idx = 0
-        for layer in range(6, min(matrix_dim // 2, 40)):
-            for angle in range(layer * 8):
-                y_offset = int(layer * np.sin(angle * np.pi / (layer * 4)))
-                x_offset = int(layer * np.cos(angle * np.pi / (layer * 4)))
-                
-                y = center + y_offset
-                x = center + x_offset
-                
-                if 0 <= y < matrix_dim and 0 <= x < matrix_dim:
-                    if matrix[y, x] == 255:
-                        if bit_string[bit_idx % len(bit_string)] == '1':
-                            matrix[y, x] = 0
-                        bit_idx += 1
-        
-        # Convert to PIL Image
-        img = Image.fromarray(matrix, mode='L').convert('RGB')
-        
-        # Add quiet zone (border)
-        border_size = max(4, size // 40)
-        bordered_size = size + 2 * border_size
-        bordered_img = Image.new('RGB', (bordered_size, bordered_size), 'white')
-        
-        # Scale main image to fit within bordered area
-        main_img = img.resize((size, size), Image.NEAREST)
-        bordered_img.paste(main_img, (border_size, border_size))
-        
-        # Final resize to exact target size
-        return bordered_img.resize((size, size), Image.LANCZOS)
-        
-    except ImportError:
-        # If numpy is not available, create simple pattern
-        return _generate_simple_aztec_pattern(text, size)
-    except Exception as e:
-        print(f"Fallback Aztec generation error: {e}")
-        return _generate_simple_aztec_pattern(text, size)
-
-def _create_aztec_bullseye_pattern(matrix, center):
-    """Create the characteristic Aztec bullseye finder pattern"""
-    # Aztec bullseye: alternating black/white squares from center outward
-    # Center: white dot (1x1)
-    matrix[center, center] = 255
-    
-    # Ring 1: black (3x3 with white center)
-    for i in range(-1, 2):
-        for j in range(-1, 2):
-            matrix[center + i, center + j] = 0
-    matrix[center, center] = 255  # Keep center white
-    
-    # Ring 2: white (5x5)
-    for i in range(-2, 3):
-        for j in range(-2, 3):
-            if abs(i) == 2 or abs(j) == 2:
-                matrix[center + i, center + j] = 255
-                
-    # Ring 3: black (7x7) 
-    for i in range(-3, 4):
-        for j in range(-3, 4):
-            if abs(i) == 3 or abs(j) == 3:
-                matrix[center + i, center + j] = 0
-                
-    # Ring 4: white (9x9)
-    for i in range(-4, 5):
-        for j in range(-4, 5):
-            if abs(i) == 4 or abs(j) == 4:
-                matrix[center + i, center + j] = 255
-                
-    # Ring 5: black (11x11)
-    for i in range(-5, 6):
-        for j in range(-5, 6):
-            if abs(i) == 5 or abs(j) == 5:
-                matrix[center + i, center + j] = 0
-
-def _create_aztec_reference_grid(matrix, center, layers):
-    """Create reference grid pattern for Aztec code"""
-    size = matrix.shape[0]
-    
-    # Create timing patterns at regular intervals
-    grid_spacing = max(4, layers)
-    
-    for i in range(0, size, grid_spacing):
-        for j in range(0, size):
-            # Skip center bullseye area
-            if abs(i - center) > 8 and abs(j - center) > 8:
-                # Alternating pattern
-                if (i // grid_spacing + j // grid_spacing) % 2 == 0:
-                    matrix[i, j] = 0
-                    
-    for j in range(0, size, grid_spacing):
-        for i in range(0, size):
-            # Skip center bullseye area
-            if abs(i - center) > 8 and abs(j - center) > 8:
-                # Alternating pattern  
-                if (i // grid_spacing + j // grid_spacing) % 2 == 0:
-                    matrix[i, j] = 0
-
-def _create_aztec_data_pattern_hash(matrix, text, center, size):
-    """Generate data pattern using text hash for consistent appearance"""
-    import hashlib
-    
-    # Create hash from text for reproducible pattern
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-    hash_bytes = bytes.fromhex(text_hash)
-    
-    # Apply pattern outside bullseye and reference areas
-    pattern_index = 0
-    for i in range(size):
-        for j in range(size):
-            # Skip bullseye center area
-            if abs(i - center) <= 6 or abs(j - center) <= 6:
-                continue
-                
-            # Skip reference grid positions
-            if i % 4 == 0 or j % 4 == 0:
-                continue
-                
-            # Use hash bytes to determine black/white
-            byte_val = hash_bytes[pattern_index % len(hash_bytes)]
-            bit_pos = pattern_index % 8
-            is_black = (byte_val >> bit_pos) & 1
-            
-            if is_black:
-                matrix[i, j] = 0
-            else:
-                matrix[i, j] = 255
-                
-            pattern_index += 1
-
-def _generate_simple_aztec_pattern(text: str, size: int) -> Image.Image:
-    """Simple Aztec-like pattern when numpy is not available"""
-    import hashlib
-    
-    # Create basic pattern based on text hash
-    text_hash = hashlib.md5(text.encode('utf-8')).digest()
-    
-    # Create white image
-    img = Image.new('RGB', (size, size), 'white')
-    
-    # Simple bullseye pattern in center
-    center = size // 2
-    
-    # Draw concentric squares
-    from PIL import ImageDraw
-    draw = ImageDraw.Draw(img)
-    
-    for ring in range(1, 6):
-        r = ring * 3
-        if ring % 2 == 1:  # Odd rings are black
-            draw.rectangle([center-r, center-r, center+r, center+r], 
-                         outline='black', fill='black')
-        else:  # Even rings are white 
-            draw.rectangle([center-r, center-r, center+r, center+r], 
-                         outline='white', fill='white')
-    
-    # Add data pattern based on hash
-    for i in range(0, size, 4):
-        for j in range(0, size, 4):
-            # Skip center area
-            if abs(i - center) < 20 or abs(j - center) < 20:
-                continue
-                
-            # Use hash to determine pattern
-            hash_val = text_hash[(i * size + j) % len(text_hash)]
-            if hash_val & 1:
-                draw.rectangle([i, j, i+2, j+2], fill='black')
-    
-    return img
 
-def _generate_aztec_custom(text: str, size: int = 300, gost_code: str = None) -> Image.Image:
-    """
-    Custom Aztec barcode generation with improved pattern.
-    """
-    try:
-        # Import numpy for matrix generation
-        import numpy as np
-        
-        # Calculate dimensions based on GOST if provided
-        if gost_code:
-            try:
-                gost_dim = get_dimension_by_code(gost_code)
-                actual_size = gost_dim.pixels_300dpi
-                internal_size = actual_size * 2  # Higher internal resolution
-            except ValueError:
-                gost_code = None
-        
-        if not gost_code:
-            dpi_scale_factor = 4  # Increased scale for better quality
-            internal_size = size * dpi_scale_factor
-            actual_size = size
-        
-        # Calculate matrix size based on text length for proper data capacity
-        text_bytes = text.encode('utf-8')
-        data_len = len(text_bytes)
-        
-        # More accurate size calculation for Aztec codes
-        if data_len <= 13:
-            matrix_size = 15  # Compact Aztec, size 1
-        elif data_len <= 40:
-            matrix_size = 19  # Compact Aztec, size 2
-        elif data_len <= 51:
-            matrix_size = 23  # Compact Aztec, size 3
-        elif data_len <= 76:
-            matrix_size = 27  # Compact Aztec, size 4
-        elif data_len <= 106:
-            matrix_size = 31  # Full Aztec, layer 1
-        elif data_len <= 150:
-            matrix_size = 37  # Full Aztec, layer 2
-        elif data_len <= 196:
-            matrix_size = 41  # Full Aztec, layer 3
-        elif data_len <= 242:
-            matrix_size = 45  # Full Aztec, layer 4
-        else:
-            # For very long text, calculate appropriate size
-            matrix_size = min(31 + ((data_len - 76) // 30) * 4, 151)
-        
-        # Ensure odd size for proper center calculation
-        if matrix_size % 2 == 0:
-            matrix_size += 1
-            
-        # Create white background matrix
-        matrix = np.ones((matrix_size, matrix_size), dtype=np.uint8) * 255
-        
-        center = matrix_size // 2
-        
-        # Generate proper Aztec finder pattern with concentric squares
-        _create_aztec_finder_pattern_improved(matrix, center, matrix_size)
-        
-        # Generate data pattern with proper error correction simulation
-        _create_aztec_data_pattern_improved(matrix, text, center, matrix_size)
-        
-        # Convert to PIL Image
-        img = Image.fromarray(matrix, mode='L').convert('RGB')
-        
-        # Scale to high internal resolution with nearest neighbor for crisp edges
-        if img.size[0] != internal_size:
-            img = _scale_nearest_exact(img, internal_size)
-        
-        # Add proper quiet zone (border)
-        border_size = internal_size // 20  # 5% border
-        bordered_size = internal_size + 2 * border_size
-        bordered_img = Image.new('RGB', (bordered_size, bordered_size), 'white')
-        bordered_img.paste(img, (border_size, border_size))
-        
-        # Scale down to final size with appropriate resampling
-        if gost_code:
-            final_img = bordered_img.resize((actual_size, actual_size), Image.LANCZOS)
-        else:
-            final_img = bordered_img.resize((actual_size, actual_size), Image.LANCZOS)
-        
-        return final_img
-        
-    except ImportError as e:
-        # Fallback to QR code if numpy is not available
-        return generate_qr(text, size, "H", gost_code)
-    except Exception as e:
-        # On any other error, provide better error message and fallback
-        import logging
-        logging.warning(f"Custom Aztec generation failed: {e}, falling back to QR code")
-        return generate_qr(text, size, "H", gost_code)
-
-def _create_aztec_finder_pattern_improved(matrix: 'np.ndarray', center: int, matrix_size: int):
-    """Create the central finder pattern for Aztec codes with proper concentric squares."""
-    import numpy as np
-    
-    # Create the proper Aztec bullseye pattern with alternating squares
-    # This creates the characteristic concentric square pattern of Aztec codes
-    
-    # Rings from outer to inner (alternating black/white)
-    rings = [
-        (11, 0),     # Outermost ring - black (11x11)
-        (9, 255),    # Ring 9x9 - white  
-        (7, 0),      # Ring 7x7 - black
-        (5, 255),    # Ring 5x5 - white
-        (3, 0),      # Ring 3x3 - black
-        (1, 255)     # Center dot - white
-    ]
-    
-    for ring_size, color in rings:
-        half_size = ring_size // 2
-        for i in range(center - half_size, center + half_size + 1):
-            for j in range(center - half_size, center + half_size + 1):
-                if 0 <= i < matrix_size and 0 <= j < matrix_size:
-                    # Only fill the border of each ring
-                    if (i == center - half_size or i == center + half_size or
-                        j == center - half_size or j == center + half_size):
-                        matrix[i, j] = color
-                    elif ring_size == 1:  # Center dot
-                        matrix[i, j] = color
-    
-    # Add mode indicator pattern
-    if matrix_size >= 15:
-        # Add corner patterns for mode indication
-        # Upper-left corner
-        for i in range(3):
-            for j in range(3):
-                if i < matrix_size and j < matrix_size:
-                    if (i == 0 or i == 2 or j == 0 or j == 2):
-                        matrix[i, j] = 0
-                    else:
-                        matrix[i, j] = 255
-
-def _create_aztec_data_pattern_improved(matrix: 'np.ndarray', text: str, center: int, matrix_size: int):
-    """Create an improved data pattern that looks more like a real Aztec code."""
-    import numpy as np
-    
-    # Create deterministic pattern based on text
-    hash_val = hash(text) % (2**32)
-    np.random.seed(hash_val % (2**31))
-    
-    # Fill data modules in a spiral pattern (more like real Aztec codes)
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # right, down, left, up
-    direction_idx = 0
-    
-    # Start from outside the finder pattern
-    start_distance = 6
-    x, y = center - start_distance, center - start_distance
-    
-    for step in range((matrix_size - 12) ** 2):
-        # Skip finder pattern area
-        if abs(x - center) > 5 and abs(y - center) > 5:
-            # Skip orientation markers in corners
-            if not (x < 4 and y < 4):
-                if 0 <= x < matrix_size and 0 <= y < matrix_size:
-                    # Create more structured pattern based on position and text
-                    pattern_val = (x * 7 + y * 11 + hash_val + step) % 100
-                    
-                    # Simulate error correction blocks - create patterns that look realistic
-                    block_x, block_y = x // 3, y // 3
-                    if (block_x + block_y) % 2 == 0:  # Checkerboard of error correction
-                        threshold = 40  # More black in EC blocks
-                    else:
-                        threshold = 55  # More white in data blocks
-                    
-                    if pattern_val < threshold:
-                        matrix[x, y] = 0
-                    else:
-                        matrix[x, y] = 255
-        
-        # Move in spiral
-        dx, dy = directions[direction_idx]
-        next_x, next_y = x + dx, y + dy
-        
-        # Change direction if needed
-        if (next_x < 0 or next_x >= matrix_size or 
-            next_y < 0 or next_y >= matrix_size):
-            direction_idx = (direction_idx + 1) % 4
-            dx, dy = directions[direction_idx]
-            
-        x, y = x + dx, y + dy
-
-def _process_aztec_image(aztec_img, size: int, gost_code: str = None):
-    """Process Aztec image from external library to match size requirements."""
-    if gost_code:
-        try:
-            gost_dim = get_dimension_by_code(gost_code)
-            target_size = gost_dim.pixels_300dpi
-        except ValueError:
-            target_size = size
-    else:
-        target_size = size
-    
-    # Ensure proper scaling and add quiet zone
-    scaled_img = _scale_nearest_exact(aztec_img, int(target_size * 0.9))
-    border_size = (target_size - scaled_img.size[0]) // 2
-    
-    final_img = Image.new('RGB', (target_size, target_size), 'white')
-    final_img.paste(scaled_img, (border_size, border_size))
-    
-    return final_img
-
-def generate_by_type(code_type: str, text: str, size: int = 300, human_text: str = "", gost_code: str = None) -> tuple[Image.Image, dict]:
+    img = rasterize_modules(aztec_modules(text), actual_size, quiet_zone=2, mode="L").convert("RGB")
+    return img, transliterated
+
+
+def _processed_text(code_type: str, text: str) -> str:
+    from .transliteration import prepare_text_for_barcode
+
+    # Aztec транслитерирует текст сам, остальным типам всегда добавляем маркер
+    if code_type.lower() == "aztec":
+        return text
+    return prepare_text_for_barcode(text, add_marker=True)
+
+def render_version() -> str:
+    """Версия отрисовки: рендерер и логотип по умолчанию"""
+    return f"{RENDERER_VERSION}:{logo_registry.fingerprint()}"
+
+def render_key(code_type: str, text: str, size: int = 300, human_text: str = "", gost_code: str = None) -> str:
+    """Ключ render_cache для параметров generate_by_type; годится и как ETag изображения"""
+    return make_render_key(code_type.lower(), _processed_text(code_type, text), size, gost_code, human_text,
+                           render_version())
+
+def generate_by_type(code_type: str, text: str, size: int = 300, human_text: str = "", gost_code: str = None,
+                     use_cache: bool = True) -> tuple[Image.Image, dict]:
     """
     Генерирует код указанного типа.
-    
+    Результат берётся из render_cache, если такой код уже отрисовывался.
+
     Returns:
         tuple: (изображение, метаданные с информацией о транслитерации)
     """
-    from .transliteration import prepare_text_for_barcode
-    
+    processed_text = _processed_text(code_type, text)
+
+    if not use_cache:
+        return _render_by_type(code_type, text, processed_text, size, human_text, gost_code)
+
+    key = make_render_key(code_type.lower(), processed_text, size, gost_code, human_text, render_version())
+    cached = render_cache.get(key)
+    if cached is not None:
+        img, metadata = cached
+        metadata["code_type"] = code_type
+        return img, metadata
+
+    img, metadata = _render_by_type(code_type, text, processed_text, size, human_text, gost_code)
+    render_cache.put(key, img, metadata)
+    return img, metadata
+
+def _render_by_type(code_type: str, text: str, processed_text: str, size: int, human_text: str,
+                    gost_code: Optional[str]) -> tuple[Image.Image, dict]:
     metadata = {"transliterated": False, "code_type": code_type}
-    
+
     code_type_lower = code_type.lower()
-    
+
     # Для Aztec используем интеллектуальную транслитерацию
     if code_type_lower == "aztec":
         img, was_transliterated = generate_aztec(text, size, gost_code)
         metadata["transliterated"] = was_transliterated
         return img, metadata
-    
-    # Для остальных типов используем обычную обработку
-    # Всегда добавляем маркер для правильного декодирования
-    processed_text = prepare_text_for_barcode(text, add_marker=True)
-    
+
     if code_type_lower in ["qr", "qrcode"]:
         return generate_qr(processed_text, size, "H", gost_code), metadata
     elif code_type_lower in ["dm", "datamatrix", "data_matrix"]:
@@ -1030,207 +300,28 @@ def generate_by_type(code_type: str, text: str, size: int = 300, human_text: str
     else:
         raise ValueError(f"Неизвестный тип кода: {code_type}")
 
-def save_image(img: Image.Image, path: str):
-    img.save(path, "PNG")
+def save_image(img: Image.Image, path: str, profile: str = "compact"):
+    """Сохраняет PNG по профилю кодирования (см. encoding.PROFILES)"""
+    from .encoding import encode_image
 
-def decode_auto(img: Image.Image) -> List[Dict[str, str]]:
+    data, _mimetype, _ext = encode_image(img, profile)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def decode_auto(img: Image.Image, hint: Optional[str] = None,
+                deadline_ms: Optional[int] = None, mode: Optional[str] = None) -> List[Dict[str, str]]:
     """
     Comprehensive barcode decoder supporting all main types:
     QR, DataMatrix, Code128, PDF417, Aztec
+
+    hint — ожидаемая символика ("qr", "dm", "code128", "pdf417", "aztec"): декодеры,
+    которые её читают, запускаются первыми. Порядок подстраивается по статистике (см. decoders.py).
+    deadline_ms — общий срок распознавания; по его истечении — decoders.DecodeDeadlineExceeded.
+    mode — "race" или "cascade" (по умолчанию DECODE_MODE).
     """
-    from .transliteration import process_scanned_text
-    
-    results = []
-    
-    # First try pyzbar for most common formats (QR, Code128, PDF417, etc.)
-    try:
-        from pyzbar import pyzbar
-        
-        # Try with different image preprocessing for better detection
-        import numpy as np
-        
-        # Convert to different formats for better detection
-        imgs_to_try = [img]
-        
-        # Try grayscale
-        if img.mode != 'L':
-            imgs_to_try.append(img.convert('L'))
-        
-        # Try inverted (white text on black background)
-        try:
-            from PIL import ImageOps
-            imgs_to_try.append(ImageOps.invert(img))
-            if img.mode != 'L':
-                imgs_to_try.append(ImageOps.invert(img.convert('L')))
-        except:
-            pass
-        
-        for test_img in imgs_to_try:
-            decoded_objects = pyzbar.decode(test_img)
-            if decoded_objects:  # Found something, use it
-                for obj in decoded_objects:
-                    try:
-                        text = obj.data.decode('utf-8')
-                        # Map pyzbar types to readable names
-                        type_map = {
-                            'QRCODE': 'QR',
-                            'CODE128': 'CODE128', 
-                            'PDF417': 'PDF417',
-                            'AZTEC': 'AZTEC'
-                        }
-                        code_type = type_map.get(obj.type, obj.type)
-                        # Process scanned text to reverse transliteration if needed
-                        text = process_scanned_text(text)
-                        results.append({"text": text, "type": code_type})
-                    except UnicodeDecodeError:
-                        # Try different encodings for non-UTF8 data
-                        for encoding in ['cp1251', 'latin1', 'ascii', 'cp866']:
-                            try:
-                                text = obj.data.decode(encoding)
-                                type_map = {
-                                    'QRCODE': 'QR',
-                                    'CODE128': 'CODE128',
-                                    'PDF417': 'PDF417',
-                                    'AZTEC': 'AZTEC'
-                                }
-                                code_type = type_map.get(obj.type, obj.type)
-                                # Process scanned text to reverse transliteration if needed
-                                text = process_scanned_text(text)
-                                results.append({"text": text, "type": code_type})
-                                break
-                            except:
-                                continue
-                break  # Found results, stop trying other images
-                
-    except ImportError:
-        pass
-    
-    # If no results from pyzbar, try DataMatrix decoder
-    if not results:
-        try:
-            from pylibdmtx.pylibdmtx import decode as dm_decode
-            dm_results = dm_decode(img)
-            if dm_results:
-                for result in dm_results:
-                    try:
-                        text = result.data.decode('utf-8')
-                        # Process scanned text to reverse transliteration if needed
-                        text = process_scanned_text(text)
-                        results.append({"text": text, "type": "DATAMATRIX"})
-                    except UnicodeDecodeError:
-                        for encoding in ['cp1251', 'latin1', 'ascii', 'cp866']:
-                            try:
-                                text = result.data.decode(encoding)
-                                # Process scanned text to reverse transliteration if needed
-                                text = process_scanned_text(text)
-                                results.append({"text": text, "type": "DATAMATRIX"})
-                                break
-                            except:
-                                continue
-        except ImportError:
-            pass
-    
-    # If still no results, try alternative decoders
-    if not results:
-        try:
-            import cv2
-            import numpy as np
-            
-            # Convert PIL image to opencv format
-            img_array = np.array(img)
-            if len(img_array.shape) == 3:
-                img_cv = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-            else:
-                img_cv = img_array
-            
-            # Try QR decoder
-            detector = cv2.QRCodeDetector()
-            data, points, _ = detector.detectAndDecode(img_cv)
-            if data:
-                # Process scanned text to reverse transliteration if needed
-                data = process_scanned_text(data)
-                results.append({"text": data, "type": "QR"})
-                
-        except ImportError:
-            pass
-        except Exception:
-            pass
-    
-    # Try pyzxing (ZXing Java library) - best for Aztec codes
-    if not results:
-        try:
-            from pyzxing import BarCodeReader
-            import numpy as np
-            
-            reader = BarCodeReader()
-            img_array = np.array(img)
-            
-            # Try to decode
-            zx_results = reader.decode_array(img_array)
-            if zx_results and len(zx_results) > 0:
-                for result in zx_results:
-                    # Extract text and type from result dict
-                    decoded_text = result.get('parsed', result.get('raw', ''))
-                    barcode_type = result.get('format', 'unknown')
-                    
-                    # Handle bytes
-                    if isinstance(decoded_text, bytes):
-                        decoded_text = decoded_text.decode('utf-8', errors='ignore')
-                    if isinstance(barcode_type, bytes):
-                        barcode_type = barcode_type.decode('utf-8', errors='ignore')
-                    
-                    # Clean up string representation artifacts
-                    if isinstance(decoded_text, str) and decoded_text.startswith("b'") and decoded_text.endswith("'"):
-                        decoded_text = decoded_text[2:-1]
-                    
-                    # Map type names
-                    type_map = {
-                        'AZTEC': 'AZTEC',
-                        'QR_CODE': 'QR',
-                        'DATA_MATRIX': 'DATAMATRIX',
-                        'PDF_417': 'PDF417',
-                        'CODE_128': 'CODE128'
-                    }
-                    code_type = type_map.get(barcode_type, barcode_type)
-                    
-                    # Process scanned text to reverse transliteration if needed
-                    decoded_text = process_scanned_text(decoded_text)
-                    
-                    results.append({"text": decoded_text, "type": code_type})
-                
-        except ImportError:
-            pass
-        except Exception:
-            pass
-    
-    # Try zxing-cpp if available (better for some formats)
-    if not results:
-        try:
-            import zxingcpp
-            
-            # Convert to numpy array
-            import numpy as np
-            img_array = np.array(img)
-            if len(img_array.shape) == 3:
-                # Convert RGB to grayscale
-                img_gray = np.dot(img_array[...,:3], [0.2989, 0.5870, 0.1140])
-                img_gray = img_gray.astype(np.uint8)
-            else:
-                img_gray = img_array
-            
-            # Try to decode
-            zx_results = zxingcpp.read_barcodes(img_gray)
-            for result in zx_results:
-                # Process scanned text to reverse transliteration if needed
-                text = process_scanned_text(result.text)
-                results.append({"text": text, "type": result.format.name})
-                
-        except ImportError:
-            pass
-        except Exception:
-            pass
-    
-    return results
+    from .decoders import run_decoders
+
+    return run_decoders(img, hint, deadline_ms, mode)
 
 def get_supported_types() -> List[Dict[str, str]]:
     return [
@@ -0,0 +1,402 @@
+"""
+Декодеры для decode_auto.
+Порядок декодеров не фиксирован: каждый запуск записывает успех и время работы,
+и первым идёт декодер с наименьшей ожидаемой ценой удачного распознавания
+(среднее время / доля успехов). Подсказка о символике (hint) ставит вперёд декодеры,
+умеющие её читать, и ведёт для неё отдельную статистику; остальные декодеры
+остаются запасными на случай неверной подсказки.
+
+В режиме race (DECODE_MODE) декодеры группы запускаются параллельно в общем пуле
+и побеждает первый результат; общий срок распознавания задаёт вызывающий эндпоинт.
+Проигравший декодер прервать нельзя, и он держит поток пула до конца своей попытки,
+поэтому попытка прерываемых библиотек ограничена max_ms, а без свободных потоков
+группа разбирается по очереди в вызывающем потоке.
+
+ZXing читается в процессе через zxing-cpp. pyzxing запускает JVM и пишет временный файл
+на каждое распознавание (секунды на скан), поэтому при установленном zxing-cpp он
+не вызывается, если не включён ZXING_JAVA_FALLBACK.
+"""
+
+import concurrent.futures
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+QR, DATAMATRIX, CODE128, PDF417, AZTEC = "QR", "DATAMATRIX", "CODE128", "PDF417", "AZTEC"
+ALL_SYMBOLOGIES = frozenset({QR, DATAMATRIX, CODE128, PDF417, AZTEC})
+
+# Названия типов у разных библиотек и в подсказках -> единые имена
+TYPE_NAMES = {
+    "QR": QR, "QRCODE": QR, "QR_CODE": QR, "MICROQRCODE": QR,
+    "DM": DATAMATRIX, "DATAMATRIX": DATAMATRIX, "DATA_MATRIX": DATAMATRIX,
+    "C128": CODE128, "CODE128": CODE128, "CODE_128": CODE128,
+    "PDF417": PDF417, "PDF_417": PDF417,
+    "AZTEC": AZTEC,
+}
+
+TEXT_ENCODINGS = ("utf-8", "cp1251", "latin1", "ascii", "cp866")
+
+# Априорная оценка (мс на попытку) до накопления статистики
+PRIOR_ATTEMPTS = 2
+PRIOR_SUCCESS_RATE = 0.5
+
+
+def normalize_type(name: Optional[str]) -> Optional[str]:
+    """Единое имя символики или None для пустой/неизвестной подсказки"""
+    if not name:
+        return None
+    key = str(name).upper().replace("-", "").replace(" ", "")
+    return TYPE_NAMES.get(key) or TYPE_NAMES.get(key.replace("_", ""))
+
+
+def _result_type(name: str) -> str:
+    return normalize_type(name) or name
+
+
+def _decode_text(data: bytes) -> Optional[str]:
+    for encoding in TEXT_ENCODINGS:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def _gray_array(img: Image.Image):
+    import numpy as np
+
+    return np.asarray(img if img.mode == "L" else img.convert("L"))
+
+
+# --- декодеры: возвращают [(текст, тип)]; ImportError — библиотека недоступна;
+# timeout_ms — остаток срока (учитывают только библиотеки, которые умеют прерываться) ---
+
+def _decode_pyzbar(img: Image.Image, timeout_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+    from pyzbar import pyzbar
+
+    # Цветное, серое и инвертированные варианты (светлый код на тёмном фоне)
+    variants = [img]
+    if img.mode != "L":
+        variants.append(img.convert("L"))
+    variants.append(ImageOps.invert(img))
+    if img.mode != "L":
+        variants.append(ImageOps.invert(img.convert("L")))
+
+    for variant in variants:
+        decoded = pyzbar.decode(variant)
+        if decoded:
+            found = []
+            for obj in decoded:
+                text = _decode_text(obj.data)
+                if text is not None:
+                    found.append((text, _result_type(obj.type)))
+            return found
+    return []
+
+
+def _decode_pylibdmtx(img: Image.Image, timeout_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+    from pylibdmtx.pylibdmtx import decode as dm_decode
+
+    found = []
+    # Без кода DataMatrix на большом фото libdmtx может искать секундами — ограничиваем сроком
+    # (_run передаёт не больше Decoder.max_ms)
+    for result in dm_decode(img, timeout=timeout_ms):
+        text = _decode_text(result.data)
+        if text is not None:
+            found.append((text, DATAMATRIX))
+    return found
+
+
+def _decode_cv2(img: Image.Image, timeout_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+    import cv2
+
+    data, _points, _ = cv2.QRCodeDetector().detectAndDecode(_gray_array(img))
+    return [(data, QR)] if data else []
+
+
+_java_reader_lock = threading.Lock()
+_java_reader = None
+
+
+def java_reader():
+    """Один BarCodeReader на процесс: поиск (или скачивание) jar — один раз, а не на каждый скан"""
+    global _java_reader
+    with _java_reader_lock:
+        if _java_reader is None:
+            from pyzxing import BarCodeReader
+
+            _java_reader = BarCodeReader()
+        return _java_reader
+
+
+def _decode_pyzxing(img: Image.Image, timeout_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+    reader = java_reader()
+    # PNG без потерь вместо JPEG q90 из decode_array
+    fd, path = tempfile.mkstemp(suffix=".png")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, "PNG", compress_level=1)
+        results = reader.decode(path) or []
+    finally:
+        os.remove(path)
+
+    found = []
+    for result in results:
+        text = result.get("parsed", result.get("raw", ""))
+        kind = result.get("format", "unknown")
+        if isinstance(text, bytes):
+            text = text.decode("utf-8", errors="ignore")
+        if isinstance(kind, bytes):
+            kind = kind.decode("utf-8", errors="ignore")
+        # Артефакты строкового представления bytes
+        if isinstance(text, str) and text.startswith("b'") and text.endswith("'"):
+            text = text[2:-1]
+        if text:
+            found.append((text, _result_type(kind)))
+    return found
+
+
+def _decode_zxingcpp(img: Image.Image, timeout_ms: Optional[int] = None) -> List[Tuple[str, str]]:
+    import zxingcpp
+
+    return [(r.text, _result_type(r.format.name)) for r in zxingcpp.read_barcodes(_gray_array(img))]
+
+
+class Decoder(NamedTuple):
+    name: str
+    module: str              # импортируемый модуль библиотеки
+    fn: Callable[[Image.Image, Optional[int]], List[Tuple[str, str]]]
+    symbologies: frozenset   # что умеет читать
+    prior_ms: float          # априорное время попытки
+    replaced_by: Optional[str] = None  # не запускать, если доступен этот декодер
+    max_ms: Optional[int] = None       # предел одной попытки для декодеров, принимающих timeout_ms
+
+
+DECODERS: List[Decoder] = [
+    Decoder("pyzbar", "pyzbar", _decode_pyzbar, frozenset({QR, CODE128, PDF417}), 25.0),
+    Decoder("pylibdmtx", "pylibdmtx", _decode_pylibdmtx, frozenset({DATAMATRIX}), 150.0, max_ms=500),
+    Decoder("cv2", "cv2", _decode_cv2, frozenset({QR}), 40.0),
+    Decoder("pyzxing", "pyzxing", _decode_pyzxing, ALL_SYMBOLOGIES, 1500.0, replaced_by="zxingcpp"),
+    Decoder("zxingcpp", "zxingcpp", _decode_zxingcpp, ALL_SYMBOLOGIES, 20.0),
+]
+DECODERS_BY_NAME = {d.name: d for d in DECODERS}
+
+MODES = ("race", "cascade")
+
+# Запускать pyzxing (JVM) и при установленном zxing-cpp
+java_fallback = False
+# race — независимые декодеры параллельно, побеждает первый результат; cascade — по очереди
+decode_mode = "race"
+workers = 4
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_in_flight = 0  # задачи в пуле, включая ещё работающие попытки проигравших гонку
+
+
+def configure(java_fallback_enabled: Optional[bool] = None, mode: Optional[str] = None,
+              max_workers: Optional[int] = None) -> None:
+    global java_fallback, decode_mode, workers, _executor
+    if java_fallback_enabled is not None:
+        java_fallback = bool(java_fallback_enabled)
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"Неизвестный режим распознавания: {mode}")
+        decode_mode = mode
+    if max_workers is not None:
+        with _executor_lock:
+            workers = max(1, int(max_workers))
+            executor, _executor = _executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _reserve(count: int) -> Optional[ThreadPoolExecutor]:
+    """Пул, если в нём свободно count потоков (место занято до завершения задачи); иначе None"""
+    global _executor, _in_flight
+    with _executor_lock:
+        if _in_flight + count > workers:
+            return None
+        _in_flight += count
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode")
+        return _executor
+
+
+def _release(_future=None) -> None:
+    global _in_flight
+    with _executor_lock:
+        _in_flight -= 1
+
+
+@lru_cache(maxsize=None)
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+class DecoderStats:
+    """Попытки, успехи и суммарное время декодеров; отдельно по каждой подсказке и в целом ("*")"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[Tuple[str, str], List[float]] = {}
+        self._unavailable: Dict[str, str] = {}
+
+    def record(self, scopes: List[str], decoder: str, ok: bool, ms: float) -> None:
+        with self._lock:
+            for scope in scopes:
+                entry = self._data.setdefault((scope, decoder), [0, 0, 0.0])
+                entry[0] += 1
+                entry[1] += 1 if ok else 0
+                entry[2] += ms
+
+    def mark_unavailable(self, decoder: str, reason: str) -> None:
+        with self._lock:
+            self._unavailable[decoder] = reason
+
+    def is_available(self, decoder: str) -> bool:
+        return decoder not in self._unavailable and _installed(DECODERS_BY_NAME[decoder].module)
+
+    def cost(self, scope: str, decoder: Decoder) -> float:
+        """Ожидаемое время до успеха: среднее время попытки / доля успехов (со сглаживанием)"""
+        with self._lock:
+            attempts, successes, total_ms = self._data.get((scope, decoder.name), (0, 0, 0.0))
+        rate = (successes + PRIOR_SUCCESS_RATE * PRIOR_ATTEMPTS) / (attempts + PRIOR_ATTEMPTS)
+        avg_ms = (total_ms + decoder.prior_ms * PRIOR_ATTEMPTS) / (attempts + PRIOR_ATTEMPTS)
+        return avg_ms / rate
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            scopes: Dict[str, Dict] = {}
+            for (scope, decoder), (attempts, successes, total_ms) in self._data.items():
+                scopes.setdefault(scope, {})[decoder] = {
+                    "attempts": attempts,
+                    "successes": successes,
+                    "avg_ms": round(total_ms / attempts, 1) if attempts else None,
+                }
+            return {"scopes": scopes, "unavailable": dict(self._unavailable)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._unavailable.clear()
+
+
+decoder_stats = DecoderStats()
+
+
+def _enabled(decoder: Decoder) -> bool:
+    if not decoder_stats.is_available(decoder.name):
+        return False
+    if decoder.replaced_by and not java_fallback:
+        return not decoder_stats.is_available(decoder.replaced_by)
+    return True
+
+
+def decoder_groups(hint: Optional[str] = None) -> List[List[Decoder]]:
+    """
+    Группы декодеров по очереди запуска, внутри группы — по цене.
+    С подсказкой: сначала умеющие её читать, затем остальные как запасные.
+    """
+    available = [d for d in DECODERS if _enabled(d)]
+    if hint is None:
+        return [sorted(available, key=lambda d: decoder_stats.cost("*", d))]
+    capable = sorted((d for d in available if hint in d.symbologies), key=lambda d: decoder_stats.cost(hint, d))
+    rest = sorted((d for d in available if hint not in d.symbologies), key=lambda d: decoder_stats.cost("*", d))
+    return [group for group in (capable, rest) if group]
+
+
+def decoder_order(hint: Optional[str] = None) -> List[Decoder]:
+    """Порядок декодеров для подсказки в режиме cascade"""
+    return [d for group in decoder_groups(hint) for d in group]
+
+
+class DecodeDeadlineExceeded(Exception):
+    """Срок распознавания истёк раньше, чем какой-либо декодер нашёл код"""
+
+
+def _remaining_ms(deadline: Optional[float], limit_ms: Optional[int] = None) -> Optional[int]:
+    if deadline is None:
+        return limit_ms
+    remaining = max(1, int((deadline - time.monotonic()) * 1000))
+    return remaining if limit_ms is None else min(remaining, limit_ms)
+
+
+def _run(decoder: Decoder, img: Image.Image, scopes: List[str], deadline: Optional[float]) -> List[Tuple[str, str]]:
+    started = time.perf_counter()
+    try:
+        found = decoder.fn(img, _remaining_ms(deadline, decoder.max_ms))
+    except ImportError as e:
+        decoder_stats.mark_unavailable(decoder.name, str(e))
+        return []
+    except Exception:
+        found = []
+    decoder_stats.record(scopes, decoder.name, bool(found), (time.perf_counter() - started) * 1000)
+    return found
+
+
+def _cascade(img, group: List[Decoder], scopes: List[str], deadline: Optional[float]) -> List[Tuple[str, str]]:
+    for decoder in group:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DecodeDeadlineExceeded()
+        found = _run(decoder, img, scopes, deadline)
+        if found:
+            return found
+    return []
+
+
+def _race(img, group: List[Decoder], scopes: List[str], deadline: Optional[float]) -> List[Tuple[str, str]]:
+    # Нативный код декодеров отпускает GIL. Запущенный декодер прервать нельзя:
+    # после победы или по сроку его результат просто не ждём, а не начатые отменяем.
+    # Пока потоки пула заняты такими попытками, гонка не ждёт очереди, а идёт по очереди здесь же
+    executor = _reserve(len(group))
+    if executor is None:
+        return _cascade(img, group, scopes, deadline)
+    futures = []
+    for decoder in group:
+        future = executor.submit(_run, decoder, img, scopes, deadline)
+        future.add_done_callback(_release)
+        futures.append(future)
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    try:
+        for future in concurrent.futures.as_completed(futures, timeout=timeout):
+            found = future.result()
+            if found:
+                return found
+    except concurrent.futures.TimeoutError:
+        raise DecodeDeadlineExceeded()
+    finally:
+        for future in futures:
+            future.cancel()
+    return []
+
+
+def run_decoders(img: Image.Image, hint: Optional[str] = None, deadline_ms: Optional[int] = None,
+                 mode: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Распознаёт код декодерами из decoder_groups: в режиме race группа запускается параллельно
+    в общем пуле потоков, в режиме cascade — по очереди до первого результата.
+    deadline_ms — общий срок на все группы; по его истечении — DecodeDeadlineExceeded.
+
+    Returns:
+        [{"text": ..., "type": ...}] — текст уже с обратной транслитерацией
+    """
+    from .transliteration import process_scanned_text
+
+    hint = normalize_type(hint)
+    scopes = ["*", hint] if hint else ["*"]
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+    run_group = _race if (mode or decode_mode) == "race" else _cascade
+    img.load()  # потоки race читают уже загруженные пиксели
+    for group in decoder_groups(hint):
+        found = run_group(img, group, scopes, deadline)
+        if found:
+            return [{"text": process_scanned_text(text), "type": kind} for text, kind in found]
+    return []
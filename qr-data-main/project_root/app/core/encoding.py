@@ -0,0 +1,84 @@
+"""
+Кодирование изображений кодов в байты.
+Коды чёрно-белые, поэтому по умолчанию сохраняются как 1-битный PNG
+(или палитровый PNG, если на коде есть цветной логотип).
+
+Профили:
+    compact   — 1 бит/палитра, zlib уровня 6 (хранилище и история)
+    fast      — 1 бит/палитра, zlib уровня 1 (минимум CPU)
+    smallest  — 1 бит/палитра, zlib уровня 9 + optimize (минимум байт)
+    preview   — WebP без потерь (предпросмотр в браузере)
+    thumbnail — WebP с потерями (миниатюры на странице истории)
+    legacy    — 24-битный PNG с optimize, как раньше
+"""
+
+import io
+from typing import Dict, NamedTuple, Tuple
+
+from PIL import Image
+
+
+class EncodingProfile(NamedTuple):
+    format: str           # 'PNG' | 'WEBP'
+    compact_mode: bool    # сводить к 1 биту / палитре
+    options: Dict
+
+
+PROFILES: Dict[str, EncodingProfile] = {
+    "compact": EncodingProfile("PNG", True, {"compress_level": 6}),
+    "fast": EncodingProfile("PNG", True, {"compress_level": 1}),
+    "smallest": EncodingProfile("PNG", True, {"compress_level": 9, "optimize": True}),
+    "preview": EncodingProfile("WEBP", False, {"lossless": True, "quality": 100, "method": 2}),
+    "thumbnail": EncodingProfile("WEBP", False, {"quality": 80, "method": 4}),
+    "legacy": EncodingProfile("PNG", False, {"optimize": True}),
+}
+
+MIMETYPES = {"PNG": "image/png", "WEBP": "image/webp"}
+EXTENSIONS = {"PNG": "png", "WEBP": "webp"}
+
+
+def compact_image(img: Image.Image) -> Image.Image:
+    """
+    Сводит изображение к 1 биту, если в нём только чёрный и белый,
+    иначе к точной палитре (до 256 цветов). Всегда без потерь.
+    """
+    if img.mode == "1":
+        return img
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+    colors = img.getcolors(256)
+    if colors is None:
+        # Больше 256 цветов (фото, загрузки) — оставляем как есть, без потерь
+        return img
+
+    values = {c for _n, c in colors}
+    bilevel = {0, 255} if img.mode == "L" else {(0, 0, 0), (255, 255, 255)}
+    if values <= bilevel:
+        gray = img if img.mode == "L" else img.convert("L")
+        return gray.point(lambda v: 255 if v > 127 else 0, mode="1")
+    if img.mode == "L":
+        return img
+    return img.quantize(colors=len(colors), method=Image.Quantize.MAXCOVERAGE, dither=Image.Dither.NONE)
+
+
+def get_profile(name: str) -> EncodingProfile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестный профиль кодирования: {name}")
+
+
+def encode_image(img: Image.Image, profile: str = "compact") -> Tuple[bytes, str, str]:
+    """
+    Кодирует изображение по профилю.
+
+    Returns:
+        tuple: (байты, mimetype, расширение файла)
+    """
+    p = get_profile(profile)
+    out_img = compact_image(img) if p.compact_mode else img
+    if p.format == "WEBP" and out_img.mode not in ("RGB", "RGBA", "L"):
+        out_img = out_img.convert("RGB")
+    bio = io.BytesIO()
+    out_img.save(bio, p.format, **p.options)
+    return bio.getvalue(), MIMETYPES[p.format], EXTENSIONS[p.format]
@@ -0,0 +1,96 @@
+"""
+Шрифт для подписи под линейными кодами.
+Путь к шрифту определяется один раз, объекты FreeTypeFont кэшируются по размеру,
+а габариты часто повторяющихся подписей — по (текст, размер).
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from PIL import ImageFont
+
+# Кандидаты по порядку; пути других ОС отбрасываются при первой же проверке
+FONT_CANDIDATES: List[str] = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "arial.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+    "/System/Library/Fonts/Arial.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+]
+
+
+class FontRegistry:
+    """Единожды найденный шрифт, кэш размеров и габаритов текста"""
+
+    def __init__(self, max_metrics: int = 2048):
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._resolved = False
+        self._fonts: Dict[int, ImageFont.ImageFont] = {}
+        self._metrics: "OrderedDict[Tuple[str, int], Tuple[int, int, int, int]]" = OrderedDict()
+        self.max_metrics = max_metrics
+
+    @property
+    def path(self) -> Optional[str]:
+        self.resolve()
+        return self._path
+
+    def resolve(self, configured_path: Optional[str] = None, force: bool = False) -> Optional[str]:
+        """Находит первый загружаемый шрифт: сначала configured_path, затем FONT_CANDIDATES"""
+        with self._lock:
+            if self._resolved and not force:
+                return self._path
+            candidates = [configured_path] if configured_path else []
+            candidates += FONT_CANDIDATES
+            self._path = None
+            for candidate in candidates:
+                if os.path.isabs(candidate) and not os.path.exists(candidate):
+                    continue
+                try:
+                    ImageFont.truetype(candidate, 12)
+                except OSError:
+                    continue
+                self._path = candidate
+                break
+            self._fonts.clear()
+            self._metrics.clear()
+            self._resolved = True
+            return self._path
+
+    def font(self, size: int) -> ImageFont.ImageFont:
+        """FreeTypeFont нужного размера; встроенный шрифт PIL, если TrueType не найден"""
+        cached = self._fonts.get(size)
+        if cached is not None:
+            return cached
+        path = self.path
+        if path:
+            font = ImageFont.truetype(path, size)
+        else:
+            try:
+                font = ImageFont.load_default(size)
+            except TypeError:
+                font = ImageFont.load_default()
+        with self._lock:
+            self._fonts[size] = font
+        return font
+
+    def text_bbox(self, text: str, size: int) -> Tuple[int, int, int, int]:
+        """Габариты текста (как ImageDraw.textbbox от (0, 0)), с кэшем для повторяющихся подписей"""
+        key = (text, size)
+        with self._lock:
+            bbox = self._metrics.get(key)
+            if bbox is not None:
+                self._metrics.move_to_end(key)
+                return bbox
+        bbox = tuple(int(v) for v in self.font(size).getbbox(text))
+        with self._lock:
+            self._metrics[key] = bbox
+            while len(self._metrics) > self.max_metrics:
+                self._metrics.popitem(last=False)
+        return bbox
+
+
+font_registry = FontRegistry()
@@ -0,0 +1,210 @@
+"""
+Фоновые задачи в процессе приложения.
+Состояние задач хранится в таблице jobs (SQLite), выполняются они в ограниченном
+пуле потоков, а файлы результатов складываются в STORAGE_DIR/jobs/<id>/.
+
+Каждая задача помечена процессом-исполнителем; пока в процессе есть задачи, он раз
+в heartbeat_seconds обновляет их heartbeat_at. Незавершённые задачи без сигнала дольше
+stale_seconds (процесс упал или перезапущен) помечаются ошибкой — любым процессом,
+при старте и при периодической уборке, — а задачи соседних живых процессов не трогаются.
+
+Обработчик задачи регистрируется декоратором @job_handler("вид") и получает
+(JobContext, параметры); возвращает словарь результата (JSON), а файл
+результата — через ctx.set_artifact().
+"""
+
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from ..models.jobs import (
+    create_job, mark_job_running, update_job_progress, finish_job, fail_job,
+    delete_jobs_older_than_hours, touch_jobs, fail_stale_jobs,
+)
+
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+PROGRESS_INTERVAL = 0.25   # не чаще, чем раз в столько секунд пишем прогресс в БД
+CLEANUP_INTERVAL = 600     # как часто удаляем старые задачи (секунды)
+
+
+def job_handler(kind: str):
+    """Регистрирует обработчик задач вида kind"""
+    def decorator(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return decorator
+
+
+class JobContext:
+    """То, что видит обработчик: каталог задачи, прогресс и файл результата"""
+
+    def __init__(self, job_id: str, job_dir: str):
+        self.job_id = job_id
+        self.job_dir = job_dir
+        self.artifact = None
+        self._last_progress = 0.0
+
+    def path(self, filename: str) -> str:
+        """Путь к файлу внутри каталога задачи"""
+        os.makedirs(self.job_dir, exist_ok=True)
+        return os.path.join(self.job_dir, os.path.basename(filename))
+
+    def progress(self, done: int, total: Optional[int] = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_progress < PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        update_job_progress(self.job_id, done, total)
+
+    def set_artifact(self, path: str, download_name: str, mimetype: str) -> None:
+        self.artifact = (path, download_name, mimetype)
+
+
+class JobManager:
+    """Очередь задач: ограниченный пул потоков и лимит ожидающих задач"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._last_cleanup = 0.0
+        self.app = None
+        self.workers = 2
+        self.max_pending = 32
+        self.retention_hours = 24
+        self.heartbeat_seconds = 10.0
+        self.stale_seconds = 60.0
+        self.jobs_dir = ""
+        self._owner = ""
+        self._owner_pid = 0
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.workers = max(1, int(app.config.get("JOB_WORKERS", 2)))
+        self.max_pending = max(1, int(app.config.get("JOB_MAX_PENDING", 32)))
+        self.retention_hours = int(app.config.get("JOB_RETENTION_HOURS", 24))
+        self.heartbeat_seconds = float(app.config.get("JOB_HEARTBEAT_SECONDS", 10))
+        self.stale_seconds = max(float(app.config.get("JOB_STALE_SECONDS", 60)), self.heartbeat_seconds * 3)
+        self.jobs_dir = app.config["STORAGE_JOBS_DIR"]
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        with app.app_context():
+            fail_stale_jobs(self.stale_seconds)
+
+    @property
+    def owner(self) -> str:
+        """Метка процесса-исполнителя; после fork (gunicorn --preload) у потомка своя"""
+        pid = os.getpid()
+        if self._owner_pid != pid:
+            self._owner = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+            self._owner_pid = pid
+            self._heartbeat = None
+        return self._owner
+
+    def _ensure_heartbeat(self) -> None:
+        owner = self.owner
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, args=(owner,),
+                                               name="job-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def _heartbeat_loop(self, owner: str) -> None:
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                busy = self._pending > 0
+            if not busy:
+                continue
+            try:
+                with self.app.app_context():
+                    touch_jobs(owner)
+            except Exception:
+                self.app.logger.exception("Не удалось обновить сигнал фоновых задач")
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            return self._executor
+
+    def job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, kind: str, params: Dict, user_id: Optional[int] = None, total: int = 0,
+               inputs: Optional[Dict] = None) -> str:
+        """
+        Ставит задачу в очередь (вызывать внутри запроса).
+        inputs — {имя файла: FileStorage или bytes}, сохраняются в каталог задачи до постановки.
+
+        Returns:
+            id задачи
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Неизвестный вид задачи: {kind}")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise RuntimeError("Очередь задач переполнена, повторите позже")
+            self._pending += 1
+
+        try:
+            self._maybe_cleanup()
+            job_id = uuid.uuid4().hex
+            if inputs:
+                ctx = JobContext(job_id, self.job_dir(job_id))
+                for name, data in inputs.items():
+                    if isinstance(data, bytes):
+                        with open(ctx.path(name), "wb") as f:
+                            f.write(data)
+                    else:
+                        data.save(ctx.path(name))
+            create_job(job_id, user_id, kind, total, owner=self.owner)
+            self._ensure_heartbeat()
+            self._get_executor().submit(self._run, job_id, kind, params)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        return job_id
+
+    def _run(self, job_id: str, kind: str, params: Dict) -> None:
+        # Запросный контекст нужен обработчикам для get_db() и url_for()
+        try:
+            with self.app.test_request_context():
+                ctx = JobContext(job_id, self.job_dir(job_id))
+                try:
+                    mark_job_running(job_id)
+                    result = JOB_HANDLERS[kind](ctx, params)
+                    path, name, mimetype = ctx.artifact or (None, None, None)
+                    finish_job(job_id, result, path, name, mimetype)
+                except Exception as e:
+                    self.app.logger.exception("Задача %s (%s) завершилась ошибкой", job_id, kind)
+                    fail_job(job_id, f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _maybe_cleanup(self) -> None:
+        now = time.monotonic()
+        if now - self._last_cleanup < CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        fail_stale_jobs(self.stale_seconds)
+        for job_id in delete_jobs_older_than_hours(self.retention_hours):
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
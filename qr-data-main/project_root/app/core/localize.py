@@ -0,0 +1,134 @@
+"""
+Поиск областей, похожих на код, чтобы декодеры разбирали небольшие вырезки, а не весь кадр.
+Кандидаты по убыванию уверенности:
+  - cv2.QRCodeDetector.detectMulti — найденные QR;
+  - cv2.barcode.BarcodeDetector (OpenCV >= 4.8) — линейные коды;
+  - градиенты и морфология: участки с высокой плотностью резких перепадов яркости
+    (модули DataMatrix/Aztec/QR, штрихи Code128/PDF417), выделенные контурами.
+Анализ идёт на копии не больше ANALYSIS_PX по длинной стороне, вырезки — из переданного изображения.
+Без OpenCV возвращается пустой список: decode_pyramid тогда разбирает только кадр целиком.
+"""
+
+from typing import List, NamedTuple, Tuple
+
+from PIL import Image
+
+ANALYSIS_PX = 512
+MAX_REGIONS = 3
+PAD = 0.15          # запас вокруг области, доля её длинной стороны
+MIN_AREA = 0.002    # доля кадра: меньше — шум
+MAX_AREA = 0.6      # доля кадра: больше — код и так занимает почти весь кадр
+MAX_ASPECT = 8.0
+MIN_CROP_PX = 32
+EDGE_PERCENTILE = 90  # перепадом считается градиент из верхних 10% кадра...
+EDGE_FLOOR = 40.0     # ...но не слабее этого (однотонный кадр — не код)
+EDGE_DENSITY = 0.35   # доля перепадов в окне, с которой окно считается частью кода
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom
+
+
+class Region(NamedTuple):
+    box: Box        # в пикселях изображения, переданного в find_regions
+    score: float    # 0..1, детекторы OpenCV выше градиентного поиска
+    source: str     # "qr", "barcode" или "gradient"
+
+
+def _points_box(points) -> Box:
+    xs, ys = points[:, 0], points[:, 1]
+    return int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+
+
+def _detector_regions(cv2, gray) -> List[Tuple[Box, float, str]]:
+    found = []
+    try:
+        ok, points = cv2.QRCodeDetector().detectMulti(gray)
+        if ok and points is not None:
+            found += [(_points_box(p), 1.0, "qr") for p in points]
+    except cv2.error:
+        pass
+    if hasattr(cv2, "barcode"):
+        try:
+            ok, points = cv2.barcode.BarcodeDetector().detectMulti(gray)
+            if ok and points is not None:
+                found += [(_points_box(p), 0.9, "barcode") for p in points]
+        except cv2.error:
+            pass
+    return found
+
+
+def _gradient_regions(cv2, np, gray) -> List[Tuple[Box, float, str]]:
+    height, width = gray.shape
+    total = float(height * width)
+    gx = cv2.Sobel(gray, cv2.CV_32F, 1, 0, ksize=3)
+    gy = cv2.Sobel(gray, cv2.CV_32F, 0, 1, ksize=3)
+    # Модуль градиента, а не |gx| - |gy|: ищем и двумерные коды, и штрихи любой ориентации
+    magnitude = cv2.magnitude(gx, gy)
+    edges = (magnitude > max(float(np.percentile(magnitude, EDGE_PERCENTILE)), EDGE_FLOOR)).astype(np.float32)
+    # Код — это плотная россыпь перепадов; у коробок и полок перепады только по краям
+    side = max(5, min(height, width) // 40)
+    density = cv2.blur(edges, (side, side))
+    mask = (density > EDGE_DENSITY).astype(np.uint8) * 255
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (side, side)))
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    found = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = w * h / total
+        if not MIN_AREA <= area <= MAX_AREA or max(w, h) / max(1, min(w, h)) > MAX_ASPECT:
+            continue
+        found.append(((x, y, x + w, y + h), 0.8 * float(density[y:y + h, x:x + w].mean()), "gradient"))
+    return found
+
+
+def _overlap(a: Box, b: Box) -> float:
+    """Доля меньшей области, покрытая пересечением"""
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return w * h / float(max(1, smaller))
+
+
+def find_regions(img: Image.Image, max_regions: int = MAX_REGIONS, pad: float = PAD) -> List[Region]:
+    """Области-кандидаты по убыванию уверенности, с запасом pad; пустой список без OpenCV"""
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return []
+
+    analysis = img.convert("L")
+    analysis.thumbnail((ANALYSIS_PX, ANALYSIS_PX), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    scale = img.width / float(analysis.width)
+    gray = np.asarray(analysis)
+
+    candidates = sorted(_detector_regions(cv2, gray) + _gradient_regions(cv2, np, gray),
+                        key=lambda c: c[1], reverse=True)
+    regions: List[Region] = []
+    for box, score, source in candidates:
+        if any(_overlap(box, r.box) > 0.7 for r in regions):
+            continue
+        regions.append(Region(box, score, source))
+        if len(regions) >= max_regions:
+            break
+
+    result = []
+    for box, score, source in regions:
+        margin = pad * max(box[2] - box[0], box[3] - box[1])
+        left = max(0, int((box[0] - margin) * scale))
+        top = max(0, int((box[1] - margin) * scale))
+        right = min(img.width, int((box[2] + margin) * scale) + 1)
+        bottom = min(img.height, int((box[3] + margin) * scale) + 1)
+        if min(right - left, bottom - top) < MIN_CROP_PX:
+            continue
+        if (right - left) * (bottom - top) >= MAX_AREA * img.width * img.height:
+            continue
+        result.append(Region((left, top, right, bottom), round(score, 3), source))
+    return result
+
+
+def region_crops(img: Image.Image, max_regions: int = MAX_REGIONS) -> List[Image.Image]:
+    """Вырезки областей-кандидатов в порядке уверенности"""
+    return [img.crop(region.box) for region in find_regions(img, max_regions)]
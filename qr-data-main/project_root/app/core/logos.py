@@ -0,0 +1,139 @@
+"""
+Логотипы для наложения на QR-коды.
+Файл логотипа читается один раз, а готовые RGBA-накладки и маски
+кэшируются по (размер логотипа, уровень коррекции) в LRU, ограниченном по байтам:
+размер QR приходит из запроса, и без предела кэш рос бы от перебора размеров.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+DEFAULT_LOGO_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "static", "star.png"))
+
+# Доля стороны QR-кода под логотип в зависимости от уровня коррекции:
+# H (30%) ~1/5, Q (25%) ~1/6, M (15%) ~1/7, L (7%) ~1/8
+LOGO_DIVISORS = {"H": 5, "Q": 6, "M": 7, "L": 8}
+
+
+class LogoRegistry:
+    """Реестр логотипов: исходники по имени и кэш масштабированных накладок"""
+
+    def __init__(self, max_overlay_bytes: int = 16 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._sources: Dict[str, Image.Image] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._overlays: "OrderedDict[Tuple[str, int, str], Tuple[tuple, int]]" = OrderedDict()
+        self._overlay_bytes = 0
+        self.max_overlay_bytes = max_overlay_bytes
+        self._default_loaded = False
+        self.default_name = "default"
+
+    def register(self, name: str, path: str) -> None:
+        """Регистрирует логотип из файла (например, свой логотип площадки при старте)"""
+        with open(path, "rb") as f:
+            raw = f.read()
+        with Image.open(path) as src:
+            logo = src.convert("RGBA")
+        with self._lock:
+            self._sources[name] = logo
+            self._fingerprints[name] = hashlib.sha1(raw).hexdigest()[:12]
+            self._drop_overlays(name)
+            if name == self.default_name:
+                self._default_loaded = True
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._sources.pop(name, None)
+            self._fingerprints.pop(name, None)
+            self._drop_overlays(name)
+            if name == self.default_name:
+                self._default_loaded = True
+
+    def _drop_overlays(self, name: str) -> None:
+        for key in [k for k in self._overlays if k[0] == name]:
+            self._overlay_bytes -= self._overlays.pop(key)[1]
+
+    def _cached(self, key: Tuple[str, int, str]) -> Optional[tuple]:
+        with self._lock:
+            item = self._overlays.get(key)
+            if item is None:
+                return None
+            self._overlays.move_to_end(key)
+            return item[0]
+
+    def _remember(self, key: Tuple[str, int, str], result: tuple, nbytes: int) -> None:
+        with self._lock:
+            if nbytes > self.max_overlay_bytes:
+                return
+            old = self._overlays.pop(key, None)
+            if old is not None:
+                self._overlay_bytes -= old[1]
+            self._overlays[key] = (result, nbytes)
+            self._overlay_bytes += nbytes
+            while self._overlay_bytes > self.max_overlay_bytes:
+                _key, (_result, size) = self._overlays.popitem(last=False)
+                self._overlay_bytes -= size
+
+    def _ensure_default(self) -> None:
+        if self._default_loaded:
+            return
+        if os.path.exists(DEFAULT_LOGO_PATH):
+            self.register(self.default_name, DEFAULT_LOGO_PATH)
+        else:
+            self._default_loaded = True
+
+    def fingerprint(self, name: Optional[str] = None) -> str:
+        """Короткий хеш логотипа для ключей кэша; пустая строка, если логотипа нет"""
+        name = name or self.default_name
+        if name == self.default_name:
+            self._ensure_default()
+        return self._fingerprints.get(name, "")
+
+    def vector_asset(self, name: Optional[str] = None, px: int = 128) -> Optional[Tuple[Image.Image, bytes]]:
+        """Уменьшенный логотип (RGBA) и его PNG для встраивания в SVG/PDF"""
+        name = name or self.default_name
+        if name == self.default_name:
+            self._ensure_default()
+        key = (name, px, "png")
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        scaled = source.resize((px, px), Image.LANCZOS) if source.width > px else source
+        bio = io.BytesIO()
+        scaled.save(bio, "PNG", optimize=True)
+        result = (scaled, bio.getvalue())
+        self._remember(key, result, scaled.width * scaled.height * 4 + len(result[1]))
+        return result
+
+    def overlay(self, qr_size: int, ecc: str, name: Optional[str] = None) -> Optional[Tuple[Image.Image, Image.Image]]:
+        """
+        Возвращает (накладка RGBA, маска) для QR-кода стороной qr_size
+        или None, если логотип не зарегистрирован.
+        """
+        name = name or self.default_name
+        if name == self.default_name:
+            self._ensure_default()
+        logo_size = max(1, qr_size // LOGO_DIVISORS.get(ecc, LOGO_DIVISORS["L"]))
+        key = (name, logo_size, ecc)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        source = self._sources.get(name)
+        if source is None:
+            return None
+        resized = source.resize((logo_size, logo_size), Image.LANCZOS)
+        result = (resized, resized.getchannel("A"))
+        self._remember(key, result, logo_size * logo_size * 5)  # RGBA + маска
+        return result
+
+
+logo_registry = LogoRegistry()
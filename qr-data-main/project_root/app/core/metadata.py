@@ -0,0 +1,165 @@
+"""
+Удаление метаданных из загруженных фото без перекодирования.
+Загрузки отдаются по /scan/upload без авторизации, а EXIF фото с телефона содержит
+координаты GPS, модель устройства и время съёмки. Пиксели не трогаем: вырезаются
+только блоки метаданных, поэтому JPEG не теряет качества, а сохранение остаётся дешёвым.
+Из EXIF сохраняется один тег — Orientation: без него фото с телефона показывалось бы повёрнутым;
+он записывается заново минимальным блоком EXIF, остальные теги не переносятся.
+
+    JPEG — остаются APP0 (JFIF), APP2 с ICC-профилем и APP14 (Adobe, нужен для цвета);
+           прочие APPn (EXIF, XMP, IPTC, MPF) и комментарии удаляются, данные после
+           первого EOI (вложенные превью и карты глубины со своим EXIF) отбрасываются;
+    PNG  — удаляются eXIf, tEXt, zTXt, iTXt и tIME;
+    WebP — удаляются EXIF и XMP, флаги в VP8X сбрасываются.
+Неразборчивый файл — ValueError: вызывающий код тогда перекодирует изображение.
+"""
+
+import io
+import struct
+import zlib
+from typing import Optional
+
+from PIL import Image
+
+_JPEG_KEEP_APP = {0xE0, 0xEE}
+_JPEG_ICC = b"ICC_PROFILE\x00"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_DROP = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_WEBP_DROP = {b"EXIF", b"XMP "}
+_VP8X_EXIF, _VP8X_XMP = 0x08, 0x04
+ORIENTATION = 0x0112
+
+
+def _orientation_tiff(data: bytes) -> Optional[bytes]:
+    """Блок EXIF (TIFF без префикса "Exif\\0\\0") только с тегом Orientation; None — поворота нет"""
+    try:
+        with Image.open(io.BytesIO(data)) as src:
+            orientation = src.getexif().get(ORIENTATION, 1)
+    except Exception:
+        return None
+    if orientation not in range(2, 9):
+        return None
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    return exif.tobytes()[6:]
+
+
+def _strip_jpeg(data: bytes, exif_tiff: Optional[bytes]) -> bytes:
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Нет маркера SOI")
+    out = [data[:2]]
+    pos, n = 2, len(data)
+    while pos < n:
+        if data[pos] != 0xFF:
+            raise ValueError("Ожидался маркер JPEG")
+        marker = data[pos + 1] if pos + 1 < n else None
+        if marker is None:
+            raise ValueError("Обрезанный JPEG")
+        if marker == 0xFF:  # заполняющие байты перед маркером
+            pos += 1
+            continue
+        if marker == 0xD9:
+            out.append(data[pos:pos + 2])
+            if exif_tiff:
+                # APP1 сразу после SOI или после JFIF APP0
+                app1 = b"Exif\x00\x00" + exif_tiff
+                at = 2 if len(out) > 1 and out[1][1] == 0xE0 else 1
+                out.insert(at, b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1)
+            return b"".join(out)
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+        if pos + 4 > n:
+            raise ValueError("Обрезанный JPEG")
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        end = pos + 2 + length
+        if length < 2 or end > n:
+            raise ValueError("Неверная длина сегмента JPEG")
+        segment = data[pos:end]
+        if marker == 0xDA:
+            # Сжатые данные скана идут до первого маркера, кроме FF00 (экранирование) и RSTn
+            scan = end
+            while True:
+                scan = data.find(b"\xff", scan)
+                if scan < 0 or scan + 1 >= n:
+                    raise ValueError("Нет маркера EOI")
+                following = data[scan + 1]
+                if following == 0x00 or 0xD0 <= following <= 0xD7:
+                    scan += 2
+                    continue
+                break
+            out.append(data[pos:scan])
+            pos = scan
+            continue
+        keep = not (0xE0 <= marker <= 0xEF or marker == 0xFE) or marker in _JPEG_KEEP_APP \
+            or (marker == 0xE2 and segment[4:4 + len(_JPEG_ICC)] == _JPEG_ICC)
+        if keep:
+            out.append(segment)
+        pos = end
+    raise ValueError("Нет маркера EOI")
+
+
+def _strip_png(data: bytes, exif_tiff: Optional[bytes]) -> bytes:
+    if data[:8] != _PNG_SIGNATURE:
+        raise ValueError("Нет сигнатуры PNG")
+    out = [data[:8]]
+    pos, n = 8, len(data)
+    while pos < n:
+        if pos + 8 > n:
+            raise ValueError("Обрезанный PNG")
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if end > n:
+            raise ValueError("Неверная длина блока PNG")
+        if kind not in _PNG_DROP:
+            out.append(data[pos:end])
+        if kind == b"IHDR" and exif_tiff:
+            out.append(struct.pack(">I4s", len(exif_tiff), b"eXIf") + exif_tiff
+                       + struct.pack(">I", zlib.crc32(b"eXIf" + exif_tiff)))
+        pos = end
+        if kind == b"IEND":
+            return b"".join(out)
+    raise ValueError("Нет блока IEND")
+
+
+def _strip_webp(data: bytes, exif_tiff: Optional[bytes]) -> bytes:
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        raise ValueError("Нет заголовка RIFF/WEBP")
+    chunks = []
+    extended = False
+    pos, n = 12, min(len(data), 8 + struct.unpack("<I", data[4:8])[0])
+    while pos + 8 <= n:
+        kind, length = struct.unpack("<4sI", data[pos:pos + 8])
+        end = pos + 8 + length + (length & 1)
+        if pos + 8 + length > n:
+            raise ValueError("Неверная длина блока WebP")
+        if kind == b"VP8X":
+            chunk = bytearray(data[pos:end])
+            chunk[8] &= ~(_VP8X_EXIF | _VP8X_XMP) & 0xFF
+            if exif_tiff:
+                chunk[8] |= _VP8X_EXIF
+            chunks.append(bytes(chunk))
+            extended = True
+        elif kind not in _WEBP_DROP:
+            chunks.append(data[pos:end])
+        pos = end
+    if exif_tiff and extended:
+        # EXIF бывает только в расширенном формате (VP8X) и идёт после данных изображения
+        chunks.append(struct.pack("<4sI", b"EXIF", len(exif_tiff)) + exif_tiff + b"\x00" * (len(exif_tiff) & 1))
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+_STRIPPERS = {"JPEG": _strip_jpeg, "PNG": _strip_png, "WEBP": _strip_webp}
+
+
+def strip_metadata(data: bytes, image_format: str) -> bytes:
+    """
+    Байты изображения без метаданных, кроме Orientation (image_format — PIL: "JPEG", "PNG", "WEBP").
+    ValueError — формат не поддерживается или файл не разобрать.
+    """
+    stripper = _STRIPPERS.get(image_format)
+    if stripper is None:
+        raise ValueError(f"Формат {image_format} не поддерживается")
+    return stripper(data, _orientation_tiff(data))
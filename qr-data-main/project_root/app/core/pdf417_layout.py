@@ -0,0 +1,127 @@
+"""
+Подбор геометрии PDF417 (ГОСТ Р ИСО/МЭК 15438) под размер ГОСТ.
+По числу кодовых слов данных выбираются столбцы, строки, уровень коррекции
+и целый шаг модуля в пикселях, чтобы символ рисовался без масштабирования.
+"""
+
+import math
+from typing import NamedTuple, Optional
+
+from .gost_dimensions import get_dimension_by_code
+
+DPI = 300
+ROW_RATIO = 3          # высота строки в модулях
+QUIET_MODULES = 2      # тихая зона с каждой стороны
+MIN_ROWS, MAX_ROWS = 3, 90
+MAX_COLUMNS = 30
+MAX_CODEWORDS = 928    # все кодовые слова символа, включая коррекцию (ISO/IEC 15438)
+
+# Соотношение сторон без ГОСТ-размера: как у PDF417-S2 (35 x 15 мм)
+DEFAULT_ASPECT = 35.0 / 15.0
+
+
+class PDF417Layout(NamedTuple):
+    """Выбранная геометрия PDF417"""
+    columns: int            # столбцы данных
+    rows: int               # строки
+    security_level: int     # уровень коррекции 0..8
+    module_px: int          # ширина модуля в пикселях
+    row_px: int             # высота строки в пикселях
+    width_px: int           # ширина символа с тихой зоной
+    height_px: int          # высота символа с тихой зоной
+    target_width_px: int    # ширина области ГОСТ
+    target_height_px: int   # высота области ГОСТ
+    data_codewords: int     # кодовые слова данных (без длины, заполнения и коррекции)
+    fits: bool              # помещается ли символ в область
+
+    @property
+    def width_mm(self) -> float:
+        return self.width_px * 25.4 / DPI
+
+    @property
+    def height_mm(self) -> float:
+        return self.height_px * 25.4 / DPI
+
+
+def payload_codewords(text: str) -> int:
+    """Число кодовых слов данных после уплотнения (text/numeric/byte) pdf417gen"""
+    from pdf417gen.encoding import compact, to_bytes
+
+    return len(list(compact(to_bytes(text, "utf-8"))))
+
+
+def recommended_security_level(data_codewords: int) -> int:
+    """Рекомендуемый минимум уровня коррекции по числу кодовых слов данных"""
+    if data_codewords <= 40:
+        return 2
+    if data_codewords <= 160:
+        return 3
+    if data_codewords <= 320:
+        return 4
+    return 5
+
+
+def _target_px(size: int, gost_code: Optional[str]):
+    if gost_code:
+        try:
+            dim = get_dimension_by_code(gost_code)
+            return round(dim.mm_width * DPI / 25.4), round(dim.mm_height * DPI / 25.4)
+        except ValueError:
+            pass
+    return round(size * DEFAULT_ASPECT), size
+
+
+def _rows_for(data_codewords: int, columns: int, security_level: int) -> Optional[int]:
+    ec = 2 ** (security_level + 1)
+    total = data_codewords + ec + 1
+    rows = math.ceil(total / columns)
+    if not MIN_ROWS <= rows <= MAX_ROWS or rows * columns > MAX_CODEWORDS:
+        return None
+    return rows
+
+
+def solve_layout(data_codewords: int, target_width_px: int, target_height_px: int,
+                 security_level: Optional[int] = None) -> PDF417Layout:
+    """
+    Выбирает геометрию: символ должен поместиться в область при наибольшем целом
+    шаге модуля, среди равных — с наименьшей площадью. Уровень коррекции берётся
+    рекомендуемый (или заданный) и понижается, только если символ иначе не помещается.
+    Если не помещается ни при каком уровне, возвращается вариант с шагом 1 и наименьшей площадью
+    среди всех уровней (при равной площади — с более высоким уровнем).
+    ValueError — данные не помещаются в PDF417 ни при какой геометрии.
+    """
+    top = security_level if security_level is not None else recommended_security_level(data_codewords)
+    fallback = None
+    for level in range(top, -1, -1):
+        best = None
+        for columns in range(1, MAX_COLUMNS + 1):
+            rows = _rows_for(data_codewords, columns, level)
+            if rows is None:
+                continue
+            w_mod = 17 * columns + 69 + 2 * QUIET_MODULES
+            h_mod = rows * ROW_RATIO + 2 * QUIET_MODULES
+            pitch = min(target_width_px // w_mod, target_height_px // h_mod)
+            area = w_mod * h_mod * max(1, pitch) ** 2
+            candidate = (pitch, -area, columns, rows, w_mod, h_mod)
+            if pitch >= 1 and (best is None or candidate[:2] > best[:2]):
+                best = candidate
+            w_area = w_mod * h_mod
+            if fallback is None or w_area < fallback[1]:
+                fallback = (level, w_area, columns, rows, w_mod, h_mod)
+        if best is not None:
+            pitch, _area, columns, rows, w_mod, h_mod = best
+            return PDF417Layout(columns, rows, level, pitch, pitch * ROW_RATIO, w_mod * pitch, h_mod * pitch,
+                                target_width_px, target_height_px, data_codewords, True)
+
+    if fallback is None:
+        raise ValueError("Данные слишком длинные для PDF417")
+    level, _area, columns, rows, w_mod, h_mod = fallback
+    return PDF417Layout(columns, rows, level, 1, ROW_RATIO, w_mod, h_mod,
+                        target_width_px, target_height_px, data_codewords, False)
+
+
+def plan_pdf417(text: str, size: int = 300, gost_code: Optional[str] = None,
+                security_level: Optional[int] = None) -> PDF417Layout:
+    """Геометрия PDF417 для текста без отрисовки (dry-run)"""
+    target_w, target_h = _target_px(size, gost_code)
+    return solve_layout(payload_codewords(text), target_w, target_h, security_level)
@@ -0,0 +1,108 @@
+"""
+Пирамида разрешений для распознавания.
+Фото с телефона (до 20 МБ) сначала распознаётся уменьшенным до 1024 px по длинной стороне;
+JPEG при этом декодируется сразу в уменьшенном масштабе (draft), без полного декодирования.
+Следующий уровень открывается, только если меньший ничего не нашёл; последний — полное разрешение.
+На каждом уровне сначала разбираются вырезки областей-кандидатов (localize.py), затем кадр целиком.
+Успехи по уровням копятся в pyramid_stats, чтобы подбирать SCAN_PYRAMID_LEVELS.
+"""
+
+import io
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from PIL import Image
+
+FULL = "full"
+DEFAULT_LEVELS = (1024, 2048)
+
+
+def parse_levels(value: Union[str, Iterable[int], None]) -> Tuple[int, ...]:
+    """Стороны уровней по возрастанию из "1024,2048" или списка; полное разрешение подразумевается"""
+    if value is None:
+        return DEFAULT_LEVELS
+    if isinstance(value, str):
+        value = [part for part in value.replace(";", ",").split(",") if part.strip()]
+    return tuple(sorted({int(px) for px in value if int(px) > 0}))
+
+
+def open_level(data: bytes, max_side: Optional[int] = None) -> Image.Image:
+    """RGB-изображение с длинной стороной не больше max_side (None — полное разрешение)"""
+    with Image.open(io.BytesIO(data)) as src:
+        if max_side:
+            # JPEG: декодер сам уменьшает в 2/4/8 раз, не меньше запрошенного размера
+            src.draft("RGB", (max_side, max_side))
+        img = src.convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return img
+
+
+def level_name(max_side: Optional[int]) -> str:
+    return str(max_side) if max_side else FULL
+
+
+class PyramidStats:
+    """Попытки и успехи распознавания по уровням пирамиды"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, List[int]] = {}
+
+    def record(self, level: str, ok: bool) -> None:
+        with self._lock:
+            entry = self._data.setdefault(level, [0, 0])
+            entry[0] += 1
+            entry[1] += 1 if ok else 0
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {level: {"attempts": a, "successes": s} for level, (a, s) in self._data.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+pyramid_stats = PyramidStats()
+
+
+def decode_pyramid(data: bytes, hint: Optional[str] = None, deadline_ms: Optional[int] = None,
+                   levels: Iterable[int] = DEFAULT_LEVELS,
+                   max_regions: int = 0) -> Tuple[List[Dict[str, str]], Optional[str]]:
+    """
+    Распознаёт изображение по уровням от меньшего к полному разрешению.
+    Уровни не меньше исходного размера пропускаются. deadline_ms — общий срок на все уровни;
+    max_regions — сколько вырезок-кандидатов пробовать на уровне до кадра целиком (0 — не искать).
+
+    Returns:
+        (результаты decode_auto, имя удачного уровня: "1024", ..., "full", с "/crop" — по вырезке;
+        None — код не найден)
+    """
+    from .codes import decode_auto
+    from .decoders import DecodeDeadlineExceeded
+    from .localize import region_crops
+
+    with Image.open(io.BytesIO(data)) as probe:
+        longest = max(probe.size)
+    steps: List[Optional[int]] = [px for px in levels if px < longest]
+    steps.append(None)
+
+    deadline = time.monotonic() + deadline_ms / 1000 if deadline_ms else None
+    for max_side in steps:
+        img = open_level(data, max_side)
+        level = level_name(max_side)
+        candidates = [(crop, f"{level}/crop") for crop in region_crops(img, max_regions)] if max_regions else []
+        candidates.append((img, level))
+        for candidate, name in candidates:
+            remaining = None
+            if deadline is not None:
+                remaining = int((deadline - time.monotonic()) * 1000)
+                if remaining <= 0:
+                    raise DecodeDeadlineExceeded()
+            results = decode_auto(candidate, hint, remaining)
+            pyramid_stats.record(name, bool(results))
+            if results:
+                return results, name
+    return [], None
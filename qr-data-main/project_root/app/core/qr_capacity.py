@@ -0,0 +1,157 @@
+"""
+Таблица ёмкости QR-кода (ГОСТ Р ИСО/МЭК 18004) и выбор уровня коррекции и версии.
+Версия и уровень коррекции подбираются до кодирования по длине сегментов в битах,
+поэтому генератору не нужны пробные кодирования.
+"""
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Режимы сегментов (совпадают с индикаторами режима стандарта и константами qrcode)
+MODE_NUMBER = 1
+MODE_ALPHA_NUM = 2
+MODE_8BIT_BYTE = 4
+
+ALPHA_NUM = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+ECC_ORDER = ["H", "Q", "M", "L"]
+
+# Число информационных кодовых слов (байт) для версий 1..40
+QR_DATA_CODEWORDS: Dict[str, List[int]] = {
+    "L": [19, 34, 55, 80, 108, 136, 156, 194, 232, 274, 324, 370, 428, 461, 523, 589, 647, 721, 795, 861,
+          932, 1006, 1094, 1174, 1276, 1370, 1468, 1531, 1631, 1735, 1843, 1955, 2071, 2191, 2306, 2434,
+          2566, 2702, 2812, 2956],
+    "M": [16, 28, 44, 64, 86, 108, 124, 154, 182, 216, 254, 290, 334, 365, 415, 453, 507, 563, 627, 669,
+          714, 782, 860, 914, 1000, 1062, 1128, 1193, 1267, 1373, 1455, 1541, 1631, 1725, 1812, 1914,
+          1992, 2102, 2216, 2334],
+    "Q": [13, 22, 34, 48, 62, 76, 88, 110, 132, 154, 180, 206, 244, 261, 295, 325, 367, 397, 445, 485,
+          512, 568, 614, 664, 718, 754, 808, 871, 911, 985, 1033, 1115, 1171, 1231, 1286, 1354, 1426,
+          1502, 1582, 1666],
+    "H": [9, 16, 26, 36, 46, 60, 66, 86, 100, 122, 140, 158, 180, 197, 223, 253, 283, 313, 341, 385,
+          406, 442, 464, 514, 538, 596, 628, 661, 701, 745, 793, 845, 901, 961, 986, 1054, 1096, 1142,
+          1222, 1276],
+}
+
+# Диапазоны версий, внутри которых длина поля счётчика символов постоянна
+_VERSION_RANGES = [(1, 9), (10, 26), (27, 40)]
+_COUNT_BITS = {
+    MODE_NUMBER: (10, 12, 14),
+    MODE_ALPHA_NUM: (9, 11, 13),
+    MODE_8BIT_BYTE: (8, 16, 16),
+}
+
+# Минимальная длина серии цифр/алфавитно-цифровых символов для отдельного сегмента
+# (то же значение, что у qrcode.QRCode.add_data по умолчанию)
+SEGMENT_MINIMUM = 20
+
+
+class QRPlan(NamedTuple):
+    """Выбранные параметры QR-кода"""
+    ecc: str                                # 'H' | 'Q' | 'M' | 'L'
+    version: int                            # 1..40
+    data_bits: int                          # длина данных в битах для этой версии
+    capacity_bits: int                      # ёмкость версии при этом уровне коррекции
+    segments: List[Tuple[int, bytes]]       # (режим, данные)
+
+
+def _segment_data_bits(mode: int, length: int) -> int:
+    if mode == MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if mode == MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def _split(data: bytes, pattern) -> List[Tuple[bool, bytes]]:
+    parts = []
+    while data:
+        match = pattern.search(data)
+        if not match:
+            break
+        start, end = match.start(), match.end()
+        if start:
+            parts.append((False, data[:start]))
+        parts.append((True, data[start:end]))
+        data = data[end:]
+    if data:
+        parts.append((False, data))
+    return parts
+
+
+def split_segments(data: bytes, minimum: int = SEGMENT_MINIMUM) -> List[Tuple[int, bytes]]:
+    """Разбивает данные на сегменты цифрового, алфавитно-цифрового и байтового режимов"""
+    num = rb"\d"
+    alpha = b"[" + re.escape(ALPHA_NUM) + b"]"
+    if len(data) <= minimum:
+        num_re = re.compile(b"^" + num + b"+$")
+        alpha_re = re.compile(b"^" + alpha + b"+$")
+    else:
+        repeat = b"{" + str(minimum).encode("ascii") + b",}"
+        num_re = re.compile(num + repeat)
+        alpha_re = re.compile(alpha + repeat)
+
+    segments: List[Tuple[int, bytes]] = []
+    for is_num, chunk in _split(data, num_re):
+        if is_num:
+            segments.append((MODE_NUMBER, chunk))
+            continue
+        for is_alpha, sub in _split(chunk, alpha_re):
+            segments.append((MODE_ALPHA_NUM if is_alpha else MODE_8BIT_BYTE, sub))
+    return segments
+
+
+def segments_bit_length(segments: List[Tuple[int, bytes]], version: int) -> int:
+    """Длина закодированных сегментов в битах для указанной версии"""
+    range_idx = 0 if version <= 9 else (1 if version <= 26 else 2)
+    total = 0
+    for mode, chunk in segments:
+        total += 4 + _COUNT_BITS[mode][range_idx] + _segment_data_bits(mode, len(chunk))
+    return total
+
+
+def char_capacity(version: int, ecc: str, mode: int = MODE_8BIT_BYTE) -> int:
+    """Максимум символов одного режима, помещающихся в версию при уровне коррекции ecc"""
+    capacity = QR_DATA_CODEWORDS[ecc][version - 1] * 8
+    range_idx = 0 if version <= 9 else (1 if version <= 26 else 2)
+    available = capacity - 4 - _COUNT_BITS[mode][range_idx]
+    if available <= 0:
+        return 0
+    if mode == MODE_NUMBER:
+        n = 3 * (available // 10)
+        rest = available % 10
+        return n + (2 if rest >= 7 else 1 if rest >= 4 else 0)
+    if mode == MODE_ALPHA_NUM:
+        return 2 * (available // 11) + (1 if available % 11 >= 6 else 0)
+    return available // 8
+
+
+def select_qr_params(data, preferred_ecc: str = "H", segments: Optional[List[Tuple[int, bytes]]] = None) -> Optional[QRPlan]:
+    """
+    Выбирает наилучший уровень коррекции (начиная с preferred_ecc и ниже)
+    и минимальную версию, в которую помещаются данные.
+
+    Returns:
+        QRPlan или None, если данные не помещаются даже в версию 40 с уровнем L
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if segments is None:
+        segments = split_segments(data)
+    start = ECC_ORDER.index(preferred_ecc) if preferred_ecc in ECC_ORDER else 0
+
+    bits_by_range = [segments_bit_length(segments, lo) for lo, _hi in _VERSION_RANGES]
+    for ecc in ECC_ORDER[start:]:
+        table = QR_DATA_CODEWORDS[ecc]
+        for (lo, hi), bits in zip(_VERSION_RANGES, bits_by_range):
+            # Ёмкость монотонно растёт с версией: если не влезло в старшую версию диапазона, идём дальше
+            if table[hi - 1] * 8 < bits:
+                continue
+            low, high = lo, hi
+            while low < high:
+                mid = (low + high) // 2
+                if table[mid - 1] * 8 >= bits:
+                    high = mid
+                else:
+                    low = mid + 1
+            return QRPlan(ecc, low, bits, table[low - 1] * 8, segments)
+    return None
@@ -0,0 +1,84 @@
+"""
+Растеризация матричных кодов напрямую из матрицы модулей.
+Изображение строится одним векторным шагом NumPy с целым шагом модуля,
+без промежуточных изображений и ресемплинга.
+"""
+
+from typing import Optional, Sequence, Union
+
+from PIL import Image
+
+MatrixLike = Union[Sequence[Sequence[bool]], "np.ndarray"]
+
+
+def module_pitch(total_modules: int, target_px: int) -> int:
+    """Целый размер модуля в пикселях, при котором код (с тихой зоной) помещается в target_px"""
+    if total_modules <= 0:
+        return 1
+    return max(1, int(target_px) // total_modules)
+
+
+def rasterize_modules(modules: MatrixLike, target_px: Optional[int] = None, quiet_zone: int = 4,
+                      mode: str = "L", pitch: Optional[int] = None) -> Image.Image:
+    """
+    Строит изображение кода из матрицы модулей (True — тёмный модуль).
+
+    Args:
+        modules: матрица модулей без тихой зоны
+        target_px: сторона итогового квадратного изображения; код центрируется на белом поле
+        quiet_zone: ширина тихой зоны в модулях
+        mode: '1' (1 бит) или 'L' (оттенки серого)
+        pitch: явный размер модуля в пикселях; по умолчанию подбирается под target_px
+
+    Returns:
+        Изображение стороной max(target_px, размер кода)
+    """
+    import numpy as np
+
+    m = np.asarray(modules, dtype=bool)
+    if m.ndim != 2 or m.size == 0:
+        raise ValueError("Пустая матрица модулей")
+    rows, cols = m.shape
+    total = max(rows, cols) + 2 * quiet_zone
+    if pitch is None:
+        pitch = module_pitch(total, target_px or total)
+
+    code_h, code_w = rows * pitch, cols * pitch
+    side = max(int(target_px or 0), total * pitch)
+    top = (side - code_h) // 2
+    left = (side - code_w) // 2
+
+    # Светлый фон = True; модули масштабируются повтором по обеим осям
+    canvas = np.ones((side, side), dtype=bool)
+    canvas[top:top + code_h, left:left + code_w] = ~m.repeat(pitch, axis=0).repeat(pitch, axis=1)
+
+    if mode == "1":
+        return Image.fromarray(canvas)
+    if mode == "L":
+        return Image.fromarray(canvas.astype(np.uint8) * 255)
+    raise ValueError(f"Неподдерживаемый режим растеризации: {mode}")
+
+
+def dm_matrix_from_encoded(width: int, height: int, bpp: int, pixels: bytes) -> "np.ndarray":
+    """
+    Восстанавливает матрицу модулей DataMatrix из растра pylibdmtx.
+    libdmtx рисует код с отступом и целым размером модуля; размер модуля
+    берётся из первой тёмной серии верхнего тактового ряда.
+    """
+    import numpy as np
+
+    channels = max(1, bpp // 8)
+    arr = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width, channels)[:, :, 0]
+    dark = arr < 128
+    ys = np.flatnonzero(dark.any(axis=1))
+    xs = np.flatnonzero(dark.any(axis=0))
+    if ys.size == 0 or xs.size == 0:
+        raise ValueError("Пустой растр DataMatrix")
+    symbol = dark[ys[0]:ys[-1] + 1, xs[0]:xs[-1] + 1]
+
+    top_row = symbol[0]
+    light = np.flatnonzero(~top_row)
+    pitch = int(light[0]) if light.size else symbol.shape[1]
+    pitch = max(1, pitch)
+    centre = pitch // 2
+    return symbol[centre::pitch, centre::pitch]
@@ -0,0 +1,253 @@
+"""
+Кэш отрисованных кодов.
+Двухуровневый кэш: ограниченный по байтам LRU в памяти и каталог на диске.
+Ключ — хеш от параметров генерации и версии рендерера.
+Каталог общий для всех рабочих процессов (gunicorn, пакетная генерация), поэтому его размер
+считается не по записям своего процесса, а обходом каталога: его выполняет один процесс
+за раз (flock на .sweep.lock), после того как процесс записал заметную долю лимита.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_META_KEY = "render-meta"
+SWEEP_LOCK = ".sweep.lock"
+SWEEP_EVERY = 0.05       # обход после записи такой доли лимита диска
+SWEEP_TARGET = 0.9       # обход удаляет старые файлы до такой доли лимита
+TMP_MAX_AGE = 3600       # недописанные .tmp старше часа — остатки упавших процессов
+
+
+def make_render_key(code_type: str, text: str, size: int, gost_code: Optional[str],
+                    human_text: str, renderer_version: str) -> str:
+    """Строит ключ кэша (sha256) по параметрам генерации"""
+    payload = json.dumps(
+        [code_type.lower(), text, int(size), gost_code or "", human_text or "", renderer_version],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _image_nbytes(img: Image.Image) -> int:
+    bands = len(img.getbands())
+    if img.mode == "1":
+        return (img.width + 7) // 8 * img.height
+    return img.width * img.height * bands
+
+
+class RenderCache:
+    """
+    Кэш изображений кодов: LRU в памяти + каталог на диске.
+    Оба уровня вытесняют записи по суммарному размеру в байтах; на диске порядок
+    вытеснения — по mtime, который обновляется при чтении.
+    """
+
+    def __init__(self, max_memory_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[str] = None, max_disk_bytes: int = 512 * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[Image.Image, dict, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_items = 0      # по последнему обходу каталога (все процессы)
+        self._disk_bytes = 0
+        self._written_since_sweep = 0
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            self.set_disk_dir(disk_dir)
+
+    def configure(self, max_memory_bytes: Optional[int] = None, disk_dir: Optional[str] = None,
+                  max_disk_bytes: Optional[int] = None) -> None:
+        with self._lock:
+            if max_memory_bytes is not None:
+                self.max_memory_bytes = max_memory_bytes
+                self._evict_memory()
+            if max_disk_bytes is not None:
+                self.max_disk_bytes = max_disk_bytes
+        if disk_dir is not None:
+            self.set_disk_dir(disk_dir)
+
+    def set_disk_dir(self, disk_dir: Optional[str]) -> None:
+        """Подключает дисковый уровень и приводит каталог к лимиту"""
+        with self._lock:
+            self._disk_items = self._disk_bytes = self._written_since_sweep = 0
+            self.disk_dir = disk_dir or None
+            if not self.disk_dir:
+                return
+            os.makedirs(self.disk_dir, exist_ok=True)
+        self.sweep_disk()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def get(self, key: str) -> Optional[Tuple[Image.Image, dict]]:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return item[0].copy(), dict(item[1])
+            on_disk = self.disk_dir is not None
+
+        if on_disk:
+            loaded = self._read_disk(key)
+            if loaded is not None:
+                img, metadata = loaded
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._put_memory(key, img, metadata)
+                return img.copy(), dict(metadata)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, img: Image.Image, metadata: dict) -> None:
+        stored = img.copy()
+        with self._lock:
+            self._put_memory(key, stored, dict(metadata))
+            write_disk = self.disk_dir is not None
+        if write_disk and not os.path.exists(self._disk_path(key)):
+            self._write_disk(key, stored, metadata)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": self._disk_items,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # --- внутреннее ---
+
+    def _put_memory(self, key: str, img: Image.Image, metadata: dict) -> None:
+        nbytes = _image_nbytes(img)
+        if nbytes > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[2]
+        self._memory[key] = (img, metadata, nbytes)
+        self._memory_bytes += nbytes
+        self._evict_memory()
+
+    def _evict_memory(self) -> None:
+        while self._memory and self._memory_bytes > self.max_memory_bytes:
+            _key, (_img, _meta, nbytes) = self._memory.popitem(last=False)
+            self._memory_bytes -= nbytes
+
+    def sweep_disk(self) -> Optional[Tuple[int, int]]:
+        """
+        Обходит каталог (файлы всех процессов) и удаляет самые давно читанные,
+        пока он не уложится в SWEEP_TARGET от лимита.
+
+        Returns:
+            (файлов, байт) после обхода; None — каталога нет или обход уже идёт в другом процессе
+        """
+        disk_dir = self.disk_dir
+        if not disk_dir:
+            return None
+        with open(os.path.join(disk_dir, SWEEP_LOCK), "a") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            entries = []
+            total = 0
+            stale = time.time() - TMP_MAX_AGE
+            for entry in os.scandir(disk_dir):
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    if entry.name.endswith(".tmp") and st.st_mtime < stale:
+                        os.remove(entry.path)
+                        continue
+                except OSError:
+                    continue
+                if entry.name.endswith(".png"):
+                    entries.append((st.st_mtime, entry.path, st.st_size))
+                    total += st.st_size
+            count = len(entries)
+            if total > self.max_disk_bytes:
+                target = self.max_disk_bytes * SWEEP_TARGET
+                for _mtime, path, nbytes in sorted(entries):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= nbytes
+                    count -= 1
+        with self._lock:
+            self._disk_items, self._disk_bytes = count, total
+            self._written_since_sweep = 0
+        return count, total
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Image.Image, dict]]:
+        path = self._disk_path(key)
+        try:
+            with Image.open(path) as src:
+                src.load()
+                metadata = json.loads(src.info.get(_META_KEY) or "{}")
+                img = src.copy()
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return img, metadata
+
+    def _write_disk(self, key: str, img: Image.Image, metadata: dict) -> None:
+        info = PngInfo()
+        info.add_text(_META_KEY, json.dumps(metadata, ensure_ascii=False))
+        bio = io.BytesIO()
+        img.save(bio, "PNG", pnginfo=info)
+        data = bio.getvalue()
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._written_since_sweep += len(data)
+            due = self._written_since_sweep >= self.max_disk_bytes * SWEEP_EVERY
+        if due:
+            self.sweep_disk()
+
+
+render_cache = RenderCache()
@@ -0,0 +1,72 @@
+"""
+Короткоживущие токены отрисовки.
+api_generate выдаёт токен, который ссылается на уже отрисованный код в render_cache,
+чтобы сохранение и копия в историю брали то же изображение, а не рисовали его заново.
+Токен — подписанные SECRET_KEY параметры генерации (itsdangerous), а не запись в памяти процесса:
+его проверит и отрисует любой рабочий процесс gunicorn, а ключ render_cache по тем же
+параметрам у всех процессов один.
+"""
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from PIL import Image
+
+_SALT = "render-token"
+
+
+class RenderTicket(NamedTuple):
+    """Параметры generate_by_type, по которым отрисован код"""
+    code_type: str
+    text: str
+    size: int
+    human_text: str
+    gost_code: Optional[str]
+    metadata: Dict
+
+
+class RenderTokens:
+    """Подписанные токены с ограниченным временем жизни"""
+
+    def __init__(self, secret_key: str = "", ttl_seconds: int = 600):
+        self.ttl_seconds = ttl_seconds
+        self._serializer = URLSafeTimedSerializer(secret_key or "render-tokens", salt=_SALT)
+
+    def configure(self, secret_key: Optional[str] = None, ttl_seconds: Optional[int] = None) -> None:
+        if secret_key is not None:
+            self._serializer = URLSafeTimedSerializer(secret_key, salt=_SALT)
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+
+    def issue(self, code_type: str, text: str, size: int, human_text: str, gost_code: Optional[str],
+              metadata: Dict) -> str:
+        """Выдаёт токен для только что отрисованного кода"""
+        return self._serializer.dumps([code_type, text, int(size), human_text or "", gost_code or None,
+                                       dict(metadata)])
+
+    def lookup(self, token: Optional[str]) -> Optional[RenderTicket]:
+        """Параметры по токену или None, если подпись неверна или токен истёк"""
+        if not token:
+            return None
+        try:
+            fields = self._serializer.loads(token, max_age=self.ttl_seconds)
+            return RenderTicket(*fields)
+        except (BadSignature, TypeError, ValueError):
+            return None
+
+    def image(self, token: Optional[str]) -> Optional[Tuple[Image.Image, RenderTicket]]:
+        """
+        Изображение по токену. Берётся из render_cache по тем же параметрам;
+        если кэш его уже вытеснил, код отрисуется заново и результат будет тем же.
+        """
+        ticket = self.lookup(token)
+        if ticket is None:
+            return None
+        from .codes import generate_by_type
+
+        img, _metadata = generate_by_type(ticket.code_type, ticket.text, size=ticket.size,
+                                          human_text=ticket.human_text, gost_code=ticket.gost_code)
+        return img, ticket
+
+
+render_tokens = RenderTokens()
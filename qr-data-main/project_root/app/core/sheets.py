@@ -0,0 +1,83 @@
+"""
+Листы этикеток A4 в PDF.
+Раскладка берётся из gost_dimensions.calculate_print_layout, каждый уникальный
+символ рисуется один раз как form XObject и затем только размещается по ячейкам.
+"""
+
+import hashlib
+from typing import BinaryIO, Dict, List, Optional
+
+from .gost_dimensions import calculate_print_layout, get_dimension_by_code
+from .vector import VectorSymbol, draw_symbol, define_logo_form, PT_PER_MM
+
+A4_MM = (210.0, 297.0)
+CELL_GAP_MM = 2.0  # тот же промежуток, что закладывает calculate_print_layout
+
+
+def symbol_key(code_type: str, text: str, human_text: str = "") -> str:
+    """Ключ уникального символа на листе (имя form XObject)"""
+    digest = hashlib.sha1(f"{code_type}\x00{text}\x00{human_text}".encode("utf-8")).hexdigest()[:16]
+    return f"sym_{digest}"
+
+
+def sheet_layout(gost_code: str, margin_mm: float = 5.0) -> Dict:
+    """Размер ячейки и число колонок/строк на листе A4 для ГОСТ-размера"""
+    dim = get_dimension_by_code(gost_code)
+    cols, rows, per_page = calculate_print_layout(A4_MM[0], A4_MM[1], dim.mm_width, dim.mm_height, margin_mm)
+    return {
+        "cell_w_mm": dim.mm_width,
+        "cell_h_mm": dim.mm_height,
+        "cols": cols,
+        "rows": rows,
+        "per_page": per_page,
+        "margin_mm": margin_mm,
+    }
+
+
+def write_sheet_pdf(out: BinaryIO, symbols: Dict[str, VectorSymbol], sequence: List[Optional[str]],
+                    layout: Dict) -> int:
+    """
+    Пишет многостраничный PDF: sequence — ключи символов по ячейкам (None — пустая ячейка).
+
+    Returns:
+        количество страниц
+    """
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    page_w, page_h = A4_MM[0] * PT_PER_MM, A4_MM[1] * PT_PER_MM
+    cell_w, cell_h = layout["cell_w_mm"], layout["cell_h_mm"]
+    pitch_x = (cell_w + CELL_GAP_MM) * PT_PER_MM
+    pitch_y = (cell_h + CELL_GAP_MM) * PT_PER_MM
+    margin = layout["margin_mm"] * PT_PER_MM
+    per_page = layout["per_page"]
+
+    c = pdf_canvas.Canvas(out, pagesize=(page_w, page_h))
+    c.setTitle("Этикетки")
+
+    # Каждый символ — один form XObject, вписанный в ячейку по центру;
+    # логотип QR тоже встраивается один раз на весь документ
+    logo_form = define_logo_form(c) if any(s.ecc for s in symbols.values()) else None
+    for key, symbol in symbols.items():
+        scale = min(1.0, cell_w / symbol.width_mm, cell_h / symbol.height_mm)
+        dx = (cell_w - symbol.width_mm * scale) / 2 * PT_PER_MM
+        dy = (cell_h - symbol.height_mm * scale) / 2 * PT_PER_MM
+        c.beginForm(key, lowerx=0, lowery=0, upperx=cell_w * PT_PER_MM, uppery=cell_h * PT_PER_MM)
+        draw_symbol(c, symbol, dx, dy, scale, logo_form=logo_form)
+        c.endForm()
+
+    pages = 0
+    for start in range(0, len(sequence), per_page):
+        for slot, key in enumerate(sequence[start:start + per_page]):
+            if key is None or key not in symbols:
+                continue
+            col, row = slot % layout["cols"], slot // layout["cols"]
+            x = margin + col * pitch_x
+            y = page_h - margin - row * pitch_y - cell_h * PT_PER_MM
+            c.saveState()
+            c.translate(x, y)
+            c.doForm(key)
+            c.restoreState()
+        c.showPage()
+        pages += 1
+    c.save()
+    return pages
@@ -0,0 +1,503 @@
+"""
+Хранилище изображений с адресацией по содержимому.
+Имя файла — SHA-256 закодированных байтов, поэтому одинаковые коды и загрузки
+лежат в хранилище в одном экземпляре. Ссылки на файл — строки history.image_path
+вида "<раздел>/<имя>" (см. models.history): файл удаляется, когда исчезает последняя из них.
+
+Разделы ("codes", "uploads") хранятся одним из бэкендов:
+  sharded — дерево каталогов ab/cd/<имя> по первым символам хеша;
+  pack    — один файл data.pack, куда записи только дописываются, и индекс к нему;
+            чтение идёт через mmap.
+Файлы старой плоской раскладки (<каталог>/<имя>) читаются любым бэкендом;
+перенос в новую раскладку — скрипт migrate_storage.py.
+"""
+
+import hashlib
+import logging
+import mimetypes
+import mmap
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, Optional, Tuple
+
+from PIL import Image
+
+from .encoding import encode_image
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка только между потоками одного процесса
+    fcntl = None
+
+# Файл, к которому обращались недавно, не удаляем: его могли только что
+# записать (или найти готовым) для новой строки истории, ещё не вставленной в БД
+RELEASE_GRACE_SECONDS = 60
+
+log = logging.getLogger(__name__)
+
+TOUCH_PERSIST_SECONDS = 3600
+
+SERVE_MAX_AGE = 31536000  # имена по содержимому не меняют смысла — кэшируем надолго
+
+
+def content_name(data: bytes, ext: str) -> str:
+    """Имя файла по содержимому: <sha256>.<ext>"""
+    return f"{hashlib.sha256(data).hexdigest()}.{ext}"
+
+
+def _is_safe_name(name: str) -> bool:
+    return bool(name) and "/" not in name and "\\" not in name and not name.startswith(".")
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class StorageBackend(ABC):
+    """Общая часть бэкендов: корневой каталог и файлы плоской раскладки в нём"""
+
+    kind = ""
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _flat_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _flat_names(self) -> Iterator[str]:
+        for entry in os.scandir(self.root):
+            if entry.is_file() and _is_safe_name(entry.name) and not entry.name.endswith(".tmp"):
+                yield entry.name
+
+    # Интерфейс бэкенда
+    @abstractmethod
+    def put(self, name: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    def read(self, name: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def touch(self, name: str) -> None:
+        ...
+
+    @abstractmethod
+    def mtime(self, name: str) -> Optional[float]:
+        ...
+
+    @abstractmethod
+    def size(self, name: str) -> int:
+        ...
+
+    @abstractmethod
+    def delete(self, name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def names(self) -> Iterator[str]:
+        ...
+
+    @abstractmethod
+    def response(self, name: str):
+        """Ответ Flask с файлом (ETag и долгий Cache-Control) или None, если файла нет"""
+        ...
+
+
+class ShardedStore(StorageBackend):
+    """Дерево каталогов root/ab/cd/<имя>: в каждом каталоге немного файлов"""
+
+    kind = "sharded"
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name[2:4], name)
+
+    def _existing_path(self, name: str) -> Optional[str]:
+        for path in (self.path(name), self._flat_path(name)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, data)
+
+    def read(self, name: str) -> Optional[bytes]:
+        path = self._existing_path(name)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def exists(self, name: str) -> bool:
+        return self._existing_path(name) is not None
+
+    def touch(self, name: str) -> None:
+        path = self._existing_path(name)
+        if path is not None:
+            os.utime(path)
+
+    def mtime(self, name: str) -> Optional[float]:
+        path = self._existing_path(name)
+        return os.path.getmtime(path) if path else None
+
+    def size(self, name: str) -> int:
+        path = self._existing_path(name)
+        return os.path.getsize(path) if path else 0
+
+    def delete(self, name: str) -> bool:
+        removed = False
+        for path in (self.path(name), self._flat_path(name)):
+            try:
+                os.remove(path)
+                removed = True
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                log.warning("Не удалось удалить %s: %s", path, e)
+        # Опустевшие каталоги шардов убираем (rmdir не тронет непустой)
+        shard = os.path.dirname(self.path(name))
+        for folder in (shard, os.path.dirname(shard)):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+        return removed
+
+    def names(self) -> Iterator[str]:
+        yield from self._flat_names()
+        for top in os.scandir(self.root):
+            if not (top.is_dir() and len(top.name) == 2 and _is_safe_name(top.name)):
+                continue
+            for sub in os.scandir(top.path):
+                if sub.is_dir():
+                    for entry in os.scandir(sub.path):
+                        if entry.is_file() and not entry.name.endswith(".tmp"):
+                            yield entry.name
+
+    def response(self, name: str):
+        from flask import send_file
+
+        path = self._existing_path(name)
+        if path is None:
+            return None
+        resp = send_file(path, max_age=SERVE_MAX_AGE, etag=name.rsplit(".", 1)[0], conditional=True)
+        resp.cache_control.immutable = True
+        return resp
+
+
+class PackStore(StorageBackend):
+    """
+    Пак-файл: root/pack/data.pack — байты записей подряд, только дописываются;
+    root/pack/index — строки "имя\\tсмещение\\tдлина\\tвремя" (длина -1 — запись удалена).
+    Несколько процессов дописывают под flock и подхватывают чужие строки индекса при промахе.
+    Место удалённых записей возвращает compact() (при остановленном приложении).
+    """
+
+    kind = "pack"
+
+    def __init__(self, root: str):
+        super().__init__(root)
+        self.pack_dir = os.path.join(root, "pack")
+        os.makedirs(self.pack_dir, exist_ok=True)
+        self.data_path = os.path.join(self.pack_dir, "data.pack")
+        self.index_path = os.path.join(self.pack_dir, "index")
+        for path in (self.data_path, self.index_path):
+            open(path, "ab").close()
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, int, float]] = {}
+        self._index_pos = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._mm_file = None
+        self._refresh()
+
+    # --- индекс ---
+
+    def _refresh(self) -> None:
+        """Дочитывает строки индекса, дописанные после прошлого чтения (в т. ч. другими процессами)"""
+        with self._lock, open(self.index_path, "rb") as f:
+            f.seek(self._index_pos)
+            chunk = f.read()
+            end = chunk.rfind(b"\n") + 1  # недописанную строку оставляем на следующий раз
+            for line in chunk[:end].decode("utf-8").splitlines():
+                name, offset, length, stamp = line.split("\t")
+                if int(length) < 0:
+                    self._index.pop(name, None)
+                else:
+                    self._index[name] = (int(offset), int(length), float(stamp))
+            self._index_pos += end
+
+    def _lookup(self, name: str) -> Optional[Tuple[int, int, float]]:
+        entry = self._index.get(name)
+        if entry is None:
+            self._refresh()
+            entry = self._index.get(name)
+        return entry
+
+    def _locked(self, f) -> None:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    # --- чтение через mmap ---
+
+    def _view(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            if self._mm is None or offset + length > len(self._mm):
+                self._remap()
+            return self._mm[offset:offset + length]
+
+    def _remap(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm_file.close()
+        self._mm_file = open(self.data_path, "rb")
+        self._mm = mmap.mmap(self._mm_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                self._mm_file.close()
+                self._mm = self._mm_file = None
+
+    # --- интерфейс ---
+
+    def put(self, name: str, data: bytes) -> None:
+        with self._lock, open(self.index_path, "ab") as index:
+            self._locked(index)
+            self._refresh()
+            if name in self._index:
+                return
+            with open(self.data_path, "ab") as pack:
+                offset = pack.seek(0, os.SEEK_END)
+                pack.write(data)
+                pack.flush()
+                os.fsync(pack.fileno())
+            stamp = time.time()
+            index.write(f"{name}\t{offset}\t{len(data)}\t{stamp:.3f}\n".encode("utf-8"))
+            index.flush()
+            self._index[name] = (offset, len(data), stamp)
+            # Свою строку уже учли — сдвигаем позицию, чтобы не читать её повторно
+            self._index_pos = index.tell()
+
+    def read(self, name: str) -> Optional[bytes]:
+        entry = self._lookup(name)
+        if entry is not None:
+            return self._view(entry[0], entry[1])
+        path = self._flat_path(name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                return f.read()
+        return None
+
+    def exists(self, name: str) -> bool:
+        return self._lookup(name) is not None or os.path.isfile(self._flat_path(name))
+
+    def touch(self, name: str) -> None:
+        # Время обращения пишем в индекс не чаще раза в TOUCH_PERSIST_SECONDS на запись:
+        # этого достаточно, чтобы уборка в других процессах видела файл живым
+        with self._lock:
+            entry = self._lookup(name)
+            if entry is not None:
+                now = time.time()
+                if now - entry[2] > TOUCH_PERSIST_SECONDS:
+                    with open(self.index_path, "ab") as index:
+                        self._locked(index)
+                        self._refresh()
+                        index.write(f"{name}\t{entry[0]}\t{entry[1]}\t{now:.3f}\n".encode("utf-8"))
+                        index.flush()
+                        self._index_pos = index.tell()
+                self._index[name] = (entry[0], entry[1], now)
+                return
+        if os.path.isfile(self._flat_path(name)):
+            os.utime(self._flat_path(name))
+
+    def mtime(self, name: str) -> Optional[float]:
+        entry = self._lookup(name)
+        if entry is not None:
+            return entry[2]
+        path = self._flat_path(name)
+        return os.path.getmtime(path) if os.path.isfile(path) else None
+
+    def size(self, name: str) -> int:
+        entry = self._lookup(name)
+        if entry is not None:
+            return entry[1]
+        path = self._flat_path(name)
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+
+    def delete(self, name: str) -> bool:
+        removed = False
+        with self._lock, open(self.index_path, "ab") as index:
+            self._locked(index)
+            self._refresh()
+            if name in self._index:
+                index.write(f"{name}\t0\t-1\t{time.time():.3f}\n".encode("utf-8"))
+                index.flush()
+                del self._index[name]
+                self._index_pos = index.tell()
+                removed = True
+        try:
+            os.remove(self._flat_path(name))
+            removed = True
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log.warning("Не удалось удалить %s: %s", self._flat_path(name), e)
+        return removed
+
+    def names(self) -> Iterator[str]:
+        self._refresh()
+        yield from self._flat_names()
+        with self._lock:
+            packed = list(self._index)
+        yield from packed
+
+    def response(self, name: str):
+        from flask import Response, request
+
+        data = self.read(name)
+        if data is None:
+            return None
+        resp = Response(data, mimetype=mimetypes.guess_type(name)[0] or "application/octet-stream")
+        resp.set_etag(name.rsplit(".", 1)[0])
+        resp.cache_control.public = True
+        resp.cache_control.max_age = SERVE_MAX_AGE
+        resp.cache_control.immutable = True
+        return resp.make_conditional(request)
+
+    def garbage_bytes(self) -> int:
+        """Байты удалённых записей в пак-файле (освобождает compact())"""
+        self._refresh()
+        with self._lock:
+            live = sum(length for _offset, length, _stamp in self._index.values())
+        return max(0, os.path.getsize(self.data_path) - live)
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        Переписывает пак без удалённых записей. Запускать при остановленном приложении.
+
+        Returns:
+            (байт до, байт после)
+        """
+        with self._lock, open(self.index_path, "ab") as index:
+            self._locked(index)
+            self._refresh()
+            before = os.path.getsize(self.data_path)
+            tmp_data, tmp_index = f"{self.data_path}.tmp", f"{self.index_path}.tmp"
+            entries = {}
+            with open(tmp_data, "wb") as out_data, open(tmp_index, "wb") as out_index:
+                for name, (offset, length, stamp) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+                    new_offset = out_data.tell()
+                    out_data.write(self._view(offset, length))
+                    out_index.write(f"{name}\t{new_offset}\t{length}\t{stamp:.3f}\n".encode("utf-8"))
+                    entries[name] = (new_offset, length, stamp)
+            self.close()
+            os.replace(tmp_data, self.data_path)
+            os.replace(tmp_index, self.index_path)
+            self._index = entries
+            self._index_pos = os.path.getsize(self.index_path)
+            return before, os.path.getsize(self.data_path)
+
+
+BACKENDS = {"sharded": ShardedStore, "pack": PackStore}
+
+
+class ImageStorage:
+    """Разделы хранилища ("codes", "uploads") и ссылки "<раздел>/<имя>" на файлы в них"""
+
+    def __init__(self):
+        self.backend = "sharded"
+        self.buckets: Dict[str, StorageBackend] = {}
+
+    def configure(self, backend: str, roots: Dict[str, str]) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный бэкенд хранилища: {backend}")
+        for store in self.buckets.values():
+            if isinstance(store, PackStore):
+                store.close()
+        self.backend = backend
+        self.buckets = {bucket: BACKENDS[backend](root) for bucket, root in roots.items()}
+
+    def bucket(self, bucket: str) -> StorageBackend:
+        return self.buckets[bucket]
+
+    def resolve_ref(self, ref: str) -> Optional[Tuple[str, str]]:
+        """
+        Раздел и имя по ссылке из history.image_path.
+        Понимает и старые абсолютные пути вида <каталог раздела>/<имя>.
+        """
+        if not ref:
+            return None
+        bucket, sep, name = ref.partition("/")
+        if sep and bucket in self.buckets and _is_safe_name(name):
+            return bucket, name
+        folder, name = os.path.split(os.path.abspath(ref))
+        for bucket, store in self.buckets.items():
+            if os.path.abspath(store.root) == folder and _is_safe_name(name):
+                return bucket, name
+        return None
+
+    def resolve(self, ref: str) -> Optional[Tuple[StorageBackend, str]]:
+        """Бэкенд и имя по ссылке из history.image_path"""
+        target = self.resolve_ref(ref)
+        return (self.buckets[target[0]], target[1]) if target else None
+
+    def store_bytes(self, bucket: str, data: bytes, ext: str) -> Tuple[str, str]:
+        """
+        Сохраняет байты под именем по содержимому. Если такой файл уже есть,
+        только отмечает обращение к нему.
+
+        Returns:
+            (имя файла, ссылка для history.image_path)
+        """
+        store = self.buckets[bucket]
+        name = content_name(data, ext)
+        if store.exists(name):
+            store.touch(name)
+        else:
+            store.put(name, data)
+        return name, f"{bucket}/{name}"
+
+    def store_image(self, bucket: str, img: Image.Image, profile: str = "compact") -> Tuple[str, str]:
+        """Кодирует изображение по профилю (см. encoding.PROFILES) и сохраняет по содержимому"""
+        data, _mimetype, ext = encode_image(img, profile)
+        return self.store_bytes(bucket, data, ext)
+
+    def read(self, ref: str) -> Optional[bytes]:
+        target = self.resolve(ref)
+        return target[0].read(target[1]) if target else None
+
+    def response(self, bucket: str, name: str):
+        """Ответ с файлом раздела или None (неизвестное или небезопасное имя)"""
+        if bucket not in self.buckets or not _is_safe_name(name):
+            return None
+        return self.buckets[bucket].response(name)
+
+    def release(self, ref: str) -> bool:
+        """
+        Удаляет файл, на который больше нет ссылок (вызывается из models.history).
+        Недавно использованный файл оставляет на месте.
+        """
+        target = self.resolve(ref)
+        if target is None:
+            return False
+        store, name = target
+        stamp = store.mtime(name)
+        if stamp is None or time.time() - stamp < RELEASE_GRACE_SECONDS:
+            return False
+        return store.delete(name)
+
+
+image_storage = ImageStorage()
@@ -0,0 +1,188 @@
+"""
+Уборка осиротевших файлов хранилища.
+Файлы разделов сверяются с history.image_path пачками: удаляются те, на которые
+не ссылается ни одна запись истории и к которым не обращались дольше срока ожидания
+(загрузки анонимных сканирований, файлы, не удалённые при очистке истории).
+Миниатюры живут, пока есть их оригинал.
+Обход ограничен по скорости, чтобы не вытеснять из page cache рабочие данные.
+Каталоги .render_cache и jobs в разделы не входят и не трогаются.
+
+Запуск: скрипт gc_storage.py или фоновый поток (GC_INTERVAL_HOURS > 0).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from .storage import image_storage, ImageStorage, PackStore, StorageBackend
+from .thumbnails import THUMB_BUCKET, thumbnail_source
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+GRACE_HOURS = 24
+BATCH_SIZE = 300            # имён на один запрос к БД (три варианта ссылки на имя — в пределах 999 параметров)
+MAX_FILES_PER_SECOND = 2000
+LOCK_NAME = ".gc.lock"
+
+
+def _referenced(db, bucket: str, store: StorageBackend, names: List[str]) -> Set[str]:
+    """Имена из пачки, на которые ссылается история: "<раздел>/<имя>" или старый путь <каталог>/<имя>"""
+    refs = {}
+    for name in names:
+        refs[f"{bucket}/{name}"] = name
+        refs[os.path.join(store.root, name)] = name
+        refs[os.path.join(os.path.abspath(store.root), name)] = name
+    keys = list(refs)
+    rows = db.execute(
+        f"SELECT DISTINCT image_path FROM history WHERE image_path IN ({','.join(['?'] * len(keys))})", keys
+    ).fetchall()
+    return {refs[r["image_path"]] for r in rows}
+
+
+def _live_thumbnails(storage: ImageStorage, names: List[str]) -> Set[str]:
+    """Миниатюры, оригинал которых ещё лежит в хранилище"""
+    live = set()
+    for name in names:
+        source = thumbnail_source(name)
+        if source and source[0] in storage.buckets and source[0] != THUMB_BUCKET \
+                and storage.bucket(source[0]).exists(source[1]):
+            live.add(name)
+    return live
+
+
+def _new_report() -> Dict:
+    return {"scanned": 0, "orphans": 0, "orphan_bytes": 0, "deleted": 0, "deleted_bytes": 0, "young": 0}
+
+
+def collect_orphans(grace_hours: float = GRACE_HOURS, batch_size: int = BATCH_SIZE,
+                    max_files_per_second: float = MAX_FILES_PER_SECOND, dry_run: bool = False,
+                    storage: ImageStorage = image_storage, stop: Optional[threading.Event] = None) -> Dict:
+    """
+    Сверяет разделы хранилища с историей и удаляет осиротевшие файлы (вызывать в контексте приложения).
+    dry_run — только посчитать, сколько файлов и байт освободится.
+
+    Returns:
+        {раздел: {"scanned", "orphans", "orphan_bytes", "deleted", "deleted_bytes", "young", ...}}
+    """
+    from ..extensions import get_db
+
+    db = get_db()
+    cutoff = time.time() - grace_hours * 3600
+    report: Dict[str, Dict] = {}
+    for bucket, store in storage.buckets.items():
+        stats = report[bucket] = _new_report()
+        names = iter(store.names())
+        while True:
+            if stop is not None and stop.is_set():
+                return report
+            started = time.monotonic()
+            batch = [name for _, name in zip(range(batch_size), names)]
+            if not batch:
+                break
+            stats["scanned"] += len(batch)
+            if bucket == THUMB_BUCKET:
+                linked = _live_thumbnails(storage, batch)
+            else:
+                linked = _referenced(db, bucket, store, batch)
+            for name in batch:
+                if name in linked:
+                    continue
+                stamp = store.mtime(name)
+                if stamp is None:
+                    continue
+                if stamp > cutoff:
+                    stats["young"] += 1
+                    continue
+                size = store.size(name)
+                stats["orphans"] += 1
+                stats["orphan_bytes"] += size
+                if not dry_run and store.delete(name):
+                    stats["deleted"] += 1
+                    stats["deleted_bytes"] += size
+            # Не быстрее max_files_per_second: обход stat'ами не должен забивать диск
+            pause = len(batch) / max_files_per_second - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(pause)
+        if isinstance(store, PackStore):
+            stats["pack_garbage_bytes"] = store.garbage_bytes()
+    return report
+
+
+@contextmanager
+def gc_lock(storage_dir: str) -> Iterator[bool]:
+    """
+    Блокировка уборки (flock на STORAGE_DIR/.gc.lock), общая для фонового потока всех
+    процессов и скрипта gc_storage.py. Отдаёт False, если уборку уже выполняет другой процесс.
+    """
+    with open(os.path.join(storage_dir, LOCK_NAME), "a") as lock:
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+        yield True
+
+
+def format_report(report: Dict[str, Dict], dry_run: bool = False) -> str:
+    parts = []
+    for bucket, s in report.items():
+        if dry_run:
+            text = f"{bucket}: проверено {s['scanned']}, можно удалить {s['orphans']} ({s['orphan_bytes']} байт)"
+        else:
+            text = f"{bucket}: проверено {s['scanned']}, удалено {s['deleted']} ({s['deleted_bytes']} байт)"
+        if s["young"]:
+            text += f", моложе срока ожидания {s['young']}"
+        if s.get("pack_garbage_bytes"):
+            text += f", в пак-файле {s['pack_garbage_bytes']} байт удалённых записей (migrate_storage.py --compact)"
+        parts.append(text)
+    return "; ".join(parts)
+
+
+class StorageCollector:
+    """Фоновый поток уборки: раз в interval_hours, один процесс за раз (flock на файле блокировки)"""
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.app = None
+
+    def init_app(self, app) -> None:
+        self.app = app
+        interval = float(app.config.get("GC_INTERVAL_HOURS", 0))
+        if interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, args=(interval,), name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def _loop(self, interval_hours: float) -> None:
+        while not self._stop.wait(interval_hours * 3600):
+            try:
+                self.run_once()
+            except Exception:
+                self.app.logger.exception("Уборка хранилища завершилась ошибкой")
+
+    def run_once(self) -> Optional[Dict]:
+        """Один проход уборки; None, если её уже выполняет другой процесс"""
+        with gc_lock(self.app.config["STORAGE_DIR"]) as acquired:
+            if not acquired:
+                return None
+            with self.app.app_context():
+                report = collect_orphans(
+                    grace_hours=float(self.app.config.get("GC_GRACE_HOURS", GRACE_HOURS)),
+                    max_files_per_second=float(self.app.config.get("GC_MAX_FILES_PER_SECOND", MAX_FILES_PER_SECOND)),
+                    stop=self._stop,
+                )
+            self.app.logger.info("Уборка хранилища: %s", format_report(report))
+            return report
+
+    def shutdown(self) -> None:
+        self._stop.set()
+
+
+storage_collector = StorageCollector()
@@ -0,0 +1,64 @@
+"""
+Миниатюры изображений истории.
+Создаются при первом запросе из оригинала в хранилище и кладутся в раздел "thumbs",
+поэтому страница истории не тянет полноразмерные коды и загрузки сканов.
+Имя миниатюры выводится из имени оригинала: <имя оригинала>.<раздел>.<размер>.webp —
+по нему уборка (storage_gc) узнаёт, жив ли оригинал.
+"""
+
+import io
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from .encoding import encode_image
+from .storage import image_storage
+
+THUMB_BUCKET = "thumbs"
+THUMB_PX = 120  # сторона миниатюры: на странице 60 px, запас для экранов с плотностью 2x
+
+
+def thumbnail_name(bucket: str, name: str, px: int = THUMB_PX) -> str:
+    return f"{name}.{bucket}.{px}.webp"
+
+
+def thumbnail_source(thumb_name: str) -> Optional[Tuple[str, str]]:
+    """(раздел, имя оригинала) по имени миниатюры или None"""
+    parts = thumb_name.rsplit(".", 3)
+    if len(parts) != 4 or parts[3] != "webp":
+        return None
+    return parts[1], parts[0]
+
+
+def make_thumbnail(data: bytes, px: int = THUMB_PX) -> Image.Image:
+    with Image.open(io.BytesIO(data)) as src:
+        # JPEG декодируется сразу в уменьшенном масштабе
+        src.draft("RGB", (px * 2, px * 2))
+        img = src.convert("RGBA" if src.mode in ("RGBA", "LA", "P") else "RGB")
+    img.thumbnail((px, px), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    return img
+
+
+def ensure_thumbnail(ref: str, px: int = THUMB_PX) -> Optional[str]:
+    """
+    Имя миниатюры для ссылки из history.image_path; создаёт её при первом обращении.
+    None — оригинала нет или он не открывается.
+    """
+    target = image_storage.resolve_ref(ref)
+    if target is None or target[0] == THUMB_BUCKET:
+        return None
+    bucket, name = target
+    store = image_storage.bucket(bucket)
+    thumbs = image_storage.bucket(THUMB_BUCKET)
+    thumb = thumbnail_name(bucket, name, px)
+    if thumbs.exists(thumb):
+        return thumb
+    data = store.read(name)
+    if data is None:
+        return None
+    try:
+        img = make_thumbnail(data, px)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    thumbs.put(thumb, encode_image(img, "thumbnail")[0])
+    return thumb
@@ -0,0 +1,292 @@
+"""
+Векторный вывод кодов в SVG и PDF (reportlab).
+Модули и штрихи рисуются прямо из матрицы символа в миллиметрах,
+без растровых изображений, поэтому размер ГОСТ сохраняется при любой печати.
+"""
+
+import base64
+import io
+from typing import List, NamedTuple, Optional, Tuple
+
+from .gost_dimensions import get_dimension_by_code
+from .logos import logo_registry, LOGO_DIVISORS
+
+PX_TO_MM = 25.4 / 300  # размеры без ГОСТ задаются в пикселях при 300 DPI
+PT_PER_MM = 72 / 25.4
+
+
+class VectorSymbol(NamedTuple):
+    """Геометрия символа в миллиметрах"""
+    modules: "np.ndarray"   # матрица модулей, True — тёмный
+    module_w_mm: float      # ширина модуля
+    row_h_mm: float         # высота строки матрицы
+    quiet_x_mm: float       # тихая зона слева/справа
+    quiet_y_mm: float       # тихая зона сверху/снизу
+    human_text: str         # подпись под кодом
+    ecc: Optional[str]      # уровень коррекции QR (для логотипа)
+
+    @property
+    def symbol_width_mm(self) -> float:
+        return self.modules.shape[1] * self.module_w_mm + 2 * self.quiet_x_mm
+
+    @property
+    def symbol_height_mm(self) -> float:
+        return self.modules.shape[0] * self.row_h_mm + 2 * self.quiet_y_mm
+
+    @property
+    def font_mm(self) -> float:
+        return max(1.5, min(6.0, min(self.symbol_width_mm, self.symbol_height_mm) / 15))
+
+    @property
+    def text_band_mm(self) -> float:
+        return self.font_mm * 1.8 if self.human_text else 0.0
+
+    @property
+    def width_mm(self) -> float:
+        return self.symbol_width_mm
+
+    @property
+    def height_mm(self) -> float:
+        return self.symbol_height_mm + self.text_band_mm
+
+
+def _target_mm(gost_code: Optional[str], size: int) -> Tuple[Optional[float], float]:
+    """(ширина, высота) цели в мм; ширина None, если задана только высота в пикселях"""
+    if gost_code:
+        try:
+            dim = get_dimension_by_code(gost_code)
+            return dim.mm_width, dim.mm_height
+        except ValueError:
+            pass
+    return None, size * PX_TO_MM
+
+
+def build_vector_symbol(code_type: str, text: str, size: int = 300, human_text: str = "",
+                        gost_code: Optional[str] = None) -> Tuple[VectorSymbol, dict]:
+    """
+    Строит геометрию символа с той же подготовкой текста, что и generate_by_type.
+
+    Returns:
+        tuple: (геометрия, метаданные с информацией о транслитерации)
+    """
+    from . import codes
+    from .transliteration import prepare_text_for_barcode, transliterate_for_aztec, is_latin1_compatible
+
+    metadata = {"transliterated": False, "code_type": code_type}
+    kind = code_type.lower()
+    width_mm, height_mm = _target_mm(gost_code, size)
+    side_mm = width_mm or height_mm
+
+    if kind == "aztec":
+        if not is_latin1_compatible(text):
+            text, metadata["transliterated"] = transliterate_for_aztec(text)
+        modules = codes.aztec_modules(text)
+        mw = side_mm / (max(modules.shape) + 4)
+        return VectorSymbol(modules, mw, mw, 2 * mw, 2 * mw, "", None), metadata
+
+    processed = prepare_text_for_barcode(text, add_marker=True)
+
+    if kind in ["qr", "qrcode"]:
+        modules, ecc = codes.qr_modules(processed, "H")
+        modules = _as_array(modules)
+        mw = side_mm / (max(modules.shape) + 8)
+        return VectorSymbol(modules, mw, mw, 4 * mw, 4 * mw, "", ecc), metadata
+
+    if kind in ["dm", "datamatrix", "data_matrix"]:
+        modules = codes.dm_modules(processed)
+        mw = side_mm / (max(modules.shape) + 4)
+        return VectorSymbol(modules, mw, mw, 2 * mw, 2 * mw, "", None), metadata
+
+    if kind in ["code128", "c128"]:
+        from .code128 import QUIET_MODULES
+
+        modules = codes.code128_modules(processed)
+        quiet = QUIET_MODULES
+        if width_mm:
+            mw = width_mm / (modules.shape[1] + 2 * quiet)
+        else:
+            # Та же ширина модуля, что и у растрового Code128
+            mw = max(0.15, 0.1 + len(processed) * 0.01)
+        return VectorSymbol(modules, mw, height_mm, quiet * mw, 0.0, human_text or "", None), metadata
+
+    if kind == "pdf417":
+        from .pdf417_layout import plan_pdf417, QUIET_MODULES
+
+        layout = plan_pdf417(processed, size=size, gost_code=gost_code)
+        modules = codes.pdf417_modules(processed, columns=layout.columns, security_level=layout.security_level)
+        rows, cols = modules.shape
+        quiet = QUIET_MODULES
+        mw = height_mm / (rows * 3 + 2 * quiet)
+        if width_mm:
+            mw = min(mw, width_mm / (cols + 2 * quiet))
+        return VectorSymbol(modules, mw, mw * 3, quiet * mw, quiet * mw, human_text or "", None), metadata
+
+    raise ValueError(f"Неизвестный тип кода: {code_type}")
+
+
+def _as_array(modules):
+    import numpy as np
+    return np.asarray(modules, dtype=bool)
+
+
+def _runs(modules):
+    """Серии тёмных модулей всей матрицы за один проход: (строки, начала, длины)"""
+    import numpy as np
+
+    padded = np.pad(np.asarray(modules, dtype=np.int8), ((0, 0), (1, 1)))
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _rows_end, ends = np.nonzero(edges == -1)
+    return rows, starts, ends - starts
+
+
+def _fmt(v: float) -> str:
+    return f"{v:.3f}".rstrip("0").rstrip(".")
+
+
+def symbol_to_svg(symbol: VectorSymbol) -> str:
+    """SVG с размерами в мм: один path из прямоугольников-серий"""
+    from xml.sax.saxutils import escape
+
+    w, h = symbol.width_mm, symbol.height_mm
+    mw, rh = symbol.module_w_mm, symbol.row_h_mm
+    rows, starts, lengths = _runs(symbol.modules)
+    h_rh = _fmt(rh)
+    parts = []
+    for r, c, n in zip(rows.tolist(), starts.tolist(), lengths.tolist()):
+        x = symbol.quiet_x_mm + c * mw
+        y = symbol.quiet_y_mm + r * rh
+        w_run = _fmt(n * mw)
+        parts.append(f"M{_fmt(x)} {_fmt(y)}h{w_run}v{h_rh}h-{w_run}z")
+
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="{_fmt(w)}mm" height="{_fmt(h)}mm" '
+        f'viewBox="0 0 {_fmt(w)} {_fmt(h)}" shape-rendering="crispEdges">',
+        f'<rect width="{_fmt(w)}" height="{_fmt(h)}" fill="#fff"/>',
+        f'<path fill="#000" d="{"".join(parts)}"/>',
+    ]
+
+    logo = _logo_box(symbol)
+    if logo is not None:
+        size, offset_x, offset_y, raw = logo
+        b64 = base64.b64encode(raw).decode("ascii")
+        out.append(f'<image x="{_fmt(offset_x)}" y="{_fmt(offset_y)}" width="{_fmt(size)}" height="{_fmt(size)}" '
+                   f'href="data:image/png;base64,{b64}"/>')
+
+    if symbol.human_text:
+        y = symbol.symbol_height_mm + symbol.text_band_mm / 2
+        out.append(f'<text x="{_fmt(w / 2)}" y="{_fmt(y)}" font-family="DejaVu Sans, Arial, sans-serif" '
+                   f'font-size="{_fmt(symbol.font_mm)}" text-anchor="middle" dominant-baseline="central">'
+                   f'{escape(symbol.human_text)}</text>')
+    out.append("</svg>")
+    return "".join(out)
+
+
+def _logo_box(symbol: VectorSymbol):
+    """(сторона, x, y, байты PNG) логотипа QR в мм от левого верхнего угла или None"""
+    if not symbol.ecc:
+        return None
+    source = logo_registry.vector_asset()
+    if source is None:
+        return None
+    size = symbol.symbol_width_mm / LOGO_DIVISORS.get(symbol.ecc, LOGO_DIVISORS["L"])
+    return (size, (symbol.symbol_width_mm - size) / 2, (symbol.symbol_height_mm - size) / 2, source[1])
+
+
+def _label_font_name() -> str:
+    """Регистрирует TTF из font_registry в reportlab (для кириллицы), иначе Helvetica"""
+    from .fonts import font_registry
+
+    path = font_registry.path
+    if not path or not path.lower().endswith(".ttf"):
+        return "Helvetica"
+    try:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        if "LabelFont" not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont("LabelFont", path))
+        return "LabelFont"
+    except Exception:
+        return "Helvetica"
+
+
+def draw_symbol(canvas, symbol: VectorSymbol, x_pt: float, y_pt: float, scale: float = 1.0,
+                logo_form: Optional[str] = None) -> None:
+    """
+    Рисует символ на холсте reportlab; (x_pt, y_pt) — левый нижний угол,
+    scale — масштаб относительно физического размера.
+    logo_form — имя form XObject логотипа (см. define_logo_form), чтобы не встраивать его повторно.
+    """
+    k = PT_PER_MM * scale
+    top = y_pt + symbol.height_mm * k
+    mw, rh = symbol.module_w_mm * k, symbol.row_h_mm * k
+    left = x_pt + symbol.quiet_x_mm * k
+    first_row_top = top - symbol.quiet_y_mm * k
+
+    canvas.saveState()
+    # Все серии модулей одним оператором заливки: "x y w h re ... f"
+    rows, starts, lengths = _runs(symbol.modules)
+    ops = " ".join(
+        f"{left + c * mw:.3f} {first_row_top - (r + 1) * rh:.3f} {n * mw:.3f} {rh:.3f} re"
+        for r, c, n in zip(rows.tolist(), starts.tolist(), lengths.tolist())
+    )
+    if ops:
+        canvas.addLiteral(f"0 g {ops} f")
+
+    logo = _logo_box(symbol)
+    if logo is not None:
+        size, offset_x, offset_y, _raw = logo
+        lx, ly = x_pt + offset_x * k, top - (offset_y + size) * k
+        if logo_form:
+            canvas.saveState()
+            canvas.translate(lx, ly)
+            canvas.scale(size * k / LOGO_FORM_PT, size * k / LOGO_FORM_PT)
+            canvas.doForm(logo_form)
+            canvas.restoreState()
+        else:
+            from reportlab.lib.utils import ImageReader
+
+            image = logo_registry.vector_asset()[0]
+            canvas.drawImage(ImageReader(image), lx, ly, size * k, size * k, mask="auto")
+
+    if symbol.human_text:
+        font_pt = symbol.font_mm * k
+        canvas.setFont(_label_font_name(), font_pt)
+        baseline = top - (symbol.symbol_height_mm + symbol.text_band_mm / 2) * k - font_pt * 0.35
+        canvas.drawCentredString(x_pt + symbol.width_mm * k / 2, baseline, symbol.human_text)
+    canvas.restoreState()
+
+
+LOGO_FORM_PT = 100.0
+
+
+def define_logo_form(canvas, name: str = "qr_logo") -> Optional[str]:
+    """Рисует логотип один раз как form XObject размером LOGO_FORM_PT; None, если логотипа нет"""
+    asset = logo_registry.vector_asset()
+    if asset is None:
+        return None
+    from reportlab.lib.utils import ImageReader
+
+    canvas.beginForm(name, lowerx=0, lowery=0, upperx=LOGO_FORM_PT, uppery=LOGO_FORM_PT)
+    canvas.drawImage(ImageReader(asset[0]), 0, 0, LOGO_FORM_PT, LOGO_FORM_PT, mask="auto")
+    canvas.endForm()
+    return name
+
+
+def symbol_to_pdf(symbol: VectorSymbol, margin_mm: float = 12.7) -> bytes:
+    """PDF формата A4 с кодом по центру в натуральную величину (уменьшается, если не влезает)"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas as pdf_canvas
+
+    page_w, page_h = A4
+    w_pt, h_pt = symbol.width_mm * PT_PER_MM, symbol.height_mm * PT_PER_MM
+    margin = margin_mm * PT_PER_MM
+    scale = min(1.0, (page_w - 2 * margin) / w_pt, (page_h - 2 * margin) / h_pt)
+
+    out = io.BytesIO()
+    c = pdf_canvas.Canvas(out, pagesize=A4)
+    draw_symbol(c, symbol, (page_w - w_pt * scale) / 2, (page_h - h_pt * scale) / 2, scale)
+    c.showPage()
+    c.save()
+    return out.getvalue()
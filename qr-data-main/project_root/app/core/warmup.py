@@ -0,0 +1,123 @@
+"""
+Прогрев рабочего процесса.
+Импортирует библиотеки кодирования/декодирования и выполняет по одному
+крошечному кодированию и декодированию на каждую символику, чтобы первый
+запрос не платил за импорт и загрузку нативных библиотек.
+"""
+
+import time
+from typing import Callable, Dict, List, Tuple
+
+from PIL import Image
+
+
+def _step_numpy():
+    import numpy  # noqa: F401
+
+
+def _step_qr():
+    from .codes import generate_qr
+    generate_qr("warmup", 64)
+
+
+def _step_dm():
+    from .codes import generate_dm
+    generate_dm("warmup", 64)
+
+
+def _step_code128():
+    from .codes import generate_code128
+    generate_code128("warmup", 64)
+
+
+def _step_pdf417():
+    from .codes import generate_pdf417
+    generate_pdf417("warmup", 64)
+
+
+def _step_aztec():
+    from .codes import generate_aztec
+    generate_aztec("warmup", 64)
+
+
+def _sample_image() -> Image.Image:
+    from .codes import generate_qr
+    return generate_qr("warmup", 96)
+
+
+def _step_pyzbar():
+    from pyzbar import pyzbar
+    pyzbar.decode(_sample_image())
+
+
+def _step_pylibdmtx_decode():
+    from pylibdmtx.pylibdmtx import decode as dm_decode
+    dm_decode(_sample_image(), timeout=50)
+
+
+def _step_cv2():
+    import cv2
+    import numpy as np
+    cv2.QRCodeDetector().detectAndDecode(np.array(_sample_image().convert("L")))
+
+
+def _step_zxingcpp():
+    import zxingcpp
+    import numpy as np
+    zxingcpp.read_barcodes(np.array(_sample_image().convert("L")))
+
+
+def _step_pyzxing():
+    # JVM запускается на каждый скан, прогреть можно только поиск jar — и только если pyzxing в ходу
+    from . import decoders
+    import pyzxing  # noqa: F401
+    if decoders._enabled(decoders.DECODERS_BY_NAME["pyzxing"]):
+        decoders.java_reader()
+
+
+def _step_reportlab():
+    from reportlab.pdfgen import canvas  # noqa: F401
+
+
+WARMUP_STEPS: List[Tuple[str, Callable[[], None]]] = [
+    ("numpy", _step_numpy),
+    ("qrcode", _step_qr),
+    ("pylibdmtx.encode", _step_dm),
+    ("code128", _step_code128),
+    ("pdf417gen", _step_pdf417),
+    ("aztec", _step_aztec),
+    ("pyzbar", _step_pyzbar),
+    ("pylibdmtx.decode", _step_pylibdmtx_decode),
+    ("cv2", _step_cv2),
+    ("zxingcpp", _step_zxingcpp),
+    ("pyzxing", _step_pyzxing),
+    ("reportlab", _step_reportlab),
+]
+
+
+def warm_up() -> Dict[str, Dict]:
+    """
+    Выполняет шаги прогрева по порядку.
+
+    Returns:
+        {имя: {"ok": bool, "ms": время в мс, "error": текст ошибки при неудаче}}
+    """
+    report: Dict[str, Dict] = {}
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+            entry = {"ok": True}
+        except Exception as e:
+            entry = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        entry["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        report[name] = entry
+    return report
+
+
+def format_report(report: Dict[str, Dict]) -> str:
+    parts = []
+    for name, entry in report.items():
+        status = f"{entry['ms']} мс" if entry["ok"] else f"нет ({entry['error']})"
+        parts.append(f"{name}: {status}")
+    return "; ".join(parts)
@@ -21,6 +21,8 @@ def init_history_schema(app):
             );
             """
         )
+        # Файлы хранятся по содержимому и делятся между записями: ссылки считаются по image_path
+        db.execute("CREATE INDEX IF NOT EXISTS idx_history_image_path ON history(image_path)")
         db.commit()
 
 def add_history(user_id: int, action: str, code_type: str, form_type: Optional[str],
@@ -43,20 +45,32 @@ def list_history_by_user(user_id: int, limit: int = 200) -> List[Dict]:
     ).fetchall()
     return [dict(r) for r in rows]
 
-def _delete_files(paths: List[Optional[str]]) -> None:
-    for p in paths:
-        if p and isinstance(p, str):
-            try:
-                if os.path.isfile(p):
-                    os.remove(p)
-            except Exception:
-                pass
+def get_history_image(user_id: int, history_id: int) -> Optional[str]:
+    """image_path записи истории, если она принадлежит пользователю"""
+    db = get_db()
+    row = db.execute(
+        "SELECT image_path FROM history WHERE id = ? AND user_id = ?", (history_id, user_id)
+    ).fetchone()
+    return row["image_path"] if row else None
+
+def _release_files(paths: List[Optional[str]]) -> None:
+    """
+    Удаляет файлы, на которые больше не ссылается ни одна запись истории.
+    Вызывать после удаления строк из history (в той же транзакции).
+    """
+    from ..core.storage import image_storage
+
+    db = get_db()
+    for p in {p for p in paths if p and isinstance(p, str)}:
+        left = db.execute("SELECT COUNT(*) FROM history WHERE image_path = ?", (p,)).fetchone()[0]
+        if not left:
+            image_storage.release(p)
 
 def delete_history_by_user(user_id: int) -> None:
     db = get_db()
     rows = db.execute("SELECT image_path FROM history WHERE user_id = ?", (user_id,)).fetchall()
-    _delete_files([r["image_path"] for r in rows])
     db.execute("DELETE FROM history WHERE user_id = ?", (user_id,))
+    _release_files([r["image_path"] for r in rows])
     db.commit()
 
 def prune_history_by_user(user_id: int, keep: int = 100) -> None:
@@ -70,9 +84,9 @@ def prune_history_by_user(user_id: int, keep: int = 100) -> None:
     ).fetchall()
     if not rows:
         return
-    _delete_files([r["image_path"] for r in rows])
     ids = [str(r["id"]) for r in rows]
     db.execute(f"DELETE FROM history WHERE id IN ({','.join(['?']*len(ids))})", ids)
+    _release_files([r["image_path"] for r in rows])
     db.commit()
 
 def delete_history_older_than_days(user_id: int, days: int) -> None:
@@ -86,7 +100,7 @@ def delete_history_older_than_days(user_id: int, days: int) -> None:
     ).fetchall()
     if not rows:
         return
-    _delete_files([r["image_path"] for r in rows])
     ids = [str(r["id"]) for r in rows]
     db.execute(f"DELETE FROM history WHERE id IN ({','.join(['?']*len(ids))})", ids)
+    _release_files([r["image_path"] for r in rows])
     db.commit()
@@ -0,0 +1,132 @@
+from typing import List, Dict, Optional
+from ..extensions import get_db
+import json
+import time
+
+def _column_exists(table: str, column: str) -> bool:
+    db = get_db()
+    rows = db.execute(f"PRAGMA table_info({table})").fetchall()
+    return any(r["name"] == column for r in rows)
+
+def init_jobs_schema(app):
+    with app.app_context():
+        db = get_db()
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,                      -- uuid4 hex
+                user_id INTEGER,                          -- NULL для анонимных задач
+                kind TEXT NOT NULL,                       -- 'batch' | 'sheet' | 'scan' | 'import_excel'
+                status TEXT NOT NULL DEFAULT 'queued',    -- 'queued' | 'running' | 'done' | 'error'
+                progress_done INTEGER NOT NULL DEFAULT 0,
+                progress_total INTEGER NOT NULL DEFAULT 0,
+                result TEXT,                              -- JSON результата
+                artifact_path TEXT,                       -- файл результата в STORAGE_DIR/jobs/<id>/
+                artifact_name TEXT,                       -- имя файла для скачивания
+                artifact_mimetype TEXT,
+                error TEXT,
+                owner TEXT,                               -- процесс-исполнитель: хост:pid:метка запуска
+                heartbeat_at REAL,                        -- unix-время последнего сигнала исполнителя
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(user_id) REFERENCES users(id)
+            );
+            """
+        )
+        for column, ddl in (("owner", "owner TEXT"), ("heartbeat_at", "heartbeat_at REAL")):
+            if not _column_exists("jobs", column):
+                try:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {ddl}")
+                except Exception:
+                    pass
+        db.commit()
+
+def create_job(job_id: str, user_id: Optional[int], kind: str, total: int = 0, owner: Optional[str] = None) -> None:
+    db = get_db()
+    db.execute(
+        "INSERT INTO jobs (id, user_id, kind, progress_total, owner, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (job_id, user_id, kind, total, owner, time.time())
+    )
+    db.commit()
+
+def touch_jobs(owner: str) -> None:
+    """Сигнал исполнителя: его незавершённые задачи живы"""
+    db = get_db()
+    db.execute(
+        "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN ('queued', 'running')",
+        (time.time(), owner)
+    )
+    db.commit()
+
+def fail_stale_jobs(stale_seconds: float) -> int:
+    """
+    Помечает ошибкой незавершённые задачи, исполнитель которых давно не подавал сигнала
+    (процесс упал или перезапущен). Задачи живых процессов не трогает.
+    """
+    db = get_db()
+    cur = db.execute(
+        "UPDATE jobs SET status = 'error', error = ?, updated_at = CURRENT_TIMESTAMP "
+        "WHERE status IN ('queued', 'running') AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+        ("Прервано: процесс, выполнявший задачу, остановлен", time.time() - stale_seconds)
+    )
+    db.commit()
+    return cur.rowcount
+
+def get_job(job_id: str) -> Optional[Dict]:
+    db = get_db()
+    row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    job = dict(row)
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    return job
+
+def mark_job_running(job_id: str) -> None:
+    db = get_db()
+    db.execute("UPDATE jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP WHERE id = ?", (job_id,))
+    db.commit()
+
+def update_job_progress(job_id: str, done: int, total: Optional[int] = None) -> None:
+    db = get_db()
+    if total is None:
+        db.execute("UPDATE jobs SET progress_done = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (done, job_id))
+    else:
+        db.execute(
+            "UPDATE jobs SET progress_done = ?, progress_total = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (done, total, job_id)
+        )
+    db.commit()
+
+def finish_job(job_id: str, result: Optional[Dict], artifact_path: Optional[str] = None,
+               artifact_name: Optional[str] = None, artifact_mimetype: Optional[str] = None) -> None:
+    db = get_db()
+    db.execute(
+        "UPDATE jobs SET status = 'done', progress_done = MAX(progress_done, progress_total), result = ?, "
+        "artifact_path = ?, artifact_name = ?, artifact_mimetype = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (json.dumps(result, ensure_ascii=False) if result is not None else None,
+         artifact_path, artifact_name, artifact_mimetype, job_id)
+    )
+    db.commit()
+
+def fail_job(job_id: str, error: str) -> None:
+    db = get_db()
+    db.execute(
+        "UPDATE jobs SET status = 'error', error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (error, job_id)
+    )
+    db.commit()
+
+def delete_jobs_older_than_hours(hours: int) -> List[str]:
+    """
+    Удаляет завершённые задачи старше N часов, возвращает их id (для удаления артефактов).
+    """
+    db = get_db()
+    rows = db.execute(
+        "SELECT id FROM jobs WHERE status IN ('done', 'error') AND updated_at < datetime('now', ?)",
+        (f"-{int(hours)} hours",)
+    ).fetchall()
+    ids = [r["id"] for r in rows]
+    if ids:
+        db.execute(f"DELETE FROM jobs WHERE id IN ({','.join(['?']*len(ids))})", ids)
+        db.commit()
+    return ids
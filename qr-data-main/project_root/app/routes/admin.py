@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, abort, jsonify
 from functools import wraps
 from ..models.users import (
     list_users, create_user, delete_user, set_password, count_admins
@@ -72,3 +72,13 @@ def users_delete(user_id: int):
     else:
         flash("Не удалось удалить пользователя", "error")
     return redirect(url_for("admin.users_page"))
+
+@bp.route("/decode_stats", methods=["GET"])
+@login_required
+@admin_required
+def decode_stats():
+    """Статистика декодеров и уровней пирамиды — для настройки SCAN_PYRAMID_LEVELS и порядка декодеров"""
+    from ..core.decoders import decoder_stats
+    from ..core.pyramid import pyramid_stats
+
+    return jsonify({"ok": True, "decoders": decoder_stats.snapshot(), "pyramid": pyramid_stats.snapshot()})
@@ -1,9 +1,10 @@
 import os
 import io
-import uuid
 import base64
+import hashlib
+import tempfile
 from typing import Dict, List, Tuple, Optional
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, send_from_directory, send_file, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, send_file, jsonify, Response, abort
 from functools import wraps
 from PIL import Image
 from ..core.forms_parser import (
@@ -15,23 +16,35 @@ from ..core.forms_parser import (
     custom_make_string, custom_parse_string,
     detect_form_by_prefix
 )
-from ..core.codes import generate_qr, generate_dm, save_image, generate_by_type
+from ..core.codes import generate_qr, generate_dm, generate_by_type, render_key, render_version
+from ..core.encoding import encode_image, PROFILES
+from ..core.render_tokens import render_tokens
+from ..core.storage import image_storage
+from ..core.qr_capacity import select_qr_params
+from ..core.pdf417_layout import plan_pdf417
+from ..core.transliteration import prepare_text_for_barcode
+from ..core.vector import build_vector_symbol, symbol_to_svg, symbol_to_pdf
+from ..core.batch import normalize_batch_item, run_batch, iter_batch_zip, iter_batch_ndjson, build_vector_item
+from ..core.sheets import sheet_layout, symbol_key, write_sheet_pdf
 from ..models.history import add_history
+from ..core.jobs import job_manager, job_handler
+from .jobs import job_links
 import openpyxl
 
 bp = Blueprint("forms", __name__)
 
 def _save_and_maybe_log(img: Image.Image, text: str, code_type: str, form_type: Optional[str]) -> str:
-    fname = f"{uuid.uuid4().hex}.png"
-    fpath = os.path.join(current_app.config["STORAGE_CODES_DIR"], fname)
-    save_image(img, fpath)
+    fname, ref = image_storage.store_image("codes", img, current_app.config.get("STORAGE_IMAGE_PROFILE", "compact"))
     if session.get("user"):
-        add_history(session["user"]["id"], "created", code_type, form_type, text, fpath)
+        add_history(session["user"]["id"], "created", code_type, form_type, text, ref)
     return fname
 
 @bp.route("/code/<path:filename>")
 def code_image(filename: str):
-    return send_from_directory(current_app.config["STORAGE_CODES_DIR"], filename, as_attachment=False)
+    resp = image_storage.response("codes", filename)
+    if resp is None:
+        abort(404)
+    return resp
 
 # ----------------- CREATE (live) -----------------
 @bp.route("/create", methods=["GET"])
@@ -55,15 +68,23 @@ def api_generate_code():
     if code_type.upper() in ['C128', 'PDF417'] and text_under:
         human_text = text_under
     
+    # "preview" — WebP без потерь для показа на странице; по умолчанию PNG для скачивания
+    profile = data.get("profile") or current_app.config.get("OUTPUT_IMAGE_PROFILE", "compact")
+    if profile not in PROFILES:
+        return jsonify({"ok": False, "error": "Неизвестный профиль кодирования"}), 400
+
     img, metadata = generate_by_type(code_type, text, size=size, human_text=human_text, gost_code=gost_code)
-    bio = io.BytesIO()
-    img.save(bio, format="PNG", optimize=True)
-    b64 = base64.b64encode(bio.getvalue()).decode("ascii")
-    
     response_data = {
-        "ok": True, 
-        "data_url": f"data:image/png;base64,{b64}"
+        "ok": True,
+        "token": render_tokens.issue(code_type, text, size, human_text, gost_code, metadata),
+        "image_url": render_url(code_type, text, size, human_text, gost_code,
+                                "webp" if profile == "preview" else "png"),
     }
+    # inline=false — клиенту достаточно image_url, base64-копию не строим
+    if data.get("inline", True):
+        raw, mimetype, _ext = encode_image(img, profile)
+        b64 = base64.b64encode(raw).decode("ascii")
+        response_data["data_url"] = f"data:{mimetype};base64,{b64}"
     
     # Добавляем предупреждение о транслитерации
     if metadata.get("transliterated"):
@@ -71,19 +92,302 @@ def api_generate_code():
     
     return jsonify(response_data)
 
+# ----------------- RENDER (GET, кэшируемый) -----------------
+RENDER_FORMATS = ("png", "webp", "svg")
+RENDER_MAX_SIZE = 4000
+RENDER_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def render_url(code_type: str, text: str, size: int = 300, human_text: str = "", gost_code: Optional[str] = None,
+               fmt: str = "png") -> str:
+    """
+    Адрес /forms/render для параметров generate_by_type.
+    v — версия отрисовки: после обновления рендерера или логотипа адрес меняется,
+    поэтому ответ можно кэшировать как неизменяемый.
+    """
+    params = {"t": code_type, "d": text, "s": size, "f": fmt,
+              "v": hashlib.sha256(render_version().encode("utf-8")).hexdigest()[:8]}
+    if human_text:
+        params["h"] = human_text
+    if gost_code:
+        params["g"] = gost_code
+    return url_for("forms.render_code", **params)
+
+@bp.route("/render", methods=["GET"])
+def render_code():
+    """
+    Изображение кода без base64: /forms/render?t=qr&s=300&g=QR-S2&d=<данные>[&h=подпись][&f=png|webp|svg].
+    Ответ помечен сильным ETag по ключу render_cache; при совпадении If-None-Match — 304 без отрисовки.
+    """
+    text = (request.args.get("d") or "").strip()
+    code_type = request.args.get("t") or "QR"
+    human_text = (request.args.get("h") or "").strip()
+    gost_code = request.args.get("g") or None
+    fmt = (request.args.get("f") or "png").lower()
+    try:
+        size = int(request.args.get("s") or 300)
+    except ValueError:
+        size = 0
+    if not text:
+        return jsonify({"ok": False, "error": "Пустой текст"}), 400
+    if fmt not in RENDER_FORMATS:
+        return jsonify({"ok": False, "error": "Неизвестный формат изображения"}), 400
+    if not 1 <= size <= RENDER_MAX_SIZE:
+        return jsonify({"ok": False, "error": "Недопустимый размер"}), 400
+
+    profile = "preview" if fmt == "webp" else current_app.config.get("OUTPUT_IMAGE_PROFILE", "compact")
+    etag = f"{render_key(code_type, text, size, human_text, gost_code)[:32]}-{fmt if fmt == 'svg' else profile}"
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        try:
+            if fmt == "svg":
+                symbol, _metadata = build_vector_symbol(code_type, text, size=size, human_text=human_text,
+                                                        gost_code=gost_code)
+                body, mimetype = symbol_to_svg(symbol).encode("utf-8"), "image/svg+xml"
+            else:
+                img, _metadata = generate_by_type(code_type, text, size=size, human_text=human_text,
+                                                  gost_code=gost_code)
+                body, mimetype, _ext = encode_image(img, profile)
+        except (ValueError, RuntimeError) as e:
+            # Ошибки ввода (в т.ч. RuntimeError Code128 на непредставимый текст) — 400 без кэширования
+            resp = jsonify({"ok": False, "error": str(e)})
+            resp.headers["Cache-Control"] = "no-store"
+            return resp, 400
+        resp = Response(body, mimetype=mimetype)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = RENDER_CACHE_CONTROL
+    return resp
+
+@bp.route("/api_qr_plan", methods=["POST"])
+def api_qr_plan():
+    """Уровень коррекции и версия QR для текста — без отрисовки, для живого предпросмотра"""
+    data = request.get_json(force=True, silent=True) or {}
+    text = (data.get("text") or "").strip()
+    if not text:
+        return jsonify({"ok": False, "error": "Пустой текст"}), 400
+    processed = prepare_text_for_barcode(text, add_marker=True)
+    plan = select_qr_params(processed, data.get("ecc") or "H")
+    if plan is None:
+        return jsonify({"ok": False, "error": "Слишком длинный текст для QR даже на уровне L"})
+    return jsonify({
+        "ok": True,
+        "ecc": plan.ecc,
+        "version": plan.version,
+        "modules": 17 + 4 * plan.version,
+        "used_bits": plan.data_bits,
+        "capacity_bits": plan.capacity_bits,
+    })
+
+@bp.route("/api_pdf417_plan", methods=["POST"])
+def api_pdf417_plan():
+    """Геометрия PDF417 (столбцы, строки, коррекция, шаг модуля) без отрисовки"""
+    data = request.get_json(force=True, silent=True) or {}
+    text = (data.get("text") or "").strip()
+    if not text:
+        return jsonify({"ok": False, "error": "Пустой текст"}), 400
+    processed = prepare_text_for_barcode(text, add_marker=True)
+    try:
+        layout = plan_pdf417(processed, size=int(data.get("size") or 300), gost_code=data.get("gost_code"))
+    except ValueError:
+        return jsonify({"ok": False, "error": "Слишком длинный текст для PDF417"})
+    return jsonify({
+        "ok": True,
+        "columns": layout.columns,
+        "rows": layout.rows,
+        "security_level": layout.security_level,
+        "module_px": layout.module_px,
+        "row_px": layout.row_px,
+        "width_px": layout.width_px,
+        "height_px": layout.height_px,
+        "width_mm": round(layout.width_mm, 2),
+        "height_mm": round(layout.height_mm, 2),
+        "data_codewords": layout.data_codewords,
+        "fits": layout.fits,
+    })
+
+@bp.route("/api_generate_batch", methods=["POST"])
+def api_generate_batch():
+    data = request.get_json(force=True, silent=True) or {}
+    raw_items = data.get("items")
+    fmt = (data.get("format") or "zip").lower()
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"ok": False, "error": "Пустой пакет"}), 400
+    max_items = current_app.config.get("BATCH_MAX_ITEMS", 1000)
+    if len(raw_items) > max_items:
+        return jsonify({"ok": False, "error": f"Слишком много элементов (максимум {max_items})"}), 400
+    if fmt not in ("zip", "ndjson"):
+        return jsonify({"ok": False, "error": "Неизвестный формат"}), 400
+
+    items = []
+    for raw in raw_items:
+        try:
+            items.append(normalize_batch_item(raw))
+        except (ValueError, TypeError) as e:
+            items.append(str(e))
+
+    workers = current_app.config.get("BATCH_WORKERS") or None
+    if data.get("async"):
+        return _submit_job("batch", {"items": items, "format": fmt, "workers": workers}, total=len(items))
+
+    results = run_batch(items, workers=workers)
+    if fmt == "ndjson":
+        return Response(iter_batch_ndjson(results), mimetype="application/x-ndjson")
+    return Response(iter_batch_zip(results), mimetype="application/zip",
+                    headers={"Content-Disposition": "attachment; filename=codes.zip"})
+
+def _submit_job(kind: str, params: Dict, total: int = 0, inputs: Optional[Dict] = None):
+    """Ставит задачу в очередь и отвечает 202 с адресами опроса"""
+    user_id = session["user"]["id"] if session.get("user") else None
+    try:
+        job_id = job_manager.submit(kind, params, user_id=user_id, total=total, inputs=inputs)
+    except RuntimeError as e:
+        return jsonify({"ok": False, "error": str(e)}), 503
+    return jsonify(job_links(job_id)), 202
+
+@job_handler("batch")
+def _batch_job(ctx, params: Dict) -> Dict:
+    items = params["items"]
+    counts = {"ok": 0, "errors": 0}
+
+    def counted(results):
+        for index, result in enumerate(results, start=1):
+            counts["ok" if result.get("ok") else "errors"] += 1
+            yield result
+            ctx.progress(index, len(items))
+
+    results = counted(run_batch(items, workers=params.get("workers")))
+    if params["format"] == "ndjson":
+        name, mimetype, chunks = "codes.ndjson", "application/x-ndjson", iter_batch_ndjson(results)
+    else:
+        name, mimetype, chunks = "codes.zip", "application/zip", iter_batch_zip(results)
+    path = ctx.path(name)
+    with open(path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    ctx.set_artifact(path, name, mimetype)
+    return {"items": len(items), "ok": counts["ok"], "errors": counts["errors"]}
+
+@bp.route("/api_sheet", methods=["POST"])
+def api_sheet():
+    """Многостраничный PDF листов A4: items — строки или {text, human_text, copies}"""
+    data = request.get_json(force=True, silent=True) or {}
+    raw_items = data.get("items")
+    code_type = data.get("code_type") or "QR"
+    gost_code = data.get("gost_code")
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"ok": False, "error": "Пустой список"}), 400
+    try:
+        layout = sheet_layout(gost_code, float(data.get("margin_mm") or 5.0))
+    except (ValueError, TypeError):
+        return jsonify({"ok": False, "error": "Укажите корректный ГОСТ-размер"}), 400
+
+    sequence: List[Optional[str]] = []
+    distinct: Dict[str, Dict] = {}
+    for raw in raw_items:
+        entry = {"text": raw} if isinstance(raw, str) else (raw if isinstance(raw, dict) else {})
+        text = (entry.get("text") or "").strip()
+        human_text = (entry.get("human_text") or "").strip()
+        try:
+            copies = max(1, int(entry.get("copies") or 1))
+        except (ValueError, TypeError):
+            copies = 1
+        key = symbol_key(code_type, text, human_text) if text else None
+        if key and key not in distinct:
+            distinct[key] = {"text": text, "code_type": code_type, "size": 300,
+                             "gost_code": gost_code, "human_text": human_text}
+        sequence.extend([key] * copies)
+
+    max_items = current_app.config.get("BATCH_MAX_ITEMS", 1000)
+    if len(sequence) > max_items * 10 or len(distinct) > max_items:
+        return jsonify({"ok": False, "error": f"Слишком много этикеток (максимум {max_items} разных)"}), 400
+
+    workers = current_app.config.get("BATCH_WORKERS") or None
+    if data.get("async"):
+        params = {"distinct": distinct, "sequence": sequence, "layout": layout, "gost_code": gost_code,
+                  "workers": workers}
+        return _submit_job("sheet", params, total=len(distinct))
+
+    symbols, errors = _build_sheet_symbols(distinct, workers)
+    if not symbols:
+        return jsonify({"ok": False, "error": "Не удалось построить ни одного кода", "errors": errors}), 400
+
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    pages = write_sheet_pdf(out, symbols, sequence, layout)
+    out.seek(0)
+    response = send_file(out, as_attachment=True, download_name=f"labels_{gost_code}.pdf", mimetype="application/pdf")
+    response.headers["X-Sheet-Pages"] = str(pages)
+    response.headers["X-Sheet-Errors"] = str(len(errors))
+    return response
+
+def _build_sheet_symbols(distinct: Dict[str, Dict], workers: Optional[int], on_progress=None) -> Tuple[Dict, List]:
+    """Уникальные символы листа строятся параллельно в пуле процессов"""
+    keys = list(distinct)
+    symbols = {}
+    errors = []
+    results = run_batch([distinct[k] for k in keys], workers=workers, fn=build_vector_item)
+    for index, (key, result) in enumerate(zip(keys, results), start=1):
+        if result.get("ok"):
+            symbols[key] = result["symbol"]
+        else:
+            errors.append({"text": distinct[key]["text"][:80], "error": result.get("error")})
+        if on_progress:
+            on_progress(index, len(keys))
+    return symbols, errors
+
+@job_handler("sheet")
+def _sheet_job(ctx, params: Dict) -> Dict:
+    symbols, errors = _build_sheet_symbols(params["distinct"], params.get("workers"), ctx.progress)
+    if not symbols:
+        raise ValueError("Не удалось построить ни одного кода")
+    name = f"labels_{params['gost_code']}.pdf"
+    path = ctx.path(name)
+    with open(path, "wb") as f:
+        pages = write_sheet_pdf(f, symbols, params["sequence"], params["layout"])
+    ctx.set_artifact(path, name, "application/pdf")
+    return {"pages": pages, "errors": errors}
+
 @bp.route("/api_save", methods=["POST"])
 def api_save_code():
     text = (request.form.get("text") or "").strip()
     code_type = request.form.get("code_type") or "QR"
     size = int(request.form.get("size") or 300)
     gost_code = request.form.get("gost_code")
+    human_text = ""
     fmt = (request.form.get("fmt") or "png").lower()
+
+    # Токен из api_generate: сохраняем то же изображение, что было в предпросмотре
+    token = request.form.get("token")
+    ticket = render_tokens.lookup(token)
+    if ticket is not None:
+        code_type, text, size = ticket.code_type, ticket.text, ticket.size
+        human_text, gost_code = ticket.human_text, ticket.gost_code
     if not text:
         flash("Пустой текст", "error")
         return redirect(url_for("forms.create_free"))
 
-    img, metadata = generate_by_type(code_type, text, size=size, gost_code=gost_code)
-    
+    # PDF и SVG строятся из матрицы символа; растр нужен только для PNG/JPG и истории
+    symbol = None
+    metadata = dict(ticket.metadata) if ticket is not None else {}
+    if fmt in ("pdf", "svg"):
+        try:
+            symbol, metadata = build_vector_symbol(code_type, text, size=size, human_text=human_text,
+                                                   gost_code=gost_code)
+        except Exception:
+            symbol = None
+
+    img = None
+    if symbol is None or session.get("user"):
+        rendered = render_tokens.image(token) if ticket is not None else None
+        if rendered is not None:
+            img = rendered[0]
+        else:
+            try:
+                img, metadata = generate_by_type(code_type, text, size=size, human_text=human_text,
+                                                 gost_code=gost_code)
+            except (ValueError, RuntimeError) as e:
+                flash(str(e), "error")
+                return redirect(url_for("forms.create_free"))
+
     if metadata.get("transliterated"):
         flash("Кириллический текст был автоматически транслитерирован в латиницу для совместимости с Aztec-кодом", "info")
 
@@ -92,9 +396,17 @@ def api_save_code():
 
     out = io.BytesIO()
     download_name = f"code.{fmt}"
-    if fmt == "jpg":
+    mimetype = "image/png"
+    if fmt == "svg" and symbol is not None:
+        out.write(symbol_to_svg(symbol).encode("utf-8"))
+        mimetype = "image/svg+xml"
+    elif fmt == "pdf" and symbol is not None:
+        out.write(symbol_to_pdf(symbol))
+        mimetype = "application/pdf"
+    elif fmt == "jpg":
         rgb = img.convert("RGB")
         rgb.save(out, format="JPEG", quality=95, optimize=True)
+        mimetype = "image/jpeg"
     elif fmt == "pdf":
         try:
             from reportlab.pdfgen import canvas
@@ -112,15 +424,15 @@ def api_save_code():
             c.showPage(); c.save()
             out_pdf.seek(0)
             out = out_pdf
+            mimetype = "application/pdf"
         except Exception:
-            img.save(out, format="PNG", optimize=True)
+            out.write(encode_image(img, current_app.config.get("OUTPUT_IMAGE_PROFILE", "compact"))[0])
             download_name = "code.pdf"
     else:
-        img.save(out, format="PNG", optimize=True)
+        out.write(encode_image(img, current_app.config.get("OUTPUT_IMAGE_PROFILE", "compact"))[0])
         download_name = "code.png"
 
     out.seek(0)
-    mimetype = "image/png" if fmt in ("png","pdf") else "image/jpeg"
     return send_file(out, as_attachment=True, download_name=download_name, mimetype=mimetype)
 
 @bp.route("/api_save_history_copy", methods=["POST"])
@@ -129,21 +441,36 @@ def api_save_history_copy():
     data_url = data.get("data_url") or ""
     text = (data.get("text") or "").strip()
     code_type = data.get("code_type") or "QR"
-    if not text or not data_url.startswith("data:image/"):
+    token = data.get("token")
+    rendered = render_tokens.image(token) if token else None
+    if token and rendered is None:
+        return jsonify({"ok": False, "error": "Срок действия изображения истёк, сгенерируйте код заново"}), 410
+    if rendered is not None:
+        img, ticket = rendered
+        text, code_type = ticket.text, ticket.code_type
+    elif not text or (data_url and not data_url.startswith("data:image/")):
         return jsonify({"ok": False, "error": "Некорректные данные"}), 400
-    try:
-        head, b64 = data_url.split(",", 1)
-        raw = base64.b64decode(b64)
-        img = Image.open(io.BytesIO(raw)).convert("RGB")
-    except Exception as e:
-        return jsonify({"ok": False, "error": f"Не удалось разобрать изображение: {e}"}), 400
+    elif data_url:
+        try:
+            head, b64 = data_url.split(",", 1)
+            raw = base64.b64decode(b64)
+            img = Image.open(io.BytesIO(raw)).convert("RGB")
+        except Exception as e:
+            return jsonify({"ok": False, "error": f"Не удалось разобрать изображение: {e}"}), 400
+    else:
+        # Без data_url — те же параметры, что у api_generate; изображение берётся из render_cache
+        try:
+            img, _metadata = generate_by_type(code_type, text, size=int(data.get("size") or 300),
+                                              human_text=(data.get("human_text") or "").strip(),
+                                              gost_code=data.get("gost_code"))
+        except (ValueError, RuntimeError) as e:
+            return jsonify({"ok": False, "error": str(e)}), 400
 
     form_type = detect_form_by_prefix(text)
     if session.get("user"):
-        fname = f"{uuid.uuid4().hex}.png"
-        fpath = os.path.join(current_app.config["STORAGE_CODES_DIR"], fname)
-        save_image(img, fpath)
-        add_history(session["user"]["id"], "created", code_type, form_type, text, fpath)
+        fname, ref = image_storage.store_image("codes", img,
+                                               current_app.config.get("STORAGE_IMAGE_PROFILE", "compact"))
+        add_history(session["user"]["id"], "created", code_type, form_type, text, ref)
         return jsonify({"ok": True, "file": fname})
     return jsonify({"ok": True})
 
@@ -213,66 +540,76 @@ def api_import_excel():
     file = request.files.get("excel")
     if not file:
         return jsonify({"ok": False, "error": "Файл не выбран"}), 400
+    if request.form.get("async"):
+        return _submit_job("import_excel", {}, inputs={"workbook.xlsx": file})
     try:
-        wb = openpyxl.load_workbook(file)
-        ws = wb.active
-        values: Dict[str, str] = {}
-        torg_hits = 0
-        msg_hits  = 0
-        exp_cols  = 0
-        trn_cols  = 0
-        rows_data: List[List[str]] = []
-        for row in ws.iter_rows(values_only=True):
-            if not row: continue
-            row_vals = ["" if v is None else str(v).strip() for v in row]
-            rows_data.append(row_vals)
-
-            code = row_vals[0] if row_vals else ""
-            if len(code) == 2 and code.isdigit():
-                torg_hits += 1
-                if len(row_vals) > 2: values[code] = row_vals[2]
-
-            if len(row_vals) >= 2 and (row_vals[0] or row_vals[1]):
-                msg_hits += 1
-
-            exp_cols = max(exp_cols, len(row_vals))
-            trn_cols = max(trn_cols, len(row_vals))
-
-        if torg_hits >= 10:
-            text = torg12_make_string(values)
-            headers = ["Код","Наименование","Значение"]
-            rows = [[code, label, values.get(code, "")] for code, label in TORG12_FIELDS]
-            return jsonify({"ok": True, "form_type":"torg12", "text": text, "headers": headers, "rows": rows})
-
-        if msg_hits >= 1 and exp_cols <= 3:
-            pairs = []
-            for r in rows_data:
-                p = r[0] if len(r)>0 else ""
-                v = r[1] if len(r)>1 else ""
-                if p or v: pairs.append((p, v))
-            text = env_make_string(pairs)
-            return jsonify({"ok": True, "form_type":"message", "text": text, "headers":["Параметр","Значение"], "rows":[[p,v] for p,v in pairs]})
-
-        if exp_cols >= 5:
-            rows = [r[:5] + [""]*(5-len(r)) for r in rows_data if any(r)]
-            text = exploitation_make_string([tuple(rr) for rr in rows])  # type: ignore
-            return jsonify({"ok": True, "form_type":"exploitation", "text": text,
-                            "headers":["Обозначение СЧ","Входимость СЧ","Носитель маркировки","Серийный номер","Уникальный идентификатор"],
-                            "rows": rows})
-        if trn_cols == 4:
-            rows = [r[:4] + [""]*(4-len(r)) for r in rows_data if any(r)]
-            text = transport_make_string([tuple(rr) for rr in rows])  # type: ignore
-            return jsonify({"ok": True, "form_type":"transport", "text": text,
-                            "headers":["Номер знака","Значение","Вид данных","Цифровое значение"],
-                            "rows": rows})
-
-        rows = [r for r in rows_data if any(r)]
-        text = custom_make_string(rows)
-        headers = [f"Колонка {i+1}" for i in range(max((len(r) for r in rows), default=0))]
-        return jsonify({"ok": True, "form_type":"custom", "text": text, "headers": headers, "rows": rows})
+        return jsonify(_parse_excel_import(file))
     except Exception as e:
         return jsonify({"ok": False, "error": f"Ошибка Excel: {e}"}), 500
 
+@job_handler("import_excel")
+def _import_excel_job(ctx, params: Dict) -> Dict:
+    return _parse_excel_import(ctx.path("workbook.xlsx"))
+
+def _parse_excel_import(file) -> Dict:
+    """Определяет форму по содержимому листа и собирает строку кода и таблицу для предпросмотра"""
+    wb = openpyxl.load_workbook(file)
+    ws = wb.active
+    values: Dict[str, str] = {}
+    torg_hits = 0
+    msg_hits  = 0
+    exp_cols  = 0
+    trn_cols  = 0
+    rows_data: List[List[str]] = []
+    for row in ws.iter_rows(values_only=True):
+        if not row: continue
+        row_vals = ["" if v is None else str(v).strip() for v in row]
+        rows_data.append(row_vals)
+
+        code = row_vals[0] if row_vals else ""
+        if len(code) == 2 and code.isdigit():
+            torg_hits += 1
+            if len(row_vals) > 2: values[code] = row_vals[2]
+
+        if len(row_vals) >= 2 and (row_vals[0] or row_vals[1]):
+            msg_hits += 1
+
+        exp_cols = max(exp_cols, len(row_vals))
+        trn_cols = max(trn_cols, len(row_vals))
+
+    if torg_hits >= 10:
+        text = torg12_make_string(values)
+        headers = ["Код","Наименование","Значение"]
+        rows = [[code, label, values.get(code, "")] for code, label in TORG12_FIELDS]
+        return {"ok": True, "form_type":"torg12", "text": text, "headers": headers, "rows": rows}
+
+    if msg_hits >= 1 and exp_cols <= 3:
+        pairs = []
+        for r in rows_data:
+            p = r[0] if len(r)>0 else ""
+            v = r[1] if len(r)>1 else ""
+            if p or v: pairs.append((p, v))
+        text = env_make_string(pairs)
+        return {"ok": True, "form_type":"message", "text": text, "headers":["Параметр","Значение"], "rows":[[p,v] for p,v in pairs]}
+
+    if exp_cols >= 5:
+        rows = [r[:5] + [""]*(5-len(r)) for r in rows_data if any(r)]
+        text = exploitation_make_string([tuple(rr) for rr in rows])  # type: ignore
+        return {"ok": True, "form_type":"exploitation", "text": text,
+                "headers":["Обозначение СЧ","Входимость СЧ","Носитель маркировки","Серийный номер","Уникальный идентификатор"],
+                "rows": rows}
+    if trn_cols == 4:
+        rows = [r[:4] + [""]*(4-len(r)) for r in rows_data if any(r)]
+        text = transport_make_string([tuple(rr) for rr in rows])  # type: ignore
+        return {"ok": True, "form_type":"transport", "text": text,
+                "headers":["Номер знака","Значение","Вид данных","Цифровое значение"],
+                "rows": rows}
+
+    rows = [r for r in rows_data if any(r)]
+    text = custom_make_string(rows)
+    headers = [f"Колонка {i+1}" for i in range(max((len(r) for r in rows), default=0))]
+    return {"ok": True, "form_type":"custom", "text": text, "headers": headers, "rows": rows}
+
 # ----------------- FORMS PAGES -----------------
 @bp.route("/torg12", methods=["GET", "POST"])
 def form_torg12():
@@ -0,0 +1,96 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from flask import Blueprint, jsonify, session, send_file, url_for, Response, stream_with_context, current_app
+
+from ..models.jobs import get_job
+
+bp = Blueprint("jobs", __name__)
+
+FINISHED = ("done", "error")
+
+def _visible_job(job_id: str) -> Optional[Dict]:
+    """Задача, если она есть и принадлежит текущему пользователю (анонимные — по id)"""
+    job = get_job(job_id)
+    if not job:
+        return None
+    if job["user_id"] is not None:
+        user = session.get("user")
+        if not user or user["id"] != job["user_id"]:
+            return None
+    return job
+
+def _job_payload(job: Dict) -> Dict:
+    payload = {
+        "ok": True,
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": {"done": job["progress_done"], "total": job["progress_total"]},
+        "result": job["result"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    if job["status"] == "done" and job["artifact_path"]:
+        payload["artifact_url"] = url_for("jobs.job_artifact", job_id=job["id"])
+    return payload
+
+def job_links(job_id: str) -> Dict:
+    """Ответ на постановку задачи: id и адреса для опроса"""
+    return {
+        "ok": True,
+        "job_id": job_id,
+        "status_url": url_for("jobs.job_status", job_id=job_id),
+        "events_url": url_for("jobs.job_events", job_id=job_id),
+    }
+
+@bp.route("/<job_id>", methods=["GET"])
+def job_status(job_id: str):
+    job = _visible_job(job_id)
+    if not job:
+        return jsonify({"ok": False, "error": "Задача не найдена"}), 404
+    return jsonify(_job_payload(job))
+
+@bp.route("/<job_id>/events", methods=["GET"])
+def job_events(job_id: str):
+    """
+    Server-Sent Events: состояние задачи при каждом изменении, до завершения.
+    Поток держит синхронного воркера gunicorn, поэтому закрывается раньше его таймаута
+    (JOB_EVENTS_TIMEOUT < --timeout); EventSource сам переподключится через retry.
+    """
+    job = _visible_job(job_id)
+    if not job:
+        return jsonify({"ok": False, "error": "Задача не найдена"}), 404
+
+    interval = float(current_app.config.get("JOB_EVENTS_INTERVAL", 0.5))
+    timeout = float(current_app.config.get("JOB_EVENTS_TIMEOUT", 25))
+
+    def stream():
+        last = None
+        deadline = time.monotonic() + timeout
+        current = job
+        yield f"retry: {int(interval * 1000)}\n\n"
+        while True:
+            payload = _job_payload(current)
+            marker = (payload["status"], payload["progress"]["done"], payload["progress"]["total"])
+            if marker != last:
+                last = marker
+                yield f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            if current["status"] in FINISHED or time.monotonic() > deadline:
+                return
+            time.sleep(interval)
+            current = get_job(job_id) or current
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@bp.route("/<job_id>/artifact", methods=["GET"])
+def job_artifact(job_id: str):
+    job = _visible_job(job_id)
+    if not job or job["status"] != "done" or not job["artifact_path"] or not os.path.isfile(job["artifact_path"]):
+        return jsonify({"ok": False, "error": "Файл результата не найден"}), 404
+    return send_file(job["artifact_path"], as_attachment=True, download_name=job["artifact_name"],
+                     mimetype=job["artifact_mimetype"])
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, session, redirect, url_for, request, flash
+from flask import Blueprint, render_template, session, redirect, url_for, request, flash, abort
 from functools import wraps
-from ..models.history import list_history_by_user, delete_history_by_user
+from ..models.history import list_history_by_user, delete_history_by_user, get_history_image
+from ..core.storage import image_storage
+from ..core.thumbnails import ensure_thumbnail, THUMB_BUCKET
 
 bp = Blueprint("main", __name__)
 
@@ -24,6 +26,20 @@ def history_page():
     rows = list_history_by_user(u["id"], limit=300)
     return render_template("history.html", title="История", rows=rows)
 
+@bp.route("/history/thumb/<int:history_id>", methods=["GET"])
+@login_required
+def history_thumb(history_id: int):
+    """Миниатюра изображения записи: создаётся при первом запросе, дальше отдаётся из хранилища"""
+    ref = get_history_image(session["user"]["id"], history_id)
+    thumb = ensure_thumbnail(ref) if ref else None
+    resp = image_storage.response(THUMB_BUCKET, thumb) if thumb else None
+    if resp is None:
+        abort(404)
+    # Изображение записи не меняется, но страница личная — кэшировать только в браузере
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    return resp
+
 @bp.route("/history/clear", methods=["POST"])
 @login_required
 def history_clear():
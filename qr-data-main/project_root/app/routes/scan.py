@@ -1,17 +1,19 @@
 import io
 import os
-import uuid
 from typing import Optional
 
 from flask import (
     Blueprint, render_template, request, redirect, url_for,
-    flash, session, send_file, jsonify, current_app, send_from_directory
+    flash, session, send_file, jsonify, current_app, abort
 )
 from functools import wraps
 from PIL import Image
 from werkzeug.exceptions import RequestEntityTooLarge
 
-from ..core.codes import decode_auto, save_image
+from ..core.decoders import DecodeDeadlineExceeded
+from ..core.metadata import strip_metadata
+from ..core.pyramid import decode_pyramid, open_level, parse_levels
+from ..core.storage import image_storage
 from ..core.forms_parser import (
     detect_form_by_prefix,
     TORG12_FIELDS, torg12_parse_string,
@@ -19,10 +21,15 @@ from ..core.forms_parser import (
     transport_parse_string, custom_parse_string,
 )
 from ..models.history import add_history
+from ..core.jobs import job_manager, job_handler
+from .jobs import job_links
 import openpyxl
 
 bp = Blueprint("scan", __name__)
 
+# Загрузки этих форматов сохраняются без перекодирования (только без метаданных), остальные перекодируются
+STORED_AS_IS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
 @bp.route("/", methods=["GET"])
 def scan_page():
     user = session.get("user")
@@ -30,7 +37,10 @@ def scan_page():
 
 @bp.route("/upload/<path:filename>")
 def upload_image(filename: str):
-    return send_from_directory(current_app.config["STORAGE_UPLOADS_DIR"], filename, as_attachment=False)
+    resp = image_storage.response("uploads", filename)
+    if resp is None:
+        abort(404)
+    return resp
 
 @bp.route("/api", methods=["POST"])
 def scan_api():
@@ -49,35 +59,82 @@ def scan_api():
     if size_bytes is not None and size_bytes > 20 * 1024 * 1024:
         return jsonify({"ok": False, "error": "Файл больше 20 МБ"}), 413
 
+    # Полностью изображение здесь не декодируется: распознавание идёт по пирамиде разрешений
+    data = file.stream.read()
     try:
-        pil = Image.open(file.stream).convert("RGB")
+        with Image.open(io.BytesIO(data)) as probe:
+            image_format = probe.format
     except Exception as e:
         return jsonify({"ok": False, "error": f"Не удалось открыть изображение: {e}"}), 400
 
-    upload_fname = f"{uuid.uuid4().hex}.png"
-    upload_path = os.path.join(current_app.config["STORAGE_UPLOADS_DIR"], upload_fname)
-    upload_url = None
+    upload_ref = upload_url = None
     try:
-        save_image(pil, upload_path)
+        # Загрузка доступна по ссылке без авторизации — EXIF (GPS, устройство) в неё не попадает
+        try:
+            stripped = strip_metadata(data, image_format) if image_format in STORED_AS_IS else None
+        except ValueError:
+            stripped = None
+        if stripped is not None:
+            upload_fname, upload_ref = image_storage.store_bytes("uploads", stripped, STORED_AS_IS[image_format])
+        else:
+            upload_fname, upload_ref = image_storage.store_image("uploads", open_level(data))
         upload_url = url_for("scan.upload_image", filename=upload_fname)
     except Exception:
-        upload_path = None
-
+        upload_ref = None
+
+    user_id = session["user"]["id"] if session.get("user") else None
+    hint = request.form.get("hint") or None
+    if request.form.get("async") and upload_ref:
+        # Распознавание больших фото — в фоне; клиент опрашивает /jobs/<id>
+        params = {"upload_ref": upload_ref, "preview_url": upload_url, "user_id": user_id, "hint": hint}
+        try:
+            job_id = job_manager.submit("scan", params, user_id=user_id, total=1)
+        except RuntimeError as e:
+            return jsonify({"ok": False, "error": str(e), "preview_url": upload_url}), 503
+        return jsonify({**job_links(job_id), "preview_url": upload_url}), 202
+
+    payload, status = _decode_and_log(data, upload_ref, upload_url, user_id, hint,
+                                      current_app.config.get("SCAN_DECODE_DEADLINE_MS"))
+    return jsonify(payload), status
+
+@job_handler("scan")
+def _scan_job(ctx, params):
+    data = image_storage.read(params["upload_ref"])
+    if data is None:
+        raise RuntimeError("Загруженное изображение не найдено")
+    payload, _status = _decode_and_log(data, params["upload_ref"], params["preview_url"], params.get("user_id"),
+                                      params.get("hint"), current_app.config.get("SCAN_JOB_DECODE_DEADLINE_MS"))
+    ctx.progress(1, force=True)
+    return payload
+
+def _decode_and_log(data: bytes, upload_ref: Optional[str], upload_url: Optional[str],
+                    user_id: Optional[int], hint: Optional[str] = None, deadline_ms: Optional[int] = None):
+    """
+    Распознаёт код по пирамиде разрешений (hint — ожидаемая символика, deadline_ms — срок),
+    пишет историю и собирает ответ: (словарь ответа, HTTP-статус)
+    """
     try:
-        results = decode_auto(pil)
+        results, level = decode_pyramid(data, hint, deadline_ms,
+                                        parse_levels(current_app.config.get("SCAN_PYRAMID_LEVELS")),
+                                        int(current_app.config.get("SCAN_LOCALIZE_REGIONS", 0)))
+    except DecodeDeadlineExceeded:
+        return {"ok": False, "error": "Код не найден за отведённое время", "preview_url": upload_url}, 200
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        # Заголовок прочитан, но само изображение повреждено (обрезанный файл и т. п.) — ошибка клиента
+        return {"ok": False, "error": f"Не удалось открыть изображение: {e}", "preview_url": upload_url}, 400
     except Exception as e:
-        return jsonify({"ok": False, "error": f"Ошибка распознавания: {e}", "preview_url": upload_url}), 500
+        return {"ok": False, "error": f"Ошибка распознавания: {e}", "preview_url": upload_url}, 500
 
     if not results:
-        return jsonify({"ok": False, "error": "Ошибка сканирования или код не найден", "preview_url": upload_url}), 200
+        return {"ok": False, "error": "Ошибка сканирования или код не найден", "preview_url": upload_url}, 200
 
     r = results[0]
     text = r["text"]
     code_type = r["type"]
     form_type = detect_form_by_prefix(text)
 
-    if session.get("user"):
-        add_history(session["user"]["id"], "scanned", code_type, form_type, text, upload_path)
+    if user_id:
+        add_history(user_id, "scanned", code_type, form_type, text, upload_ref)
 
     open_url: Optional[str] = None
     if form_type == "torg12":
@@ -91,14 +148,15 @@ def scan_api():
     elif form_type == "custom":
         open_url = url_for("forms.form_custom", q=text, mode="table", from_scan="1")
 
-    return jsonify({
+    return {
         "ok": True,
         "code_type": code_type,
         "form_type": form_type,
         "text": text,
         "open_url": open_url,
-        "preview_url": upload_url
-    })
+        "preview_url": upload_url,
+        "decode_level": level
+    }, 200
 
 @bp.app_errorhandler(RequestEntityTooLarge)
 def too_large(e):
@@ -13,9 +13,69 @@ class Config:
     STORAGE_DIR = os.path.join(BASE_DIR, 'app', 'storage')
     STORAGE_CODES_DIR = os.path.join(STORAGE_DIR, 'codes')
     STORAGE_UPLOADS_DIR = os.path.join(STORAGE_DIR, 'uploads')
+    STORAGE_JOBS_DIR = os.path.join(STORAGE_DIR, 'jobs')
+    STORAGE_THUMBS_DIR = os.path.join(STORAGE_DIR, 'thumbs')
+    # Раскладка кодов и загрузок: sharded (каталоги ab/cd/) или pack (пак-файл с индексом)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'sharded')
+    # Уборка осиротевших файлов: период фонового прохода (0 — только скриптом gc_storage.py),
+    # срок ожидания для файлов без ссылок и предельная скорость обхода
+    GC_INTERVAL_HOURS = float(os.environ.get('GC_INTERVAL_HOURS', 0))
+    GC_GRACE_HOURS = float(os.environ.get('GC_GRACE_HOURS', 24))
+    GC_MAX_FILES_PER_SECOND = float(os.environ.get('GC_MAX_FILES_PER_SECOND', 2000))
     
     # Загрузки
     MAX_CONTENT_LENGTH = 20 * 1024 * 1024  # 20MB
+
+    # Кэш отрисованных кодов (память + диск в STORAGE_CODES_DIR/.render_cache)
+    RENDER_CACHE_ENABLED = os.environ.get('RENDER_CACHE_ENABLED', '1') == '1'
+    RENDER_CACHE_MEMORY_BYTES = int(os.environ.get('RENDER_CACHE_MEMORY_BYTES', 64 * 1024 * 1024))
+    RENDER_CACHE_DISK_BYTES = int(os.environ.get('RENDER_CACHE_DISK_BYTES', 512 * 1024 * 1024))
+    # Время жизни токена отрисовки из api_generate (секунды)
+    RENDER_TOKEN_TTL = int(os.environ.get('RENDER_TOKEN_TTL', 600))
+
+    # Логотип в центре QR-кода: путь к своему PNG (по умолчанию app/static/star.png)
+    QR_LOGO_PATH = os.environ.get('QR_LOGO_PATH')
+    QR_LOGO_ENABLED = os.environ.get('QR_LOGO_ENABLED', '1') == '1'
+
+    # Шрифт подписи под Code128/PDF417 (по умолчанию DejaVuSans или Arial)
+    LABEL_FONT_PATH = os.environ.get('LABEL_FONT_PATH')
+
+    # Распознавание: race — декодеры параллельно (DECODE_WORKERS потоков на процесс), cascade — по очереди;
+    # общий срок в мс для /scan/api и для фоновой задачи сканирования (0 — без срока)
+    DECODE_MODE = os.environ.get('DECODE_MODE', 'race')
+    DECODE_WORKERS = int(os.environ.get('DECODE_WORKERS', 4))
+    SCAN_DECODE_DEADLINE_MS = int(os.environ.get('SCAN_DECODE_DEADLINE_MS', 3000))
+    SCAN_JOB_DECODE_DEADLINE_MS = int(os.environ.get('SCAN_JOB_DECODE_DEADLINE_MS', 20000))
+
+    # Уровни пирамиды распознавания (длинная сторона в px), полное разрешение — всегда последним
+    SCAN_PYRAMID_LEVELS = os.environ.get('SCAN_PYRAMID_LEVELS', '1024,2048')
+    # Сколько вырезок-кандидатов (поиск областей кода) пробовать до кадра целиком; 0 — не искать
+    SCAN_LOCALIZE_REGIONS = int(os.environ.get('SCAN_LOCALIZE_REGIONS', 3))
+
+    # Распознавание через pyzxing (JVM на каждый скан) даже при установленном zxing-cpp
+    ZXING_JAVA_FALLBACK = os.environ.get('ZXING_JAVA_FALLBACK', '0') == '1'
+
+    # Прогрев библиотек кодирования/декодирования при создании приложения
+    WARMUP_ENABLED = os.environ.get('WARMUP_ENABLED', '1') == '1'
+
+    # Пакетная генерация: число рабочих процессов (0 — по числу ядер) и размер пакета
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 0))
+    BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 1000))
+
+    # Профили кодирования PNG (compact, fast, smallest, legacy; см. app/core/encoding.py):
+    # для файлов хранилища/истории и для ответов api_generate/api_save
+    STORAGE_IMAGE_PROFILE = os.environ.get('STORAGE_IMAGE_PROFILE', 'compact')
+    OUTPUT_IMAGE_PROFILE = os.environ.get('OUTPUT_IMAGE_PROFILE', 'compact')
+
+    # Фоновые задачи: потоки, лимит ожидающих задач и срок хранения результатов
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', 32))
+    JOB_RETENTION_HOURS = int(os.environ.get('JOB_RETENTION_HOURS', 24))
+    # Сигнал живости задач и срок, после которого задача без сигнала считается брошенной (секунды)
+    JOB_HEARTBEAT_SECONDS = int(os.environ.get('JOB_HEARTBEAT_SECONDS', 10))
+    JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 60))
+    # Поток /jobs/<id>/events закрывается раньше таймаута воркера gunicorn (30 с по умолчанию)
+    JOB_EVENTS_TIMEOUT = int(os.environ.get('JOB_EVENTS_TIMEOUT', 25))
     
     # Автоматическое создание админа
     AUTO_SEED_ADMIN = os.environ.get('AUTO_SEED_ADMIN', '1') == '1'
@@ -39,6 +99,7 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     DATABASE_PATH = ':memory:'
+    WARMUP_ENABLED = False
 
 
 config = {
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Уборка осиротевших файлов в хранилище кодов и загрузок.
+Удаляет файлы, на которые не ссылается история и к которым не обращались дольше
+срока ожидания (GC_GRACE_HOURS). Можно запускать при работающем приложении.
+
+    python gc_storage.py --dry-run             # сколько файлов и байт освободится
+    python gc_storage.py                       # удалить
+    python gc_storage.py --grace-hours 72 --rate 500
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.core.storage_gc import collect_orphans, format_report, gc_lock, GRACE_HOURS, MAX_FILES_PER_SECOND
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Уборка осиротевших файлов хранилища")
+    parser.add_argument("--dry-run", action="store_true", help="только отчёт, ничего не удалять")
+    parser.add_argument("--grace-hours", type=float, help=f"срок ожидания (по умолчанию GC_GRACE_HOURS или {GRACE_HOURS})")
+    parser.add_argument("--rate", type=float, help=f"файлов в секунду (по умолчанию {MAX_FILES_PER_SECOND})")
+    args = parser.parse_args()
+
+    os.environ.setdefault("WARMUP_ENABLED", "0")
+    os.environ["GC_INTERVAL_HOURS"] = "0"
+    app = create_app()
+    # Та же блокировка, что у фоновой уборки: два прохода одновременно удалили бы одни и те же файлы
+    with gc_lock(app.config["STORAGE_DIR"]) as acquired:
+        if not acquired:
+            print("Уборка уже выполняется другим процессом", file=sys.stderr)
+            return 1
+        with app.app_context():
+            report = collect_orphans(
+                grace_hours=args.grace_hours if args.grace_hours is not None else app.config.get("GC_GRACE_HOURS", GRACE_HOURS),
+                max_files_per_second=args.rate or app.config.get("GC_MAX_FILES_PER_SECOND", MAX_FILES_PER_SECOND),
+                dry_run=args.dry_run,
+            )
+    print(format_report(report, dry_run=args.dry_run))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Перенос кодов и загрузок в раскладку хранилища (sharded или pack).
+Файлы старой плоской раскладки и файлы другого бэкенда переименовываются по содержимому
+(SHA-256), одинаковые сливаются в один, а history.image_path переписывается на ссылки
+вида "<раздел>/<имя>". Запускать при остановленном приложении.
+
+    python migrate_storage.py                  # в бэкенд из STORAGE_BACKEND
+    python migrate_storage.py --to pack        # в пак-файл
+    python migrate_storage.py --dry-run        # только показать, что будет перенесено
+    python migrate_storage.py --compact        # после переноса сжать пак-файлы
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from app.extensions import get_db
+from app.core.storage import BACKENDS, ShardedStore, PackStore, content_name
+
+BUCKETS = {"codes": "STORAGE_CODES_DIR", "uploads": "STORAGE_UPLOADS_DIR"}
+COMMIT_EVERY = 500
+
+
+def _sources(root, target_kind):
+    """(чтение, удаление, имя, старые пути) для всего, что лежит не в целевом бэкенде"""
+    sharded = ShardedStore(root)
+    flat = [n for n in sharded._flat_names()]
+    for name in flat:
+        path = os.path.join(root, name)
+        yield (lambda p=path: open(p, "rb").read()), (lambda p=path: os.remove(p)), name, [path]
+    if target_kind == "pack":
+        for name in set(sharded.names()) - set(flat):
+            path = sharded.path(name)
+            yield (lambda p=path: open(p, "rb").read()), (lambda p=path: os.remove(p)), name, [path]
+    elif os.path.isfile(os.path.join(root, "pack", "index")):
+        pack = PackStore(root)
+        for name in list(pack._index):
+            yield (lambda n=name: pack.read(n)), (lambda n=name: pack.delete(n)), name, []
+
+
+def migrate_bucket(db, bucket, root, target_kind, dry_run):
+    target = None if dry_run else BACKENDS[target_kind](root)
+    moved = merged = nbytes = 0
+    for read, remove, name, old_paths in _sources(root, target_kind):
+        data = read()
+        ext = name.rsplit(".", 1)[1] if "." in name else "png"
+        new_name = content_name(data, ext)
+        nbytes += len(data)
+        moved += 1
+        if dry_run:
+            continue
+        if target.exists(new_name):
+            merged += 1
+        else:
+            target.put(new_name, data)
+        refs = [f"{bucket}/{name}"] + old_paths + [os.path.abspath(p) for p in old_paths]
+        db.execute(
+            f"UPDATE history SET image_path = ? WHERE image_path IN ({','.join(['?'] * len(refs))})",
+            [f"{bucket}/{new_name}"] + refs
+        )
+        remove()
+        if moved % COMMIT_EVERY == 0:
+            db.commit()
+    db.commit()
+    return moved, merged, nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос кодов и загрузок в раскладку хранилища")
+    parser.add_argument("--to", choices=sorted(BACKENDS), help="целевой бэкенд (по умолчанию STORAGE_BACKEND)")
+    parser.add_argument("--bucket", choices=sorted(BUCKETS), help="только один раздел")
+    parser.add_argument("--dry-run", action="store_true", help="ничего не менять")
+    parser.add_argument("--compact", action="store_true", help="сжать пак-файлы после переноса")
+    args = parser.parse_args()
+
+    os.environ.setdefault("WARMUP_ENABLED", "0")
+    app = create_app()
+    target_kind = args.to or app.config.get("STORAGE_BACKEND", "sharded")
+
+    with app.app_context():
+        db = get_db()
+        for bucket, key in BUCKETS.items():
+            if args.bucket and bucket != args.bucket:
+                continue
+            root = app.config[key]
+            moved, merged, nbytes = migrate_bucket(db, bucket, root, target_kind, args.dry_run)
+            verb = "будет перенесено" if args.dry_run else "перенесено"
+            print(f"{bucket}: {verb} {moved} файлов ({nbytes / 1024 / 1024:.1f} МБ), "
+                  f"слито одинаковых: {merged} -> {target_kind}")
+            if args.compact and not args.dry_run and target_kind == "pack":
+                before, after = PackStore(root).compact()
+                print(f"{bucket}: пак-файл {before} -> {after} байт")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Общие фикстуры: приложение с базой и хранилищем во временном каталоге.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Фабрика приложения; именованные аргументы переопределяют параметры конфигурации"""
+    import config
+    from app import create_app
+
+    storage = tmp_path / "storage"
+
+    def make(**overrides):
+        class PytestConfig(config.TestingConfig):
+            DATA_DIR = str(tmp_path / "data")
+            DATABASE_PATH = str(tmp_path / "data" / "app.db")
+            STORAGE_DIR = str(storage)
+            STORAGE_CODES_DIR = str(storage / "codes")
+            STORAGE_UPLOADS_DIR = str(storage / "uploads")
+            STORAGE_JOBS_DIR = str(storage / "jobs")
+            STORAGE_THUMBS_DIR = str(storage / "thumbs")
+
+        for name, value in overrides.items():
+            setattr(PytestConfig, name, value)
+        monkeypatch.setitem(config.config, "pytest", PytestConfig)
+        return create_app("pytest")
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app, client):
+    """Вошедший в систему обычный пользователь: {"id", "username", "is_admin"}"""
+    from app.extensions import get_db
+    from app.models.users import create_user
+
+    with app.app_context():
+        create_user("tester", "secret")
+        row = get_db().execute("SELECT id FROM users WHERE username = 'tester'").fetchone()
+    session_user = {"id": row["id"], "username": "tester", "is_admin": False}
+    with client.session_transaction() as sess:
+        sess["user"] = session_user
+    return session_user
+
+
+@pytest.fixture
+def read_codes():
+    """Распознаёт изображение zxing-cpp напрямую (без транслитерации): [(текст, формат)]"""
+    zxingcpp = pytest.importorskip("zxingcpp")
+    import numpy as np
+
+    def read(img):
+        return [(r.text, r.format.name) for r in zxingcpp.read_barcodes(np.asarray(img.convert("L")))]
+    return read
@@ -0,0 +1,24 @@
+import pytest
+
+from app.core.codes import generate_aztec
+from app.core.gost_dimensions import get_gost_dimensions
+
+
+@pytest.mark.parametrize("text", ["A", "Hello, Aztec 123", "café ÄÖÜ", "0123456789" * 30, "x" * 1000])
+def test_aztec_round_trip(read_codes, text):
+    img, transliterated = generate_aztec(text, 300)
+    assert not transliterated and img.size == (300, 300)
+    assert read_codes(img) == [(text, "Aztec")]
+
+
+@pytest.mark.parametrize("gost_code", [d.code for d in get_gost_dimensions("AZTEC")])
+def test_aztec_gost_sizes(read_codes, gost_code):
+    img, _ = generate_aztec("GOST-42", gost_code=gost_code)
+    assert read_codes(img) == [("GOST-42", "Aztec")]
+
+
+def test_aztec_transliterates_cyrillic(read_codes):
+    img, transliterated = generate_aztec("Привет", 300)
+    assert transliterated
+    [(text, kind)] = read_codes(img)
+    assert kind == "Aztec" and text.isascii()
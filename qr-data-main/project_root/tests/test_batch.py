@@ -0,0 +1,32 @@
+import io
+
+from PIL import Image
+
+from app.core.batch import START_METHOD, get_batch_executor, normalize_batch_item, run_batch
+
+
+def test_pool_does_not_fork():
+    assert START_METHOD in ("forkserver", "spawn")
+    assert get_batch_executor(1)._mp_context.get_start_method() == START_METHOD
+
+
+def test_run_batch_keeps_order_and_errors():
+    items = [normalize_batch_item({"text": "A1", "code_type": "QR", "size": 120}),
+             "Пустой текст",
+             normalize_batch_item({"text": "B2", "code_type": "C128", "size": 200})]
+    results = list(run_batch(items, workers=2))
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert results[1]["error"] == "Пустой текст"
+    assert Image.open(io.BytesIO(results[0]["png"])).format == "PNG"
+
+
+def test_workers_use_app_render_settings(make_app):
+    from app.core.codes import generate_by_type
+    from app.core.encoding import encode_image
+
+    app = make_app(QR_LOGO_ENABLED=False, RENDER_CACHE_ENABLED=False)
+    item = normalize_batch_item({"text": "NO-LOGO-42", "code_type": "QR", "size": 240})
+    with app.app_context():
+        [result] = list(run_batch([item], workers=1))
+        local, _metadata = generate_by_type("QR", "NO-LOGO-42", size=240, use_cache=False)
+    assert result["ok"] and result["png"] == encode_image(local, "compact")[0]
@@ -0,0 +1,20 @@
+import pytest
+
+from app.core.codes import generate_code128
+from app.core.gost_dimensions import get_gost_dimensions
+
+
+@pytest.mark.parametrize("text", ["A1", "CODE128-abc", "0123456789012345", "Mixed 12 ab 3456 CD"])
+def test_code128_round_trip(read_codes, text):
+    assert read_codes(generate_code128(text, 150)) == [(text, "Code128")]
+
+
+@pytest.mark.parametrize("gost_code", [d.code for d in get_gost_dimensions("C128")])
+def test_code128_gost_sizes_with_caption(read_codes, gost_code):
+    img = generate_code128("4600000000017", human_text="4600000000017", gost_code=gost_code)
+    assert read_codes(img) == [("4600000000017", "Code128")]
+
+
+def test_code128_rejects_unencodable_text():
+    with pytest.raises(RuntimeError):
+        generate_code128("код", 150)
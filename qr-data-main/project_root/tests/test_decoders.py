@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+import qrcode
+from PIL import Image
+
+from app.core import decoders
+from app.core.decoders import ALL_SYMBOLOGIES, DECODERS_BY_NAME, DecodeDeadlineExceeded, Decoder, run_decoders
+
+
+@pytest.fixture
+def use_decoders(monkeypatch):
+    """Заменяет набор декодеров подставными (модуль PIL установлен всегда) и zxing-cpp"""
+    zxingcpp = DECODERS_BY_NAME["zxingcpp"]
+    decoders.decoder_stats.reset()
+
+    def use(*chosen):
+        chosen = [d if isinstance(d, Decoder) else zxingcpp for d in chosen]
+        monkeypatch.setattr(decoders, "DECODERS", chosen)
+        monkeypatch.setattr(decoders, "DECODERS_BY_NAME", {d.name: d for d in chosen})
+
+    yield use
+    decoders.configure(max_workers=4)
+    decoders.decoder_stats.reset()
+
+
+def _blank():
+    return Image.new("L", (200, 200), 255)
+
+
+def _qr(text="RACE-OK"):
+    return qrcode.make(text).convert("L")
+
+
+def test_race_deadline_does_not_wait_for_stuck_decoder(use_decoders):
+    release = threading.Event()
+    stuck = Decoder("stuck", "PIL", lambda img, timeout_ms: release.wait(5) and [], ALL_SYMBOLOGIES, 1.0)
+    use_decoders(stuck, "zxingcpp")
+    decoders.configure(max_workers=4)
+    try:
+        started = time.monotonic()
+        with pytest.raises(DecodeDeadlineExceeded):
+            run_decoders(_blank(), deadline_ms=150, mode="race")
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+
+
+def test_race_runs_inline_when_pool_is_held_by_losers(use_decoders):
+    release = threading.Event()
+    stuck = Decoder("stuck", "PIL", lambda img, timeout_ms: release.wait(5) and [], ALL_SYMBOLOGIES, 1.0)
+    decoders.configure(max_workers=2)
+    try:
+        # Две гонки, проигранные по сроку: оба потока пула заняты непрерываемым декодером
+        use_decoders(stuck)
+        for _ in range(2):
+            with pytest.raises(DecodeDeadlineExceeded):
+                run_decoders(_blank(), deadline_ms=50, mode="race")
+
+        use_decoders("zxingcpp")
+        found = run_decoders(_qr(), deadline_ms=2000, mode="race")
+        assert [r["text"] for r in found] == ["RACE-OK"]
+    finally:
+        release.set()
+    deadline = time.monotonic() + 5
+    while decoders._in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert decoders._in_flight == 0
+
+
+def test_interruptible_decoder_gets_capped_timeout(use_decoders):
+    seen = []
+    capped = Decoder("capped", "PIL", lambda img, timeout_ms: seen.append(timeout_ms) or [],
+                     ALL_SYMBOLOGIES, 1.0, max_ms=50)
+    use_decoders(capped)
+    run_decoders(_blank(), deadline_ms=5000, mode="cascade")
+    run_decoders(_blank(), mode="cascade")
+    assert seen == [50, 50]
+
+
+
+def test_pyramid_keeps_configured_mode_for_every_candidate(monkeypatch):
+    import io
+
+    from app.core import codes
+    from app.core.pyramid import decode_pyramid
+
+    modes = []
+    monkeypatch.setattr(codes, "decode_auto", lambda img, hint, deadline_ms, mode=None: modes.append(mode) or [])
+    bio = io.BytesIO()
+    Image.new("RGB", (300, 200), "white").save(bio, "PNG")
+    assert decode_pyramid(bio.getvalue(), deadline_ms=3000, levels=(100, 200)) == ([], None)
+    # Режим не задаётся: run_decoders берёт DECODE_MODE, а при занятом пуле сам переходит на cascade
+    assert modes == [None, None, None]
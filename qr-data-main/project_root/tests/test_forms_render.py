@@ -0,0 +1,14 @@
+def test_render_returns_etag_and_304(client):
+    resp = client.get("/forms/render", query_string={"d": "12345", "t": "QR", "s": 200})
+    assert resp.status_code == 200 and resp.mimetype == "image/png"
+    etag = resp.headers["ETag"]
+    again = client.get("/forms/render", query_string={"d": "12345", "t": "QR", "s": 200},
+                       headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+
+def test_render_encoder_error_is_400(client):
+    resp = client.get("/forms/render", query_string={"d": "y" * 5000, "t": "PDF417", "s": 300})
+    assert resp.status_code == 400
+    assert resp.get_json()["ok"] is False
+    assert resp.headers["Cache-Control"] == "no-store"
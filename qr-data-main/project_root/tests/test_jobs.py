@@ -0,0 +1,83 @@
+import threading
+import time
+
+from app.core.jobs import job_handler, job_manager
+from app.models.jobs import create_job, fail_stale_jobs, get_job
+
+release = threading.Event()
+
+
+@job_handler("test_wait")
+def _wait_job(ctx, params):
+    ctx.progress(1, force=True)
+    release.wait(10)
+    if params.get("fail"):
+        raise ValueError("сбой")
+    return {"echo": params["value"]}
+
+
+def _wait_status(app, job_id, statuses, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with app.app_context():
+            job = get_job(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"задача {job_id} осталась в {job['status']}")
+
+
+def _submit(app, **params):
+    with app.test_request_context():
+        return job_manager.submit("test_wait", params, total=1)
+
+
+def test_job_runs_to_done_and_error(app):
+    release.clear()
+    ok_id = _submit(app, value=42)
+    bad_id = _submit(app, value=0, fail=True)
+    running = _wait_status(app, ok_id, ("running",))
+    assert running["progress_done"] == 1
+    release.set()
+    done = _wait_status(app, ok_id, ("done", "error"))
+    assert done["status"] == "done" and done["result"] == {"echo": 42}
+    failed = _wait_status(app, bad_id, ("done", "error"))
+    assert failed["status"] == "error" and "сбой" in failed["error"]
+
+
+def test_restarted_worker_keeps_live_jobs(app):
+    """create_app в соседнем (перезапущенном) воркере не роняет задачи живого процесса"""
+    from app import create_app
+
+    release.clear()
+    job_id = _submit(app, value=1)
+    _wait_status(app, job_id, ("running",))
+    create_app("pytest")
+    with app.app_context():
+        assert get_job(job_id)["status"] == "running"
+    release.set()
+    assert _wait_status(app, job_id, ("done", "error"))["status"] == "done"
+
+
+def test_jobs_without_heartbeat_are_failed(app):
+    with app.app_context():
+        create_job("stale", None, "test_wait", owner="gone:1:x")
+        create_job("fresh", None, "test_wait", owner="alive:2:y")
+        from app.extensions import get_db
+        get_db().execute("UPDATE jobs SET heartbeat_at = heartbeat_at - 3600 WHERE id = 'stale'")
+        get_db().commit()
+        assert fail_stale_jobs(60) == 1
+        assert get_job("stale")["status"] == "error"
+        assert get_job("fresh")["status"] == "queued"
+
+
+def test_job_events_stream_is_capped(app, client):
+    app.config["JOB_EVENTS_TIMEOUT"] = 0.2
+    release.clear()
+    job_id = _submit(app, value=3)
+    started = time.monotonic()
+    body = client.get(f"/jobs/{job_id}/events").get_data(as_text=True)
+    assert time.monotonic() - started < 5
+    assert body.startswith("retry:") and "data:" in body
+    release.set()
+    _wait_status(app, job_id, ("done", "error"))
@@ -0,0 +1,19 @@
+from app.core.logos import LogoRegistry, DEFAULT_LOGO_PATH
+
+
+def test_overlay_cache_is_bounded():
+    registry = LogoRegistry(max_overlay_bytes=200 * 1024)
+    registry.register("default", DEFAULT_LOGO_PATH)
+    for size in range(100, 1600, 7):
+        overlay, mask = registry.overlay(size, "H")
+        assert overlay.size == mask.size == (size // 5, size // 5)
+    assert registry._overlay_bytes <= registry.max_overlay_bytes
+    assert len(registry._overlays) < len(range(100, 1600, 7))
+
+
+def test_overlay_reused_and_dropped_on_unregister():
+    registry = LogoRegistry()
+    registry.register("default", DEFAULT_LOGO_PATH)
+    assert registry.overlay(500, "M") is registry.overlay(500, "M")
+    registry.unregister("default")
+    assert registry.overlay(500, "M") is None and registry._overlay_bytes == 0
@@ -0,0 +1,55 @@
+import random
+import string
+
+import pytest
+
+from app.core.codes import generate_pdf417
+from app.core.gost_dimensions import get_gost_dimensions
+from app.core.pdf417_layout import (MAX_COLUMNS, MAX_CODEWORDS, QUIET_MODULES, ROW_RATIO, _rows_for, payload_codewords,
+                                    solve_layout)
+
+
+@pytest.mark.parametrize("text", ["PDF417 test", "0123456789" * 20, "Hello world! " * 30])
+def test_pdf417_round_trip(read_codes, text):
+    img = generate_pdf417(text, 300)
+    assert img.height == 300
+    assert read_codes(img) == [(text, "PDF417")]
+
+
+@pytest.mark.parametrize("gost_code", [d.code for d in get_gost_dimensions("PDF417")])
+def test_pdf417_gost_sizes(read_codes, gost_code):
+    img = generate_pdf417("GOST PDF417 0123456789", gost_code=gost_code)
+    assert read_codes(img) == [("GOST PDF417 0123456789", "PDF417")]
+
+
+@pytest.mark.parametrize("data_codewords", [1, 100, 400, 700, 890, 925])
+def test_layout_never_exceeds_codeword_limit(data_codewords):
+    for size in (150, 300, 600, 1200):
+        layout = solve_layout(data_codewords, round(size * 35 / 15), size)
+        assert layout.rows * layout.columns <= MAX_CODEWORDS
+        assert data_codewords + 1 + 2 ** (layout.security_level + 1) <= layout.rows * layout.columns
+
+
+def test_near_capacity_payload_round_trip(read_codes):
+    rng = random.Random(1)
+    text = "".join(rng.choice(string.ascii_letters + string.digits + " .,") for _ in range(1000))
+    assert payload_codewords(text) > 850
+    img = generate_pdf417(text, 600)
+    assert read_codes(img) == [(text, "PDF417")]
+
+
+def test_fallback_picks_smallest_symbol_across_levels():
+    layout = solve_layout(300, 10, 10, security_level=5)
+    assert not layout.fits
+    areas = []
+    for level in range(6):
+        for columns in range(1, MAX_COLUMNS + 1):
+            rows = _rows_for(300, columns, level)
+            if rows is not None:
+                areas.append((17 * columns + 69 + 2 * QUIET_MODULES) * (rows * ROW_RATIO + 2 * QUIET_MODULES))
+    assert layout.width_px * layout.height_px == min(areas)
+
+
+def test_pdf417_too_long_text():
+    with pytest.raises(ValueError, match="слишком длинные"):
+        generate_pdf417("y" * 5000, 300)
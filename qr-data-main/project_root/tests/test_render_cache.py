@@ -0,0 +1,36 @@
+import os
+
+from PIL import Image
+
+from app.core.render_cache import RenderCache
+
+
+def _noise(seed: int) -> Image.Image:
+    return Image.frombytes("L", (40, 40), bytes((seed * 31 + i * 7) % 256 for i in range(1600)))
+
+
+def test_memory_and_disk_hits(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path))
+    cache.put("k", _noise(1), {"a": 1})
+    img, meta = cache.get("k")
+    assert meta == {"a": 1} and img.tobytes() == _noise(1).tobytes()
+
+    cache.clear()
+    img, meta = cache.get("k")
+    assert meta == {"a": 1} and cache.stats()["disk_hits"] == 1
+    assert cache.get("missing") is None
+
+
+def test_disk_limit_counts_files_of_other_processes(tmp_path):
+    """Лимит диска общий: файлы, записанные другим экземпляром (процессом), тоже учитываются"""
+    limit = 20000
+    first = RenderCache(disk_dir=str(tmp_path), max_disk_bytes=limit)
+    second = RenderCache(disk_dir=str(tmp_path), max_disk_bytes=limit)
+    for i in range(60):
+        (first if i % 2 else second).put(f"k{i}", Image.frombytes("L", (40, 40), os.urandom(1600)), {})
+    first.sweep_disk()
+    total = sum(e.stat().st_size for e in os.scandir(tmp_path) if e.name.endswith(".png"))
+    assert total <= limit
+
+    second.clear()
+    assert second.get("k59") is not None  # записан первым экземпляром
@@ -0,0 +1,63 @@
+import io
+
+from PIL import Image, ImageChops
+
+from app.core.render_tokens import RenderTokens
+
+
+def _generate(client, text="TOKEN-123"):
+    resp = client.post("/forms/api_generate", json={"text": text, "code_type": "QR", "size": 200, "inline": False})
+    data = resp.get_json()
+    assert data["ok"] and data["token"]
+    return data
+
+
+def test_token_reused_by_save_and_history_copy(app, client, user):
+    from app.models.history import list_history_by_user
+
+    data = _generate(client)
+    preview = Image.open(io.BytesIO(client.get(data["image_url"]).data)).convert("L")
+
+    # Текст формы не важен: сохраняется то, что было в предпросмотре
+    saved = client.post("/forms/api_save", data={"text": "другое", "token": data["token"], "fmt": "png"})
+    assert saved.status_code == 200 and saved.mimetype == "image/png"
+    img = Image.open(io.BytesIO(saved.data)).convert("L")
+    assert ImageChops.difference(img, preview).getbbox() is None
+
+    copied = client.post("/forms/api_save_history_copy", json={"token": data["token"]})
+    assert copied.get_json()["ok"] is True
+    with app.app_context():
+        history = list_history_by_user(user["id"])
+    assert [h["content"] for h in history] == ["TOKEN-123", "TOKEN-123"]
+
+
+def test_token_valid_in_other_process_with_same_key():
+    token = RenderTokens("key").issue("QR", "abc", 200, "", None, {"transliterated": False})
+    ticket = RenderTokens("key").lookup(token)
+    assert ticket is not None and (ticket.text, ticket.size) == ("abc", 200)
+    assert RenderTokens("other").lookup(token) is None
+
+
+def test_expired_or_forged_token_is_410(client, user):
+    token = _generate(client)["token"]
+    resp = client.post("/forms/api_save_history_copy", json={"token": token[:-2] + "xx"})
+    assert resp.status_code == 410
+
+    expired = RenderTokens("key", ttl_seconds=-1)
+    assert expired.lookup(expired.issue("QR", "abc", 200, "", None, {})) is None
+
+
+def test_history_copy_encoder_error_is_400(client, user):
+    resp = client.post("/forms/api_save_history_copy", json={"text": "цена 5 €", "code_type": "C128"})
+    assert resp.status_code == 400 and resp.get_json()["ok"] is False
+
+
+def test_save_renders_from_signed_parameters(client, monkeypatch):
+    from app.core.render_tokens import render_tokens
+
+    data = _generate(client, "SIGNED-1")
+    calls = []
+    real_image = render_tokens.image
+    monkeypatch.setattr(render_tokens, "image", lambda token: calls.append(token) or real_image(token))
+    saved = client.post("/forms/api_save", data={"token": data["token"], "fmt": "png"})
+    assert saved.status_code == 200 and calls == [data["token"]]
@@ -0,0 +1,56 @@
+import pytest
+
+from app.core import storage
+from app.core.storage import BACKENDS, ImageStorage, StorageBackend
+
+
+def test_backend_interface_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        StorageBackend(str(tmp_path))
+
+    class Partial(StorageBackend):
+        def put(self, name, data):
+            pass
+
+    with pytest.raises(TypeError):
+        Partial(str(tmp_path))
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_round_trip_and_dedup(tmp_path, backend):
+    images = ImageStorage()
+    images.configure(backend, {"codes": str(tmp_path / "codes")})
+    name, ref = images.store_bytes("codes", b"png-bytes", "png")
+    again, ref2 = images.store_bytes("codes", b"png-bytes", "png")
+    assert (again, ref2) == (name, ref) and ref == f"codes/{name}"
+
+    store = images.bucket("codes")
+    assert images.read(ref) == b"png-bytes"
+    assert store.exists(name) and store.size(name) == len(b"png-bytes")
+    assert list(store.names()) == [name]
+    assert store.delete(name) and not store.exists(name) and images.read(ref) is None
+
+
+@pytest.mark.parametrize("backend", sorted(BACKENDS))
+def test_file_released_with_last_history_row(app, user, monkeypatch, backend):
+    from app.extensions import get_db
+    from app.models.history import add_history, delete_history_older_than_days
+
+    monkeypatch.setattr(storage, "RELEASE_GRACE_SECONDS", -1)
+    with app.app_context():
+        images = storage.image_storage
+        images.configure(backend, {bucket: store.root for bucket, store in images.buckets.items()})
+        _name, ref = images.store_bytes("codes", b"shared", "png")
+        add_history(user["id"], "created", "QR", None, "old", ref)
+        add_history(user["id"], "created", "QR", None, "new", ref)
+        db = get_db()
+        db.execute("UPDATE history SET created_at = datetime('now', '-10 days') WHERE content = 'old'")
+        db.commit()
+
+        delete_history_older_than_days(user["id"], 5)
+        assert images.read(ref) == b"shared"
+
+        db.execute("UPDATE history SET created_at = datetime('now', '-10 days')")
+        db.commit()
+        delete_history_older_than_days(user["id"], 5)
+        assert images.read(ref) is None
@@ -0,0 +1,43 @@
+from app.core.storage import image_storage
+from app.core.storage_gc import collect_orphans, gc_lock, storage_collector
+from app.core.thumbnails import THUMB_BUCKET, thumbnail_name
+
+
+def test_orphans_deleted_referenced_and_thumbs_kept(app, user):
+    from app.models.history import add_history
+
+    with app.app_context():
+        kept, kept_ref = image_storage.store_bytes("codes", b"kept", "png")
+        orphan, orphan_ref = image_storage.store_bytes("codes", b"orphan", "png")
+        add_history(user["id"], "created", "QR", None, "text", kept_ref)
+        live_thumb = thumbnail_name("codes", kept)
+        dead_thumb = thumbnail_name("codes", orphan)
+        image_storage.bucket(THUMB_BUCKET).put(live_thumb, b"t1")
+        image_storage.bucket(THUMB_BUCKET).put(dead_thumb, b"t2")
+
+        report = collect_orphans(grace_hours=-1, max_files_per_second=1e6)
+
+    assert report["codes"]["deleted"] == 1
+    assert image_storage.read(kept_ref) == b"kept" and image_storage.read(orphan_ref) is None
+    # Миниатюра удалённого оригинала уходит в том же проходе или в следующем
+    thumbs = image_storage.bucket(THUMB_BUCKET)
+    assert thumbs.exists(live_thumb)
+    with app.app_context():
+        collect_orphans(grace_hours=-1, max_files_per_second=1e6)
+    assert thumbs.exists(live_thumb) and not thumbs.exists(dead_thumb)
+
+
+def test_dry_run_deletes_nothing(app):
+    with app.app_context():
+        _name, ref = image_storage.store_bytes("uploads", b"photo", "jpg")
+        report = collect_orphans(grace_hours=-1, max_files_per_second=1e6, dry_run=True)
+    assert report["uploads"]["orphans"] == 1 and report["uploads"]["deleted"] == 0
+    assert image_storage.read(ref) == b"photo"
+
+
+def test_collector_skips_while_lock_is_held(app):
+    storage_collector.app = app
+    with gc_lock(app.config["STORAGE_DIR"]) as acquired:
+        assert acquired
+        assert storage_collector.run_once() is None
+    assert storage_collector.run_once() is not None
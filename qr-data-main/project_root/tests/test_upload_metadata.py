@@ -0,0 +1,63 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageOps
+
+from app.core.metadata import strip_metadata
+
+
+def _photo_bytes(fmt, orientation=None, **options):
+    img = Image.fromarray((np.random.default_rng(0).random((120, 160, 3)) * 255).astype("uint8"))
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    exif[0x8825] = {2: (55.0, 45.0, 0.0)}  # GPSInfo: широта
+    if orientation:
+        exif[0x0112] = orientation
+    bio = io.BytesIO()
+    img.save(bio, fmt, exif=exif.tobytes(), **options)
+    return bio.getvalue()
+
+
+@pytest.mark.parametrize("fmt, options", [
+    ("JPEG", {"quality": 90, "icc_profile": b"\0" * 128}),
+    ("JPEG", {"progressive": True}),
+    ("PNG", {}),
+    ("WEBP", {"quality": 80}),
+    ("WEBP", {"lossless": True}),
+])
+def test_strip_metadata_keeps_pixels(fmt, options):
+    data = _photo_bytes(fmt, **options)
+    stripped = strip_metadata(data + (b"\xff\xd8trailing-preview" if fmt == "JPEG" else b""), fmt)
+    with Image.open(io.BytesIO(data)) as before, Image.open(io.BytesIO(stripped)) as after:
+        assert dict(before.getexif()) and not dict(after.getexif())
+        assert after.info.get("icc_profile") == options.get("icc_profile")
+        assert np.array_equal(np.asarray(before.convert("RGB")), np.asarray(after.convert("RGB")))
+    assert b"trailing-preview" not in stripped
+
+
+def test_uploaded_photo_served_without_exif(client):
+    data = _photo_bytes("JPEG", quality=90)
+    resp = client.post("/scan/api", data={"image": (io.BytesIO(data), "photo.jpg")},
+                       content_type="multipart/form-data")
+    served = client.get(resp.get_json()["preview_url"])
+    assert served.status_code == 200
+    with Image.open(io.BytesIO(served.data)) as img:
+        assert img.format == "JPEG" and not dict(img.getexif())
+    assert b"PhoneMaker" not in served.data
+
+
+@pytest.mark.parametrize("fmt, options", [("JPEG", {}), ("PNG", {}), ("WEBP", {"lossless": True})])
+def test_strip_metadata_keeps_orientation(fmt, options):
+    stripped = strip_metadata(_photo_bytes(fmt, orientation=6, **options), fmt)
+    assert b"PhoneMaker" not in stripped
+    with Image.open(io.BytesIO(stripped)) as img:
+        assert dict(img.getexif()) == {0x0112: 6}
+        assert ImageOps.exif_transpose(img).size == (120, 160)
+
+
+def test_corrupt_image_body_is_400(client):
+    data = _photo_bytes("JPEG", quality=90)[:400]
+    resp = client.post("/scan/api", data={"image": (io.BytesIO(data), "broken.jpg")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 400 and resp.get_json()["ok"] is False